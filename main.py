@@ -23,8 +23,16 @@ def main(page: ft.Page):
     page.fonts = {"RobotoMono": "./assets/" + constants.FILE_NAMES["custom_font"]}
 
     typing_test = TypingTest(page)
+    # saved test which text is typed again when main page is opened
+    retried_test = None
+
+    def retry(statistics):
+        nonlocal retried_test
+        retried_test = statistics
+        page.go("/")
 
     def route_change(_):
+        nonlocal retried_test
         page.views.clear()
 
         if page.route == "/":
@@ -53,7 +61,14 @@ def main(page: ft.Page):
 
             typing_test.can_type = True
         elif page.route == "/stats":
-            list_view_builder = StatisticsPage()
+            list_view_builder = StatisticsPage(
+                last_test=(
+                    typing_test.statistics
+                    if typing_test.status == TypingTest.TestStatus.ENDED
+                    else None
+                ),
+                on_retry=retry,
+            )
 
             page.views.append(
                 ft.View(
@@ -107,13 +122,19 @@ def main(page: ft.Page):
 
         page.update()
 
-        if page.route == "/":
+        if page.route == "/" and retried_test is not None:
+            typing_test.retry(retried_test)
+            retried_test = None
+        elif page.route == "/":
             typing_test.restart()
+        elif page.route == "/stats":
+            list_view_builder.reload_when_saved()
 
     page.on_route_change = route_change
     page.go(page.route)
 
     page.on_keyboard_event = typing_test.key_pressed
+    page.on_close = lambda _: typing_test.close()
     page.update()
 
 
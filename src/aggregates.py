@@ -0,0 +1,282 @@
+"""
+Aggregates of tests history (personal bests, averages, streaks)
+which are updated on every saved test.
+Rebuild from history: python -m src.aggregates rebuild
+"""
+
+import os
+import json
+import math
+import argparse
+import datetime
+import threading
+from collections import deque
+from functools import partial
+from typing import Any, Dict, List, Tuple
+from src.history import get_history_store
+from src.persistence import write_atomically, write_json
+from src import constants
+
+# language, test size mode, test size, punctuation, numbers
+BucketKey = Tuple[str, str, int, bool, bool]
+
+
+class Aggregate:
+    """Running sums of one bucket of tests"""
+
+    def __init__(self):
+        self.count = 0
+        self.wpm_sum = 0.0
+        self.wpm_squares_sum = 0.0
+        self.accuracy_sum = 0.0
+        self.accuracy_squares_sum = 0.0
+        self.best_wpm: float | None = None
+        # start time of test with best wpm
+        self.best_wpm_time: str | None = None
+        self.last_wpm = deque(maxlen=constants.AGGREGATES["last_results"])
+
+    def add(self, wpm: float, accuracy: float, start_time: str):
+        """Adds test to aggregate (O(1))"""
+
+        self.count += 1
+        self.wpm_sum += wpm
+        self.wpm_squares_sum += wpm**2
+        self.accuracy_sum += accuracy
+        self.accuracy_squares_sum += accuracy**2
+
+        if self.best_wpm is None or wpm > self.best_wpm:
+            self.best_wpm = wpm
+            self.best_wpm_time = start_time
+
+        self.last_wpm.append(wpm)
+
+    def get_average_wpm(self) -> float:
+        """Returns average wpm of all tests"""
+        return self.wpm_sum / self.count if self.count else 0.0
+
+    def get_wpm_deviation(self) -> float:
+        """Returns standard deviation of wpm"""
+
+        if self.count == 0:
+            return 0.0
+        variance = self.wpm_squares_sum / self.count - self.get_average_wpm() ** 2
+        return math.sqrt(max(0.0, variance))
+
+    def get_average_accuracy(self) -> float:
+        """Returns average accuracy of all tests"""
+        return self.accuracy_sum / self.count if self.count else 0.0
+
+    def get_last_average_wpm(self) -> float:
+        """Returns average wpm of last tests"""
+        return sum(self.last_wpm) / len(self.last_wpm) if self.last_wpm else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns json-serializable dict"""
+
+        return {
+            "count": self.count,
+            "wpm_sum": self.wpm_sum,
+            "wpm_squares_sum": self.wpm_squares_sum,
+            "accuracy_sum": self.accuracy_sum,
+            "accuracy_squares_sum": self.accuracy_squares_sum,
+            "best_wpm": self.best_wpm,
+            "best_wpm_time": self.best_wpm_time,
+            "last_wpm": list(self.last_wpm),
+        }
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> "Aggregate":
+        """Creates aggregate from to_dict() result"""
+
+        aggregate = cls()
+        for name, value in values.items():
+            if name == "last_wpm":
+                aggregate.last_wpm.extend(value)
+            else:
+                setattr(aggregate, name, value)
+        return aggregate
+
+
+class AggregateStore:
+    """
+    Aggregates of every (language, mode, size, punctuation, numbers) bucket
+    and daily streaks. Saved to small json file, so it is read without
+    touching tests history
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): json file (created on first save)
+        """
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.reset()
+
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as aggregates_file:
+                values = json.load(aggregates_file)
+            if values["version"] == self.VERSION:
+                self.buckets = {
+                    tuple(bucket["key"]): Aggregate.from_dict(bucket["aggregate"])
+                    for bucket in values["buckets"]
+                }
+                self.last_day = values["last_day"]
+                self.current_streak = values["current_streak"]
+                self.best_streak = values["best_streak"]
+                self.tests_count = values["tests_count"]
+
+    def reset(self):
+        """Removes all aggregates"""
+
+        self.buckets: Dict[BucketKey, Aggregate] = {}
+        # iso date of last test and amount of consecutive days with tests
+        self.last_day: str | None = None
+        self.current_streak = 0
+        self.best_streak = 0
+        # amount of aggregated tests, differs from amount of tests in history
+        # if tests were saved without aggregates (crash, import of data.csv)
+        self.tests_count = 0
+
+    @staticmethod
+    def get_key(row: Dict[str, Any]) -> BucketKey:
+        """Returns bucket of history row"""
+
+        return (
+            row["language"],
+            row["test_size_mode"],
+            int(row["test_size"]),
+            bool(row["punctuation"]),
+            bool(row["numbers"]),
+        )
+
+    def add(self, row: Dict[str, Any], save: bool = True):
+        """Adds test (history row) to aggregates
+
+        Args:
+            row (Dict[str, Any]): saved test (keys are STATISTICS_FIELD_NAMES)
+            save (bool, optional): write file after update
+        """
+
+        with self.lock:
+            key = self.get_key(row)
+            if key not in self.buckets:
+                self.buckets[key] = Aggregate()
+            self.buckets[key].add(row["wpm"], row["accuracy"], row["start_time"])
+            self.tests_count += 1
+
+            self.update_streak(
+                datetime.datetime.strptime(
+                    row["start_time"], constants.DATE_FORMATS["history_time"]
+                ).date()
+            )
+
+            if save:
+                self.save()
+
+    def update_streak(self, day: datetime.date):
+        """Updates streaks with day of test (self.lock must be held)"""
+
+        last_day = datetime.date.fromisoformat(self.last_day) if self.last_day else None
+        if last_day is not None and day <= last_day:
+            return
+
+        if last_day is not None and day - last_day == datetime.timedelta(days=1):
+            self.current_streak += 1
+        else:
+            self.current_streak = 1
+
+        self.best_streak = max(self.best_streak, self.current_streak)
+        self.last_day = day.isoformat()
+
+    def get_current_streak(self, today: datetime.date | None = None) -> int:
+        """Returns amount of consecutive days with tests up to today
+        (streak is not broken until today is over)"""
+
+        today = today if today is not None else datetime.date.today()
+        if self.last_day is None:
+            return 0
+        if today - datetime.date.fromisoformat(self.last_day) > datetime.timedelta(
+            days=1
+        ):
+            return 0
+        return self.current_streak
+
+    def get_buckets(self) -> List[Tuple[BucketKey, Aggregate]]:
+        """Returns buckets with most tests first"""
+
+        with self.lock:
+            return sorted(
+                self.buckets.items(), key=lambda item: item[1].count, reverse=True
+            )
+
+    def save(self):
+        """Writes file atomically (self.lock must be held)"""
+
+        values = {
+            "version": self.VERSION,
+            "buckets": [
+                {"key": list(key), "aggregate": aggregate.to_dict()}
+                for key, aggregate in self.buckets.items()
+            ],
+            "last_day": self.last_day,
+            "current_streak": self.current_streak,
+            "best_streak": self.best_streak,
+            "tests_count": self.tests_count,
+        }
+
+        write_atomically(self.path, partial(write_json, values))
+
+    def rebuild(self, rows: List[Dict[str, Any]]):
+        """Recalculates aggregates from all tests (oldest first)"""
+
+        with self.lock:
+            self.reset()
+        for row in rows:
+            self.add(row, save=False)
+        with self.lock:
+            self.save()
+
+
+_aggregate_store: AggregateStore | None = None
+_aggregate_store_lock = threading.Lock()
+
+
+def get_aggregate_store() -> AggregateStore:
+    """Returns store of saves/aggregates.json (loaded once per process),
+    it is rebuilt from history if it does not aggregate all saved tests
+    (file is missing or older, tests were imported or saved without it)"""
+
+    global _aggregate_store
+
+    with _aggregate_store_lock:
+        if _aggregate_store is None:
+            history_store = get_history_store()
+            aggregate_store = AggregateStore(
+                "./saves/" + constants.FILE_NAMES["aggregates"]
+            )
+            if aggregate_store.tests_count != history_store.count_tests():
+                aggregate_store.rebuild(history_store.get_tests()[::-1])
+
+            _aggregate_store = aggregate_store
+
+        return _aggregate_store
+
+
+def main(args: List[str] | None = None):
+    """Rebuilds aggregates from tests history"""
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(args)
+
+    rows = get_history_store().get_tests()[::-1]
+    get_aggregate_store().rebuild(rows)
+    print(f"aggregated {len(rows)} tests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+ColumnarHistory: tests history in append-only binary column files.
+Also converts history between data.csv and column files:
+python -m src.columnar_history to-csv|from-csv <csv file> <directory>
+"""
+
+import os
+import json
+import operator
+import argparse
+import datetime
+import threading
+from functools import partial
+from typing import Any, Dict, Iterable, List
+import numpy as np
+from src.constants import HISTORY_FILTERS, HISTORY_SORT_COLUMNS, STATISTICS_FIELD_NAMES
+from src.history_csv import read_csv, write_csv
+from src.persistence import write_atomically, write_json
+from src import constants
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+COMPARISONS = {
+    "==": operator.eq,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def datetime_to_ns(value: datetime.datetime) -> int:
+    """Returns epoch nanoseconds of local time"""
+    return (value.astimezone(datetime.timezone.utc) - EPOCH) // MICROSECOND * 1000
+
+
+def ns_to_datetime(value: int) -> datetime.datetime:
+    """Returns local time of epoch nanoseconds"""
+
+    return datetime.datetime.fromtimestamp(value // 10**9).replace(
+        microsecond=value // 1000 % 10**6
+    )
+
+
+class ColumnarHistory:
+    """
+    Every column is separate file of fixed-width values (strings are stored
+    as blob and end offsets), so saving test appends to files in O(1)
+    and loading is np.memmap of every file without parsing.
+    Has same interface as HistoryStore
+    """
+
+    # dtypes of fixed-width columns, None for strings
+    COLUMN_DTYPES = {
+        "wpm": np.dtype("<f4"),
+        "accuracy": np.dtype("<f4"),
+        "test_size_mode": np.dtype("u1"),
+        "test_size": np.dtype("<i4"),
+        "language": np.dtype("u1"),
+        "punctuation": np.dtype("u1"),
+        "numbers": np.dtype("u1"),
+        "total_key_presses": np.dtype("<i4"),
+        "correct_key_presses": np.dtype("<i4"),
+        # epoch nanoseconds
+        "start_time": np.dtype("<i8"),
+        "end_time": np.dtype("<i8"),
+        "keystroke_log": None,
+        "wpm_series": None,
+        # -1 if test has no seed
+        "seed": np.dtype("<i8"),
+        "generator": None,
+    }
+    # columns stored as codes (index in list of values in meta file)
+    CODED_COLUMNS = ["test_size_mode", "language"]
+    OFFSET_DTYPE = np.dtype("<u8")
+    META_FILE = "meta.json"
+    VERSION = 1
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): directory with column files (created if missing)
+        """
+
+        self.directory = directory
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.meta = {
+            "version": self.VERSION,
+            "codes": {column: [] for column in self.CODED_COLUMNS},
+            # whether rows are sorted by start time (pages of newest tests
+            # are then read without sorting)
+            "time_ordered": True,
+        }
+        meta_path = os.path.join(directory, self.META_FILE)
+        if os.path.isfile(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as meta_file:
+                self.meta = json.load(meta_file)
+            if self.meta["version"] != self.VERSION:
+                raise ValueError(f"{directory} has unsupported history version")
+
+        if "time_ordered" not in self.meta:
+            with self.lock:
+                self.meta["time_ordered"] = bool(
+                    np.all(np.diff(self.load()["start_time"]) >= 0)
+                )
+                self.save_meta()
+
+    def get_path(self, column: str, suffix: str = "bin") -> str:
+        """Returns path of column file"""
+        return os.path.join(self.directory, f"{column}.{suffix}")
+
+    def save_meta(self):
+        """Writes meta file atomically (self.lock must be held)"""
+
+        write_atomically(
+            os.path.join(self.directory, self.META_FILE),
+            partial(write_json, self.meta),
+        )
+
+    def encode(self, column: str, value: Any) -> Any:
+        """Converts value of history row to value stored in column
+        (self.lock must be held)"""
+
+        if column in self.CODED_COLUMNS:
+            codes = self.meta["codes"][column]
+            if value not in codes:
+                codes.append(value)
+                self.save_meta()
+            return codes.index(value)
+        if column in ["start_time", "end_time"]:
+            return datetime_to_ns(
+                datetime.datetime.strptime(
+                    value, constants.DATE_FORMATS["history_time"]
+                )
+            )
+        if column == "seed":
+            return -1 if value is None else value
+        if self.COLUMN_DTYPES[column] is None:
+            return "" if value is None else str(value)
+        return value
+
+    def add(self, row: Dict[str, Any]) -> int:
+        """Saves test (keys of row are STATISTICS_FIELD_NAMES), returns its id"""
+
+        self.add_many([row])
+        return self.count_tests()
+
+    def add_many(self, rows: Iterable[Dict[str, Any]]):
+        """Appends tests to all column files"""
+
+        with self.lock:
+            start_times = self.load()["start_time"]
+            self.truncate(len(start_times))
+
+            rows = list(rows)
+            for column in STATISTICS_FIELD_NAMES:
+                values = [self.encode(column, row.get(column)) for row in rows]
+                dtype = self.COLUMN_DTYPES[column]
+
+                if column == "start_time" and self.meta["time_ordered"]:
+                    if np.any(np.diff(list(start_times[-1:]) + values) < 0):
+                        self.meta["time_ordered"] = False
+                        self.save_meta()
+
+                if dtype is not None:
+                    with open(self.get_path(column), "ab") as column_file:
+                        column_file.write(np.array(values, dtype=dtype).tobytes())
+                    continue
+
+                encoded = [value.encode("utf-8") for value in values]
+                blob_path = self.get_path(column, "blob")
+                blob_size = (
+                    os.path.getsize(blob_path) if os.path.isfile(blob_path) else 0
+                )
+                with open(blob_path, "ab") as blob_file:
+                    blob_file.write(b"".join(encoded))
+                with open(self.get_path(column, "offsets"), "ab") as offsets_file:
+                    offsets_file.write(
+                        (
+                            blob_size
+                            + np.cumsum(
+                                [len(value) for value in encoded], dtype=np.int64
+                            )
+                        )
+                        .astype(self.OFFSET_DTYPE)
+                        .tobytes()
+                    )
+
+    def truncate(self, count: int):
+        """Cuts all column files to {count} rows, so rows which were not
+        completely written (crash during saving) are not shifted by new rows
+        (self.lock must be held)"""
+
+        for column, dtype in self.COLUMN_DTYPES.items():
+            path = self.get_path(column, "offsets" if dtype is None else "bin")
+            itemsize = (self.OFFSET_DTYPE if dtype is None else dtype).itemsize
+            if not os.path.isfile(path):
+                continue
+
+            if os.path.getsize(path) != count * itemsize:
+                os.truncate(path, count * itemsize)
+
+            if dtype is None:
+                # blob can be written without offsets
+                blob_size = 0
+                if count:
+                    with open(path, "rb") as offsets_file:
+                        offsets_file.seek((count - 1) * itemsize)
+                        blob_size = int(
+                            np.frombuffer(
+                                offsets_file.read(itemsize), self.OFFSET_DTYPE
+                            )[0]
+                        )
+                blob_path = self.get_path(column, "blob")
+                if os.path.getsize(blob_path) != blob_size:
+                    os.truncate(blob_path, blob_size)
+
+    @staticmethod
+    def map_file(path: str, dtype: np.dtype) -> np.ndarray:
+        """Memory-maps file as array (empty array if file is missing or empty)"""
+
+        if not os.path.isfile(path) or os.path.getsize(path) < dtype.itemsize:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            path,
+            dtype=dtype,
+            mode="r",
+            shape=(os.path.getsize(path) // dtype.itemsize,),
+        )
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """Memory-maps all columns. Fixed-width columns are arrays of values,
+        for string columns arrays of end offsets are returned
+        (see get_string). Columns have same length: rows which were
+        not completely written (crash during saving) are cut"""
+
+        columns = {}
+        for column, dtype in self.COLUMN_DTYPES.items():
+            if dtype is None:
+                columns[column] = self.map_file(
+                    self.get_path(column, "offsets"), self.OFFSET_DTYPE
+                )
+            else:
+                columns[column] = self.map_file(self.get_path(column), dtype)
+
+        count = min(len(values) for values in columns.values())
+        return {column: values[:count] for column, values in columns.items()}
+
+    def get_string(self, column: str, offsets: np.ndarray, index: int) -> str:
+        """Returns value of string column"""
+
+        start = int(offsets[index - 1]) if index > 0 else 0
+        with open(self.get_path(column, "blob"), "rb") as blob_file:
+            blob_file.seek(start)
+            return blob_file.read(int(offsets[index]) - start).decode("utf-8")
+
+    def decode_row(self, columns: Dict[str, np.ndarray], index: int) -> Dict:
+        """Returns history row (same as HistoryStore rows) of test {index}"""
+
+        row = {"id": index + 1}
+        for column, dtype in self.COLUMN_DTYPES.items():
+            if dtype is None:
+                value = self.get_string(column, columns[column], index)
+                row[column] = value if value != "" else None
+                continue
+
+            value = columns[column][index].item()
+            if column in self.CODED_COLUMNS:
+                value = self.meta["codes"][column][value]
+            elif column in ["start_time", "end_time"]:
+                value = ns_to_datetime(value).strftime(
+                    constants.DATE_FORMATS["history_time"]
+                )
+            elif column == "seed" and value == -1:
+                value = None
+            row[column] = value
+
+        return row
+
+    def select(self, columns: Dict[str, np.ndarray], filters: Dict) -> np.ndarray:
+        """Returns indices of tests which match filters (see query)"""
+
+        mask = np.ones(len(columns["start_time"]), dtype=bool)
+        for name, value in filters.items():
+            if name not in HISTORY_FILTERS:
+                raise ValueError(f"unknown history filter {name}")
+            if value is None:
+                continue
+
+            column, comparison = HISTORY_FILTERS[name]
+            if column in self.CODED_COLUMNS:
+                codes = self.meta["codes"][column]
+                if value not in codes:
+                    return np.empty(0, dtype=np.int64)
+                value = codes.index(value)
+            elif isinstance(value, datetime.datetime):
+                value = datetime_to_ns(value)
+            mask &= COMPARISONS[comparison](columns[column], value)
+
+        return np.flatnonzero(mask)
+
+    def query(
+        self,
+        sort_by: str = "start_time",
+        descending: bool = True,
+        limit: int | None = None,
+        offset: int = 0,
+        **filters,
+    ) -> List[Dict]:
+        """Returns saved tests (with "id") which match filters.
+        Filtering and sorting are vectorized over mapped columns,
+        only returned rows are decoded
+
+        Args:
+            sort_by (str, optional): one of HISTORY_SORT_COLUMNS
+                (tests with same value are sorted by id in same direction)
+            descending (bool, optional): sort direction
+            limit (int | None, optional): maximum amount of tests
+            offset (int, optional): amount of skipped tests
+            **filters: HISTORY_FILTERS (None values are ignored)
+        """
+
+        if sort_by not in HISTORY_SORT_COLUMNS:
+            raise ValueError(f"history can't be sorted by {sort_by}")
+
+        columns = self.load()
+        end = None if limit is None else offset + limit
+
+        if (
+            sort_by == "start_time"
+            and self.meta["time_ordered"]
+            and all(value is None for value in filters.values())
+        ):
+            # rows are already in order, page is taken without reading columns
+            count = len(columns["start_time"])
+            if descending:
+                stop = -1 if end is None else max(count - end - 1, -1)
+                indices = np.arange(count - offset - 1, stop, -1)
+            else:
+                indices = np.arange(offset, count if end is None else min(end, count))
+            return [self.decode_row(columns, int(index)) for index in indices]
+
+        indices = self.select(columns, filters)
+        keys = columns[sort_by][indices]
+        if descending:
+            keys = -keys
+
+        # only tests which can be on page (and ties of last one) are sorted
+        if end is not None and end < len(indices):
+            threshold = np.partition(keys, end - 1)[end - 1]
+            candidates = keys <= threshold
+            indices, keys = indices[candidates], keys[candidates]
+
+        # tests with same value are sorted by id in same direction
+        indices = indices[np.lexsort((-indices if descending else indices, keys))]
+        return [self.decode_row(columns, int(index)) for index in indices[offset:end]]
+
+    def get_tests(self, limit: int | None = None, offset: int = 0) -> List[Dict]:
+        """Returns saved tests (with "id"), newest first"""
+        return self.query(limit=limit, offset=offset)
+
+    def count_tests(self, **filters) -> int:
+        """Returns amount of saved tests which match filters (see query)"""
+
+        columns = self.load()
+        if not filters:
+            return len(columns["start_time"])
+        return len(self.select(columns, filters))
+
+    def import_csv(self, path: str) -> int:
+        """Imports tests from data.csv and renames file (so it is imported once),
+        returns amount of tests"""
+
+        count = convert_csv_to_columnar(path, self)
+        os.replace(path, path + ".imported")
+        return count
+
+    def close(self):
+        """Nothing to close, files are opened only while reading or writing"""
+
+
+def convert_csv_to_columnar(csv_path: str, history: ColumnarHistory) -> int:
+    """Appends tests from data.csv to columnar history, returns amount of tests"""
+
+    rows = read_csv(csv_path)
+    history.add_many(rows)
+    return len(rows)
+
+
+def convert_columnar_to_csv(history: ColumnarHistory, csv_path: str) -> int:
+    """Writes all tests to data.csv (oldest first), returns amount of tests"""
+
+    columns = history.load()
+    return write_csv(
+        csv_path,
+        (
+            history.decode_row(columns, index)
+            for index in range(len(columns["start_time"]))
+        ),
+    )
+
+
+def main(args: List[str] | None = None):
+    """Converts history between data.csv and columnar format"""
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("direction", choices=["to-csv", "from-csv"])
+    parser.add_argument("csv_path")
+    parser.add_argument("directory")
+    options = parser.parse_args(args)
+
+    history = ColumnarHistory(options.directory)
+    if options.direction == "from-csv":
+        count = convert_csv_to_columnar(options.csv_path, history)
+    else:
+        count = convert_columnar_to_csv(history, options.csv_path)
+
+    print(f"converted {count} tests")
+
+
+if __name__ == "__main__":
+    main()
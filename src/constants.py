@@ -17,6 +17,36 @@ LANGUAGE_TO_PATH = {
     "en": Path("./assets/vocabulary/en-1000.txt"),
     "ru": Path("./assets/vocabulary/ru-10000.txt"),
 }
+# compiled (normalized, binary) vocabularies
+VOCABULARY_CACHE_DIR = Path("./assets/vocabulary/cache")
+VOCABULARY = {
+    # bigger files are read from source through index (without copying words)
+    "indexed_min_bytes": 16 * 2**20,
+    # bigger vocabularies are never decoded as a whole
+    "max_materialized_words": 200_000,
+}
+# plain-text books and quote collections for "passages" text generation
+LANGUAGE_TO_BOOKS = {
+    "en": Path("./assets/books/en.txt"),
+    "ru": Path("./assets/books/ru.txt"),
+}
+PASSAGES = {
+    # shorter passages are skipped
+    "min_chars": 40,
+    # longer paragraphs are split after lines which end sentences
+    "max_chars": 400,
+}
+# plain-text corpora (books) for "markov" text generation
+LANGUAGE_TO_CORPUS = {
+    "en": Path("./assets/corpus/en.txt"),
+    "ru": Path("./assets/corpus/ru.txt"),
+}
+# trained markov models
+MARKOV_CACHE_DIR = Path("./assets/corpus/cache")
+MARKOV = {
+    # n of n-grams, next word depends on (order - 1) previous words
+    "order": 2,
+}
 LANGUAGE_LETTERS = {
     "en": "abcdefghijklmnopqrstuvwxyz",
     "ru": "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
@@ -43,8 +73,29 @@ STATISTICS_FIELD_NAMES = [
     "correct_key_presses",
     "start_time",
     "end_time",
+    # name of keystroke log file (in saves/keystrokes)
+    "keystroke_log",
+    # space separated wpm at the end of every second
+    "wpm_series",
+    # seed of text and TextGenerator settings (json), they determine text
+    "seed",
+    "generator",
 ]
 
+# filters of history queries: name -> (column, comparison),
+# start times are datetime.datetime
+HISTORY_FILTERS = {
+    "language": ("language", "=="),
+    "test_size_mode": ("test_size_mode", "=="),
+    "test_size": ("test_size", "=="),
+    "start_from": ("start_time", ">="),
+    "start_to": ("start_time", "<"),
+    "wpm_min": ("wpm", ">="),
+    "wpm_max": ("wpm", "<="),
+}
+# columns which history can be sorted by
+HISTORY_SORT_COLUMNS = ["start_time", "wpm", "accuracy"]
+
 # flet not supports russian letters in keypress
 QWERTY_NOT_RU_CHARS = "qwertyuiop[]asdfghjkl;'zxcvbnm,."
 QWERTY_RU_CHARS = "йцукенгшщзхъфывапролджэячсмитьбю"
@@ -59,44 +110,108 @@ FILE_NAMES = {
     "custom_font": "RobotoMono-VariableFont_wght.ttf",
     "language_en": "en-1000.txt",
     "language_ru": "ru-10000.txt",
+    # tests history of older versions (imported to history database once)
     "data": "data.csv",
+    "history": "history.db",
+    "history_columns_dir": "history_columns",
+    "aggregates": "aggregates.json",
     "heatmap": "heatmap.csv",
+    # errors of tests which are not compacted to heatmap.csv yet
+    "heatmap_journal": "heatmap_journal.csv",
+    "keystrokes_dir": "keystrokes",
+}
+
+HEATMAP_JOURNAL = {
+    # journal is compacted to heatmap file when it is bigger (bytes)
+    "compact_bytes": 64 * 1024,
+    # journal which is being compacted is renamed to
+    # "<journal>.<generation>.<compacting_suffix>"
+    "compacting_suffix": "compacting",
 }
 
-TYPING_TEST_DEFAULT_WORDS_ON_TIME = 120
+AGGREGATES = {
+    # amount of last results kept for every bucket
+    "last_results": 10,
+}
+
+# "sqlite" (history.db) or "columnar" (append-only binary column files)
+HISTORY_FORMAT = "sqlite"
+
+# in time mode text is generated by chunks while typing:
+# initial_words at start, chunk_words when less than refill_chars are left
+TEXT_STREAM = {"initial_words": 40, "chunk_words": 20, "refill_chars": 130}
 
 DATE_FORMATS = {
     "test_start_end_time": "%H:%M:%S.%f %d/%m/%y",
     "stats_start_end_time": "%H:%M:%S",
+    # sortable, used in history database
+    "history_time": "%Y-%m-%d %H:%M:%S.%f",
 }
 
 MAIN_TEXT_WIDTH = 1000
+# line_length is amount of RobotoMono chars (FONT_SIZE) fitting in MAIN_TEXT_WIDTH
+MAIN_TEXT_WINDOW = {"line_length": 64, "lines_before": 1, "lines_after": 1}
+# "letters" (control per char) or "spans" (run-length colored spans per line)
+MAIN_TEXT_RENDERER = "letters"
+
+# information bar is updated refresh_rate times per second during test
+TIMER = {"refresh_rate": 4}
+
+# gui changes made while typing are sent at most RENDER_MAX_FPS times per second
+RENDER_MAX_FPS = 60
 HEATMAP = {
     "size": 500,
     "border_radius": 20,
     "padding": ft.padding.only(top=10, bottom=10, right=20),
 }
 
-SETTINGS_BAR = {"spacing": 15, "padding": 10, "border_radius": 10, "width": 600}
+SETTINGS_BAR = {"spacing": 15, "padding": 10, "border_radius": 10, "width": 700}
 
 STATISTICS_PAGE = {
+    # tests loaded at once (more are loaded when list is scrolled to the end)
+    "page_size": 20,
+    # distance to end of list (pixels) when next page is loaded
+    "load_more_extent": 600,
+    "scroll_interval": 100,
     "test_content_width": 170,
     "text_stats_spacing": 2,
     "test_padding": 20,
     "test_border_radius": 10,
     "test_width": 800,
     "spacing": 10,
+    # amount of buckets shown in summary (most played first)
+    "summary_buckets": 6,
+    "summary_bucket_width": 380,
 }
 
 TEXT_GENERATOR = {
     "numbers_probability": 0.15,
     "max_number": 10_000,
     "punctuation_probability": 0.15,
+    # "uniform", "zipf" (by frequency rank) or "weights" (explicit word weights)
+    "sampling": "uniform",
+    # skew of "zipf" sampling (word with rank r has weight 1 / r^zipf_exponent)
+    "zipf_exponent": 1.0,
 }
 
+ADAPTIVE_GENERATION = {
+    # amount of worst heatmap cells which words are chosen for
+    "worst_cells": 5,
+    # share of words containing weak letters, other words are uniform
+    "targeted_share": 0.7,
+}
+
+# amount of ready texts for every settings combination
+TEXT_POOL = {"texts_per_key": 2}
+
 SETTINGS_BAR_DIVIDER_WIDTH = -3
 
 MAX_ACCURACY = 100.0
 CHARACTERS_IN_WORD = 5.0
 SECONDS_IN_MINUTE = 60.0
+NANOSECONDS_IN_SECOND = 10**9
+
+# live wpm is calculated over last window_s seconds,
+# capacity is maximum amount of key presses in window
+ROLLING_WPM = {"window_s": 5, "capacity": 512}
 DEFAULT_CPM_WITH_NO_TIME = 0.0
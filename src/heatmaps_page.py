@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import flet as ft
 from src.constants import LANGUAGE_LETTERS, color_scheme
+from src.persistence import get_writer
 from src.statistics_classes import HeatmapStatistics
 from src import constants
 
@@ -64,6 +65,8 @@ class HeatmapsPage(ft.UserControl):
     def __init__(self):
         super().__init__()
 
+        # heatmap of last test can be still in writer queue
+        get_writer().flush()
         self.stats = HeatmapStatistics()
 
         self.heatmaps = [
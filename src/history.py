@@ -0,0 +1,218 @@
+"""HistoryStore (saved tests in sqlite database) and process-wide store"""
+
+import os
+import sqlite3
+import datetime
+import threading
+from typing import Any, Dict, List, Tuple
+from src.columnar_history import ColumnarHistory
+from src.constants import HISTORY_FILTERS, HISTORY_SORT_COLUMNS, STATISTICS_FIELD_NAMES
+from src.history_csv import read_csv
+from src import constants
+
+
+class HistoryStore:
+    """
+    Saved tests (one row per test, columns are STATISTICS_FIELD_NAMES).
+    Database is in WAL mode, so saving test does not block reading history,
+    and indexed by start time, language and mode
+    """
+
+    TABLE = "tests"
+    COLUMN_TYPES = {
+        "wpm": "REAL",
+        "accuracy": "REAL",
+        "test_size_mode": "TEXT",
+        "test_size": "INTEGER",
+        "language": "TEXT",
+        "punctuation": "INTEGER",
+        "numbers": "INTEGER",
+        "total_key_presses": "INTEGER",
+        "correct_key_presses": "INTEGER",
+        "start_time": "TEXT",
+        "end_time": "TEXT",
+        "keystroke_log": "TEXT",
+        "wpm_series": "TEXT",
+        "seed": "INTEGER",
+        "generator": "TEXT",
+    }
+    INDEXES = {
+        "tests_start_time": ["start_time"],
+        "tests_language": ["language", "start_time"],
+        "tests_mode": ["test_size_mode", "test_size", "start_time"],
+        "tests_wpm": ["wpm"],
+    }
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): database file (created if missing)
+        """
+
+        self.path = path
+        # connection is shared by ui thread and timer threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.create_schema()
+
+    def create_schema(self):
+        """Creates table and indexes, adds missing columns (self.lock must be held)"""
+
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT)"
+        )
+
+        existing_columns = {
+            row["name"]
+            for row in self.connection.execute(f"PRAGMA table_info({self.TABLE})")
+        }
+        for column in STATISTICS_FIELD_NAMES:
+            if column not in existing_columns:
+                self.connection.execute(
+                    f"ALTER TABLE {self.TABLE} ADD COLUMN {column} "
+                    + self.COLUMN_TYPES.get(column, "")
+                )
+
+        for name, columns in self.INDEXES.items():
+            self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} "
+                f"ON {self.TABLE} ({', '.join(columns)})"
+            )
+
+    def add(self, row: Dict[str, Any]) -> int:
+        """Saves test (keys of row are STATISTICS_FIELD_NAMES), returns its id"""
+
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                f"INSERT INTO {self.TABLE} ({', '.join(STATISTICS_FIELD_NAMES)}) "
+                f"VALUES ({', '.join('?' for _ in STATISTICS_FIELD_NAMES)})",
+                [row.get(column) for column in STATISTICS_FIELD_NAMES],
+            )
+        return cursor.lastrowid
+
+    @staticmethod
+    def get_condition(filters: Dict[str, Any]) -> Tuple[str, List]:
+        """Returns WHERE clause (empty without filters) and its parameters"""
+
+        conditions, parameters = [], []
+        for name, value in filters.items():
+            if name not in HISTORY_FILTERS:
+                raise ValueError(f"unknown history filter {name}")
+            if value is None:
+                continue
+
+            column, comparison = HISTORY_FILTERS[name]
+            if isinstance(value, datetime.datetime):
+                value = value.strftime(constants.DATE_FORMATS["history_time"])
+            conditions.append(f"{column} {comparison} ?")
+            parameters.append(value)
+
+        if not conditions:
+            return "", parameters
+        return "WHERE " + " AND ".join(conditions), parameters
+
+    def query(
+        self,
+        sort_by: str = "start_time",
+        descending: bool = True,
+        limit: int | None = None,
+        offset: int = 0,
+        **filters,
+    ) -> List[Dict]:
+        """Returns saved tests (with "id") which match filters
+
+        Args:
+            sort_by (str, optional): one of HISTORY_SORT_COLUMNS
+                (tests with same value are sorted by id in same direction)
+            descending (bool, optional): sort direction
+            limit (int | None, optional): maximum amount of tests
+            offset (int, optional): amount of skipped tests
+            **filters: HISTORY_FILTERS (None values are ignored)
+        """
+
+        if sort_by not in HISTORY_SORT_COLUMNS:
+            raise ValueError(f"history can't be sorted by {sort_by}")
+
+        condition, parameters = self.get_condition(filters)
+        direction = "DESC" if descending else "ASC"
+
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT * FROM {self.TABLE} {condition} "
+                f"ORDER BY {sort_by} {direction}, id {direction} LIMIT ? OFFSET ?",
+                parameters + [-1 if limit is None else limit, offset],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_tests(self, limit: int | None = None, offset: int = 0) -> List[Dict]:
+        """Returns saved tests (with "id"), newest first"""
+        return self.query(limit=limit, offset=offset)
+
+    def count_tests(self, **filters) -> int:
+        """Returns amount of saved tests which match filters (see query)"""
+
+        condition, parameters = self.get_condition(filters)
+        with self.lock:
+            return self.connection.execute(
+                f"SELECT COUNT(*) FROM {self.TABLE} {condition}", parameters
+            ).fetchone()[0]
+
+    def import_csv(self, path: str) -> int:
+        """Imports tests from data.csv of older versions in one transaction
+        and renames file (so it is imported once), returns amount of tests"""
+
+        rows = read_csv(path)
+
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT INTO {self.TABLE} ({', '.join(STATISTICS_FIELD_NAMES)}) "
+                f"VALUES ({', '.join('?' for _ in STATISTICS_FIELD_NAMES)})",
+                [
+                    [row.get(column) for column in STATISTICS_FIELD_NAMES]
+                    for row in rows
+                ],
+            )
+
+        os.replace(path, path + ".imported")
+        return len(rows)
+
+    def close(self):
+        """Closes database"""
+
+        with self.lock:
+            self.connection.close()
+
+
+_history_store: HistoryStore | ColumnarHistory | None = None
+_history_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore | ColumnarHistory:
+    """Returns history store of format HISTORY_FORMAT (opened once per process),
+    existing saves/data.csv is imported when store is opened first time"""
+
+    global _history_store
+
+    with _history_store_lock:
+        if _history_store is None:
+            os.makedirs("./saves", exist_ok=True)
+            if constants.HISTORY_FORMAT == "columnar":
+                _history_store = ColumnarHistory(
+                    "./saves/" + constants.FILE_NAMES["history_columns_dir"]
+                )
+            else:
+                _history_store = HistoryStore(
+                    "./saves/" + constants.FILE_NAMES["history"]
+                )
+
+            csv_path = "./saves/" + constants.FILE_NAMES["data"]
+            if os.path.isfile(csv_path):
+                _history_store.import_csv(csv_path)
+
+        return _history_store
@@ -0,0 +1,68 @@
+"""Reading and writing tests history in data.csv format of older versions"""
+
+import datetime
+from csv import DictReader, DictWriter
+from typing import Any, Dict, Iterable, List
+from src.constants import STATISTICS_FIELD_NAMES
+from src import constants
+
+INTEGER_COLUMNS = ["test_size", "total_key_presses", "correct_key_presses", "seed"]
+REAL_COLUMNS = ["wpm", "accuracy"]
+BOOLEAN_COLUMNS = ["punctuation", "numbers"]
+TIME_COLUMNS = ["start_time", "end_time"]
+
+
+def convert_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Converts csv row (all values are strings) to history row"""
+
+    converted = {}
+    for column in STATISTICS_FIELD_NAMES:
+        value = row.get(column)
+        if value is None or value == "":
+            converted[column] = None
+        elif column in TIME_COLUMNS:
+            converted[column] = datetime.datetime.strptime(
+                value, constants.DATE_FORMATS["test_start_end_time"]
+            ).strftime(constants.DATE_FORMATS["history_time"])
+        elif column in BOOLEAN_COLUMNS:
+            converted[column] = value == "True"
+        elif column in INTEGER_COLUMNS:
+            # pandas wrote integer columns with empty cells as floats
+            converted[column] = int(float(value))
+        elif column in REAL_COLUMNS:
+            converted[column] = float(value)
+        else:
+            converted[column] = value
+
+    return converted
+
+
+def read_csv(path: str) -> List[Dict[str, Any]]:
+    """Returns history rows of data.csv"""
+
+    with open(path, "r", newline="", encoding="utf-8") as csv_file:
+        return [convert_csv_row(row) for row in DictReader(csv_file)]
+
+
+def write_csv(path: str, rows: Iterable[Dict[str, Any]]) -> int:
+    """Writes history rows to data.csv, returns amount of rows"""
+
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = DictWriter(
+            csv_file, fieldnames=STATISTICS_FIELD_NAMES, extrasaction="ignore"
+        )
+        writer.writeheader()
+
+        for row in rows:
+            row = dict(row)
+            for column in TIME_COLUMNS:
+                row[column] = datetime.datetime.strptime(
+                    row[column], constants.DATE_FORMATS["history_time"]
+                ).strftime(constants.DATE_FORMATS["test_start_end_time"])
+            for column in BOOLEAN_COLUMNS:
+                row[column] = bool(row[column])
+            writer.writerow(row)
+            count += 1
+
+    return count
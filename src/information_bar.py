@@ -2,6 +2,7 @@
 
 import flet as ft
 from src.constants import color_scheme
+from src.render_scheduler import RenderScheduler, send_updates
 
 
 class InformationBar(ft.UserControl):
@@ -25,8 +26,13 @@ class InformationBar(ft.UserControl):
         def build(self):
             return self.element
 
-    def __init__(self):
+    def __init__(self, render_scheduler: RenderScheduler | None = None):
+        self.render_scheduler = render_scheduler
+
         self.wpm = self.TextElement(value="000.0", color=color_scheme["primary"])
+        self.rolling_wpm = self.TextElement(
+            value="000.0", color=color_scheme["primary"]
+        )
         self.accuracy = self.TextElement(value="100.0", color=color_scheme["primary"])
 
         self.content = ft.Row(
@@ -34,6 +40,9 @@ class InformationBar(ft.UserControl):
                 self.TextElement(value="WPM:", color=color_scheme["tertiary"]),
                 self.wpm,
                 ft.VerticalDivider(),
+                self.TextElement(value="Now:", color=color_scheme["tertiary"]),
+                self.rolling_wpm,
+                ft.VerticalDivider(),
                 self.TextElement(value="Accuracy:", color=color_scheme["tertiary"]),
                 self.accuracy,
             ],
@@ -45,7 +54,7 @@ class InformationBar(ft.UserControl):
             self.content,
             padding=10,
             border_radius=10,
-            width=520,
+            width=680,
             bgcolor=color_scheme["nav_background"],
             alignment=ft.alignment.center,
         )
@@ -55,12 +64,17 @@ class InformationBar(ft.UserControl):
     def set_wpm(self, value: str):
         """Update displayed accuracy information"""
         self.wpm.element.value = value
-        self.wpm.update()
+        send_updates(self.render_scheduler, self.wpm)
+
+    def set_rolling_wpm(self, value: str):
+        """Update displayed wpm over last seconds"""
+        self.rolling_wpm.element.value = value
+        send_updates(self.render_scheduler, self.rolling_wpm)
 
     def set_accuracy(self, value: str):
         """Update displayed accuracy information"""
         self.accuracy.element.value = f"{value}%"
-        self.accuracy.update()
+        send_updates(self.render_scheduler, self.accuracy)
 
     def build(self):
         return self.container
@@ -0,0 +1,332 @@
+"""Word-level n-gram (Markov) model and process-wide model store"""
+
+import os
+import mmap
+import struct
+import string
+import threading
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from src.persistence import write_atomically
+from src.vocabulary import Vocabulary, normalize_word
+from src import constants
+
+# stripped from corpus words before normalization
+CORPUS_PUNCTUATION = string.punctuation + "«»—–…“”„"
+
+
+def tokenize(line: str) -> List[str | None]:
+    """Returns normalized words of corpus line (None for words which break chain)"""
+
+    tokens = []
+    for raw_word in line.split():
+        word = normalize_word(raw_word.strip(CORPUS_PUNCTUATION))
+        tokens.append(word if word is not None and word.isalpha() else None)
+
+    return tokens
+
+
+class MarkovModel:
+    """
+    Word-level n-gram model. Transitions are stored in CSR layout:
+    successors of context in row r are successors[indptr[r] : indptr[r + 1]],
+    contexts (previous order - 1 words) are encoded to sorted context_keys.
+    cumulative is running sum of transition counts through all rows,
+    so next word is found with one binary search (for many texts at once)
+    """
+
+    # magic, version, order, words, contexts, transitions, source size and mtime
+    HEADER = struct.Struct("<4sHHIIIqq")
+    MAGIC = b"TMKV"
+    VERSION = 1
+    INT_DTYPE = np.dtype("<i8")
+
+    def __init__(
+        self,
+        order: int,
+        words: Vocabulary,
+        context_keys: np.ndarray,
+        indptr: np.ndarray,
+        successors: np.ndarray,
+        cumulative: np.ndarray,
+        source: mmap.mmap | None = None,
+    ):
+        """
+        Args:
+            order (int): n of n-grams (context is order - 1 previous words)
+            words (Vocabulary): all words of model
+            context_keys (np.ndarray): sorted encoded contexts (row of every context)
+            indptr (np.ndarray): start of every row in successors (and end of last)
+            successors (np.ndarray): ids of next words
+            cumulative (np.ndarray): running sum of transition counts
+            source (mmap.mmap | None, optional): mapped file (kept open)
+        """
+
+        self.order = order
+        self.words = words
+        self.context_keys = context_keys
+        self.indptr = indptr
+        self.successors = successors
+        self.cumulative = cumulative
+        self.source = source
+
+    def __len__(self) -> int:
+        """Returns amount of contexts"""
+        return len(self.context_keys)
+
+    def encode_contexts(self, contexts: np.ndarray) -> np.ndarray:
+        """Encodes contexts (array of shape (k, order - 1)) to keys"""
+
+        keys = np.zeros(len(contexts), dtype=np.int64)
+        for position in range(self.order - 1):
+            keys = keys * len(self.words) + contexts[:, position]
+        return keys
+
+    def decode_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Returns contexts (shape (k, order - 1)) of rows"""
+
+        keys = self.context_keys[rows].astype(np.int64)
+        contexts = np.zeros((len(rows), self.order - 1), dtype=np.int64)
+        for position in reversed(range(self.order - 1)):
+            keys, contexts[:, position] = np.divmod(keys, len(self.words))
+        return contexts
+
+    def random_contexts(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """Returns contexts of random rows (used to start texts)"""
+        return self.decode_rows(rng.integers(0, len(self), size=count))
+
+    def step(
+        self, contexts: np.ndarray, rng: np.random.Generator
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Draws next word for every context
+
+        Args:
+            contexts (np.ndarray): current contexts, shape (k, order - 1)
+            rng (np.random.Generator): random generator
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: ids of next words and next contexts
+        """
+
+        keys = self.encode_contexts(contexts)
+        rows = np.minimum(np.searchsorted(self.context_keys, keys), len(self) - 1)
+
+        # context has no successors (end of corpus): text continues from random one
+        dead_ends = self.context_keys[rows] != keys
+        if dead_ends.any():
+            rows[dead_ends] = rng.integers(0, len(self), size=int(dead_ends.sum()))
+            contexts = contexts.copy()
+            contexts[dead_ends] = self.decode_rows(rows[dead_ends])
+
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lows = np.where(starts > 0, self.cumulative[np.maximum(starts - 1, 0)], 0)
+        highs = self.cumulative[ends - 1]
+
+        draws = lows + (rng.random(len(rows)) * (highs - lows)).astype(np.int64)
+        words = self.successors[
+            np.searchsorted(self.cumulative, draws, side="right")
+        ].astype(np.int64)
+
+        return words, np.column_stack([contexts[:, 1:], words])
+
+    @classmethod
+    def train(cls, lines: Iterable[str], order: int = 2) -> "MarkovModel":
+        """Counts n-grams of corpus (streaming, memory depends only on
+        amount of different n-grams) and builds transition tables"""
+
+        if order < 2:
+            raise ValueError("order of markov model must be at least 2")
+
+        word_ids: Dict[str, int] = {}
+        counts: Counter = Counter()
+        history: List[int] = []
+
+        for line in lines:
+            for word in tokenize(line):
+                if word is None:
+                    history.clear()
+                    continue
+
+                history.append(word_ids.setdefault(word, len(word_ids)))
+                if len(history) > order:
+                    history.pop(0)
+                if len(history) == order:
+                    counts[tuple(history)] += 1
+
+        if not counts:
+            raise ValueError("corpus has no n-grams")
+        if len(word_ids) ** (order - 1) >= 2**63:
+            raise ValueError("too many words for markov model of this order")
+
+        words = Vocabulary.from_words(list(word_ids))
+        ngrams = np.array(list(counts.keys()), dtype=np.int64).reshape(-1, order)
+        ngram_counts = np.array(list(counts.values()), dtype=np.int64)
+
+        model = cls(order, words, None, None, None, None)
+        keys = model.encode_contexts(ngrams[:, :-1])
+        transitions_order = np.lexsort((ngrams[:, -1], keys))
+        keys = keys[transitions_order]
+
+        # first transition of every row
+        row_starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+
+        model.context_keys = keys[row_starts]
+        model.indptr = np.append(row_starts, len(keys)).astype(cls.INT_DTYPE)
+        model.successors = ngrams[transitions_order, -1]
+        model.cumulative = np.cumsum(ngram_counts[transitions_order])
+
+        return model
+
+    @classmethod
+    def compile(cls, source_path: Path, cache_path: Path, order: int = 2):
+        """Trains model on corpus file and writes binary cache file"""
+
+        with open(source_path, "r", encoding="utf8") as source_file:
+            model = cls.train(source_file, order=order)
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        write_atomically(str(cache_path), partial(model.write, os.stat(source_path)))
+
+    def write(self, source_stat: os.stat_result, path: str):
+        """Writes model to binary file"""
+
+        with open(path, "wb") as cache_file:
+            cache_file.write(
+                self.HEADER.pack(
+                    self.MAGIC,
+                    self.VERSION,
+                    self.order,
+                    len(self.words),
+                    len(self),
+                    len(self.successors),
+                    source_stat.st_size,
+                    source_stat.st_mtime_ns,
+                )
+            )
+            for values in [
+                self.context_keys,
+                self.indptr,
+                self.successors,
+                self.cumulative,
+                self.words.offsets,
+            ]:
+                cache_file.write(values.astype(self.INT_DTYPE).tobytes())
+            cache_file.write(self.words.blob)
+
+    @classmethod
+    def load(
+        cls, cache_path: Path, source_path: Path | None = None, order: int | None = None
+    ) -> "MarkovModel":
+        """Memory-maps binary cache file
+
+        Args:
+            cache_path (Path): compiled model
+            source_path (Path | None, optional): if set, raises ValueError
+                when cache was compiled from other version of source file
+            order (int | None, optional): if set, raises ValueError
+                when cache was compiled with other order
+        """
+
+        with open(cache_path, "rb") as cache_file:
+            source = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(source) < cls.HEADER.size:
+            source.close()
+            raise ValueError(f"{cache_path} is not a markov model file")
+
+        (
+            magic,
+            version,
+            model_order,
+            words_count,
+            contexts_count,
+            transitions_count,
+            source_size,
+            source_mtime_ns,
+        ) = cls.HEADER.unpack_from(source)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            source.close()
+            raise ValueError(f"{cache_path} is not a markov model file")
+        if order is not None and order != model_order:
+            source.close()
+            raise ValueError(f"{cache_path} has other order")
+
+        if source_path is not None:
+            source_stat = os.stat(source_path)
+            if (source_stat.st_size, source_stat.st_mtime_ns) != (
+                source_size,
+                source_mtime_ns,
+            ):
+                source.close()
+                raise ValueError(f"{cache_path} is outdated")
+
+        arrays = []
+        offset = cls.HEADER.size
+        for count in [
+            contexts_count,
+            contexts_count + 1,
+            transitions_count,
+            transitions_count,
+            words_count + 1,
+        ]:
+            arrays.append(
+                np.frombuffer(source, dtype=cls.INT_DTYPE, count=count, offset=offset)
+            )
+            offset += arrays[-1].nbytes
+
+        context_keys, indptr, successors, cumulative, word_offsets = arrays
+        words = Vocabulary(word_offsets, memoryview(source)[offset:])
+
+        return cls(
+            model_order,
+            words,
+            context_keys,
+            indptr,
+            successors,
+            cumulative,
+            source=source,
+        )
+
+
+def get_cache_path(source_path: Path, order: int) -> Path:
+    """Returns path of binary cache for corpus file"""
+    return Path(constants.MARKOV_CACHE_DIR) / f"{Path(source_path).name}.{order}.mkv"
+
+
+_models: Dict[Tuple[str, int], MarkovModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_markov_model(
+    source_path: Path, order: int = constants.MARKOV["order"]
+) -> MarkovModel:
+    """Returns model of corpus file, it is loaded once per process
+    (from binary cache, which is compiled if missing or outdated)"""
+
+    if not os.path.isfile(source_path):
+        raise FileNotFoundError(
+            f"corpus {source_path} is missing, "
+            "markov sampling needs a text file there (see LANGUAGE_TO_CORPUS)"
+        )
+
+    key = (os.path.abspath(source_path), order)
+
+    with _models_lock:
+        if key not in _models:
+            cache_path = get_cache_path(source_path, order)
+            try:
+                model = MarkovModel.load(
+                    cache_path, source_path=source_path, order=order
+                )
+            except (OSError, ValueError):
+                MarkovModel.compile(source_path, cache_path, order=order)
+                model = MarkovModel.load(
+                    cache_path, source_path=source_path, order=order
+                )
+
+            _models[key] = model
+
+        return _models[key]
@@ -0,0 +1,67 @@
+"""Inverted index from letters and letter pairs to words"""
+
+from typing import Dict, Iterable, Tuple
+import numpy as np
+
+
+class NgramIndex:
+    """
+    Maps every letter and bigram to ids of words which contain it.
+    Lists of ids are stored in one array (CSR layout):
+    ids of words with n-gram in row r are word_ids[indptr[r] : indptr[r + 1]]
+    """
+
+    def __init__(self, rows: Dict[str, int], indptr: np.ndarray, word_ids: np.ndarray):
+        """
+        Args:
+            rows (Dict[str, int]): row of every n-gram
+            indptr (np.ndarray): start of every row in word_ids (and end of last row)
+            word_ids (np.ndarray): ids of words, sorted by row
+        """
+
+        self.rows = rows
+        self.indptr = indptr
+        self.word_ids = word_ids
+
+    def __contains__(self, ngram: str) -> bool:
+        return ngram in self.rows
+
+    def get_bounds(self, ngram: str) -> Tuple[int, int]:
+        """Returns start and end of n-gram's row in word_ids ((0, 0) if unknown)"""
+
+        if ngram not in self.rows:
+            return 0, 0
+        row = self.rows[ngram]
+        return int(self.indptr[row]), int(self.indptr[row + 1])
+
+    def get_words(self, ngram: str) -> np.ndarray:
+        """Returns ids of words which contain n-gram"""
+
+        start, end = self.get_bounds(ngram)
+        return self.word_ids[start:end]
+
+    @classmethod
+    def from_words(cls, words: Iterable[str], max_length: int = 2) -> "NgramIndex":
+        """Builds index of all n-grams with length up to max_length"""
+
+        rows: Dict[str, int] = {}
+        pair_rows = []
+        pair_words = []
+
+        for word_id, word in enumerate(words):
+            ngrams = {
+                word[start : start + length]
+                for length in range(1, max_length + 1)
+                for start in range(len(word) - length + 1)
+            }
+            for ngram in ngrams:
+                pair_rows.append(rows.setdefault(ngram, len(rows)))
+                pair_words.append(word_id)
+
+        pair_rows = np.array(pair_rows, dtype=np.int64)
+        order = np.argsort(pair_rows, kind="stable")
+
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_rows, minlength=len(rows)), out=indptr[1:])
+
+        return cls(rows, indptr, np.array(pair_words, dtype=np.int64)[order])
@@ -0,0 +1,120 @@
+"""Index of passages (paragraphs) of big text files"""
+
+from array import array
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+from src.vocabulary import IndexedVocabulary, get_vocabulary
+from src import constants
+
+SENTENCE_ENDS = ".?!"
+
+
+def normalize_passage(text: str) -> str:
+    """Returns lowercased passage with all whitespace replaced with single spaces"""
+    return " ".join(text.split()).lower()
+
+
+def is_allowed(passage: str) -> bool:
+    """Checks that normalized passage can be typed"""
+    return all(char in constants.ALLOWED_CHARS for char in passage)
+
+
+class PassageIndex(IndexedVocabulary):
+    """
+    Passages of book or quotes file. Only bounds of passages are persisted,
+    passage is read from memory-mapped source file by its offset,
+    so neither building index nor picking passage keeps file in memory
+    """
+
+    MAGIC = b"TPIX"
+    CACHE_SUFFIX = ".pidx"
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("passage index out of range")
+
+        return normalize_passage(
+            self.blob[int(self.offsets[index]) : int(self.ends[index])].decode("utf-8")
+        )
+
+    def iterate_words(self, start: int) -> Iterator[str]:
+        """Infinitely yields words of passages starting with passage {start}
+        (passages go in order of file, like in book)"""
+
+        index = start
+        while True:
+            yield from self[index].split()
+            index = (index + 1) % len(self)
+
+    @classmethod
+    def compile(cls, source_path: Path, cache_path: Path):
+        """Finds bounds of passages in one streaming pass and writes them to index.
+        Passages are paragraphs (separated with empty lines), long paragraphs
+        are split after lines which end sentences, passages with chars
+        not from ALLOWED_CHARS are skipped"""
+
+        starts, ends = array("Q"), array("Q")
+
+        # only current passage is kept in memory
+        passage_start, passage_end = None, None
+        passage_lines = []
+        passage_length = 0
+
+        def flush():
+            nonlocal passage_start, passage_end, passage_length
+            passage = normalize_passage(" ".join(passage_lines))
+            if constants.PASSAGES["min_chars"] <= len(passage) <= constants.PASSAGES[
+                "max_chars"
+            ] and is_allowed(passage):
+                starts.append(passage_start)
+                ends.append(passage_end)
+
+            passage_start, passage_end = None, None
+            passage_lines.clear()
+            passage_length = 0
+
+        with open(source_path, "rb") as source_file:
+            position = 0
+            for line in source_file:
+                stripped = line.strip()
+
+                if not stripped:
+                    if passage_lines:
+                        flush()
+                elif passage_length > 2 * constants.PASSAGES["max_chars"]:
+                    # paragraph has no sentence ends, skipped until its end
+                    pass
+                else:
+                    text = stripped.decode("utf-8", errors="replace")
+                    if passage_start is None:
+                        passage_start = position + len(line) - len(line.lstrip())
+                    passage_end = position + len(line.rstrip())
+                    passage_lines.append(text)
+                    passage_length += len(text) + 1
+
+                    if (
+                        passage_length >= constants.PASSAGES["max_chars"] // 2
+                        and text[-1] in SENTENCE_ENDS
+                    ):
+                        flush()
+
+                position += len(line)
+
+        if passage_lines:
+            flush()
+
+        cls.write_cache(
+            source_path,
+            cache_path,
+            len(starts),
+            np.frombuffer(starts, dtype=np.uint64).astype(cls.OFFSET_DTYPE).tobytes(),
+            np.frombuffer(ends, dtype=np.uint64).astype(cls.OFFSET_DTYPE).tobytes(),
+        )
+
+
+def get_passage_index(source_path: Path) -> PassageIndex:
+    """Returns passage index of file (loaded once per process)"""
+    return get_vocabulary(source_path, PassageIndex)
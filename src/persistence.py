@@ -0,0 +1,129 @@
+"""Realizes PersistenceWriter (write-behind of saves) and atomic file writes"""
+
+import os
+import json
+import atexit
+import threading
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Iterable
+
+
+def write_atomically(path: str, write: Callable[[str], None]):
+    """Writes file through temporary file which replaces it,
+    so readers see either old or new file, never half of it
+
+    Args:
+        path (str): written file
+        write (Callable[[str], None]): writes content to given (temporary) path
+    """
+
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(temporary_path)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def write_json(values: Any, path: str):
+    """Writes values to json file (for write_atomically)"""
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(values, file)
+
+
+def write_parts(parts: Iterable[bytes], path: str):
+    """Writes bytes-like parts to binary file (for write_atomically)"""
+
+    with open(path, "wb") as file:
+        for part in parts:
+            file.write(part)
+
+
+class PersistenceWriter:
+    """
+    Runs all saving jobs in order in one background thread,
+    so saving test never blocks ui event path.
+    Jobs must own their data (snapshot it before submit)
+    """
+
+    def __init__(self):
+        self.jobs: Deque[Callable[[], None]] = deque()
+        # amount of submitted and finished jobs, flush waits until they are equal
+        self.submitted = 0
+        self.finished = 0
+        self.condition = threading.Condition()
+        self.stopped = False
+
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+    def submit(self, job: Callable[[], None]):
+        """Queues job (runs it immediately if writer is closed)"""
+
+        with self.condition:
+            if not self.stopped:
+                self.jobs.append(job)
+                self.submitted += 1
+                self.condition.notify_all()
+                return
+
+        job()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until all jobs submitted before are finished,
+        returns False if timeout run out"""
+
+        with self.condition:
+            target = self.submitted
+            return self.condition.wait_for(
+                lambda: self.finished >= target, timeout=timeout
+            )
+
+    def work(self):
+        """Worker thread loop, runs queued jobs"""
+
+        while True:
+            with self.condition:
+                while not self.jobs and not self.stopped:
+                    self.condition.wait()
+                if not self.jobs:
+                    return
+                job = self.jobs.popleft()
+
+            try:
+                job()
+            except Exception:
+                # failed save must not stop saving of next tests
+                traceback.print_exc()
+
+            with self.condition:
+                self.finished += 1
+                self.condition.notify_all()
+
+    def close(self):
+        """Finishes queued jobs and stops worker thread"""
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.worker.join()
+
+
+_writer: PersistenceWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> PersistenceWriter:
+    """Returns process-wide writer, it is flushed when process exits"""
+
+    global _writer
+
+    with _writer_lock:
+        if _writer is None:
+            _writer = PersistenceWriter()
+            atexit.register(_writer.close)
+
+        return _writer
@@ -0,0 +1,71 @@
+"""Realizes RenderScheduler"""
+
+import threading
+import time
+from typing import List
+import flet as ft
+from src import constants
+
+
+class RenderScheduler:
+    """
+    Collects changed (dirty) controls and sends them to gui
+    with one page.update() per frame, so bursts of key presses
+    are collapsed into one render
+    """
+
+    def __init__(self, page: ft.Page, max_fps: float = constants.RENDER_MAX_FPS):
+        self.page = page
+        self.frame_interval = 1.0 / max_fps
+
+        self.dirty_controls: List[ft.Control] = []
+        self.last_flush_time = 0.0
+        self.flush_timer: threading.Timer | None = None
+        self.lock = threading.Lock()
+
+    def mark_dirty(self, *controls: ft.Control):
+        """Schedules controls to be updated with next frame"""
+
+        with self.lock:
+            for control in controls:
+                if all(control is not dirty for dirty in self.dirty_controls):
+                    self.dirty_controls.append(control)
+
+            if self.flush_timer is not None:
+                return
+
+            delay = max(
+                0.0, self.last_flush_time + self.frame_interval - time.perf_counter()
+            )
+            self.flush_timer = threading.Timer(delay, self.flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def flush(self):
+        """Sends all dirty controls to gui with one update"""
+
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+
+            # controls removed from page (e.g. rebuilt content) are skipped
+            controls = [
+                control for control in self.dirty_controls if control.page is not None
+            ]
+            self.dirty_controls = []
+            self.last_flush_time = time.perf_counter()
+
+        if len(controls) != 0:
+            self.page.update(*controls)
+
+
+def send_updates(render_scheduler: RenderScheduler | None, *controls: ft.Control):
+    """Sends changed controls to gui, through render scheduler if it is given"""
+
+    if render_scheduler is not None:
+        render_scheduler.mark_dirty(*controls)
+        return
+
+    for control in controls:
+        control.update()
@@ -0,0 +1,73 @@
+"""Weighted sampling with alias tables"""
+
+import random
+import numpy as np
+
+
+def zipf_weights(count: int, exponent: float = 1.0) -> np.ndarray:
+    """Returns Zipf weights for ranks 1..count (1 / rank^exponent)"""
+    return 1.0 / np.arange(1, count + 1, dtype=np.float64) ** exponent
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table: built in O(n) once,
+    then every draw of index with given weights is O(1)
+    """
+
+    def __init__(self, weights: np.ndarray):
+        """
+        Args:
+            weights (np.ndarray): non-negative weights (not all zero)
+        """
+
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(weights) == 0 or weights.min() < 0 or weights.sum() <= 0:
+            raise ValueError("weights must be non-negative and not all zero")
+
+        count = len(weights)
+        scaled = (weights * count / weights.sum()).tolist()
+
+        # probability to keep drawn column and index which is taken otherwise
+        probabilities = [1.0] * count
+        aliases = list(range(count))
+
+        small = [index for index, weight in enumerate(scaled) if weight < 1.0]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1.0]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+
+            scaled[more] += scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+        self.probabilities = np.array(probabilities, dtype=np.float64)
+        self.aliases = np.array(aliases, dtype=np.int64)
+
+        # lists are used for single draws (faster than indexing numpy arrays)
+        self.probabilities_list = probabilities
+        self.aliases_list = aliases
+
+    def __len__(self) -> int:
+        return len(self.probabilities)
+
+    def sample_one(self, rng: random.Random = random) -> int:
+        """Draws one index"""
+
+        column = rng.randrange(len(self.probabilities_list))
+        if rng.random() < self.probabilities_list[column]:
+            return column
+        return self.aliases_list[column]
+
+    def sample(self, rng: np.random.Generator, size) -> np.ndarray:
+        """Draws array of indices with given shape"""
+
+        columns = rng.integers(0, len(self), size=size)
+        keep = rng.random(size) < self.probabilities[columns]
+        return np.where(keep, columns, self.aliases[columns])
@@ -72,6 +72,9 @@ class SettingsBar(ft.UserControl):
         self.numbers = self.LabeledButton(
             "numbers", is_on=False, on_click=self.toggle_numbers
         )
+        self.adaptive_button = self.LabeledButton(
+            "adaptive", is_on=False, on_click=self.toggle_adaptive
+        )
         self.time = self.LabeledButton(
             "time", is_on=not words_selected, on_click=self.select_time
         )
@@ -90,6 +93,7 @@ class SettingsBar(ft.UserControl):
                 ft.VerticalDivider(width=constants.SETTINGS_BAR_DIVIDER_WIDTH),
                 self.punctuation,
                 self.numbers,
+                self.adaptive_button,
                 ft.VerticalDivider(width=constants.SETTINGS_BAR_DIVIDER_WIDTH),
                 self.time,
                 self.words,
@@ -127,6 +131,13 @@ class SettingsBar(ft.UserControl):
         self.numbers.toggle()
         self.numbers.update()
 
+    def toggle_adaptive(self, _):
+        """Toggles adaptive words sampling"""
+        self.typing_test.toggle_adaptive()
+
+        self.adaptive_button.toggle()
+        self.adaptive_button.update()
+
     def select_time(self, _, button_idx: int = 1):
         """Updates mode and text length"""
 
@@ -169,6 +180,41 @@ class SettingsBar(ft.UserControl):
         self.language = new_language
         self.typing_test.set_language(new_language)
 
+    def show_settings(self):
+        """Updates buttons to current settings of typing test
+        (e.g. after they were restored to retry saved test)"""
+
+        text_generator = self.typing_test.text_generator
+        self.words_selected = self.typing_test.size_mode == "words"
+
+        self.language = self.typing_test.language
+        self.language_button.text = self.language
+        self.punctuation.is_on = text_generator.punctuation
+        self.numbers.is_on = text_generator.numbers
+        self.adaptive_button.is_on = text_generator.sampling == "adaptive"
+        self.words.is_on = self.words_selected
+        self.time.is_on = not self.words_selected
+
+        sizes, size = (
+            (DEFAULT_WORDS_COUNT, self.typing_test.words_to_generate)
+            if self.words_selected
+            else (DEFAULT_TIMES, self.typing_test.available_time)
+        )
+        # size of saved test can be not one of default sizes
+        self.selected_size_option = sizes.index(size) if size in sizes else -1
+        self.update_buttons()
+
+        for button in [
+            self.language_button,
+            self.punctuation,
+            self.numbers,
+            self.adaptive_button,
+            self.time,
+            self.words,
+        ]:
+            button.update()
+        self.content.update()
+
     def update_buttons(self):
         """Returns content for container"""
 
@@ -0,0 +1,448 @@
+"""
+Headless keystroke simulator and load driver for TypingTest
+
+Usage: python -m src.simulator --wpm 120 --error-rate 0.05 --words 100 --tests 10
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from array import array
+from contextlib import ExitStack
+from typing import Dict, Iterable, Iterator, List, Tuple
+from unittest.mock import patch
+import flet as ft
+from flet_core.connection import Connection
+from flet_core.protocol import CommandEncoder, PageCommandsBatchResponsePayload
+
+from src import constants
+from src.statistics_classes import HeatmapStatistics, KeystrokeLog, Statistics
+from src.text_visualizing import LetterColor, MainText, TextRenderer
+from src.typing_test import TypingTest
+from src.utils import load_assets
+
+# key (as flet sends it) and delay before pressing it (in nanoseconds)
+SimulatedKey = Tuple[str, int]
+
+BACKSPACE_KEY = "Backspace"
+
+
+class HeadlessPage:
+    """Page replacement which is enough for TypingTest to work without gui"""
+
+    class View:
+        """View replacement (for code which expects page to have views)"""
+
+        def __init__(self):
+            self.controls = []
+
+        def update(self):
+            pass
+
+    def __init__(self):
+        self.views = [self.View()]
+        self.route = "/"
+
+    def update(self, *_controls):
+        pass
+
+    def go(self, route: str):
+        self.route = route
+
+
+class RecordingConnection(Connection):
+    """
+    Connection of real flet page which sends nothing,
+    but counts bytes of commands serialized as for flet client
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.sent_bytes = 0
+        self.next_id = 0
+
+    def send_command(self, session_id: str, command):
+        return self.send_commands(session_id, [command])
+
+    def send_commands(self, session_id: str, commands: List):
+        self.sent_bytes += len(json.dumps(commands, cls=CommandEncoder))
+
+        # client answers with ids of added controls (one per add command line)
+        results = []
+        for command in commands:
+            if command.name == "add":
+                ids = [
+                    f"_{self.next_id + index}" for index in range(len(command.commands))
+                ]
+                self.next_id += len(ids)
+                results.append(" ".join(ids))
+
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+def compare_renderers(
+    text: str, typed: str | None = None
+) -> Dict[TextRenderer, Dict[str, int]]:
+    """Renders text with every renderer on page with RecordingConnection
+    and types it letter by letter
+
+    Args:
+        text (str): text of test
+        typed (str | None, optional): typed chars (text itself if None)
+
+    Returns:
+        Dict[TextRenderer, Dict[str, int]]: get_render_stats() with bytes
+            of first render (initial_patch_bytes) and of all key presses
+            (typing_patch_bytes)
+    """
+
+    typed = typed if typed is not None else text
+    results = {}
+
+    for renderer in TextRenderer:
+        connection = RecordingConnection()
+        loop = asyncio.new_event_loop()
+        page = ft.Page(connection, "", loop)
+
+        main_text = MainText(text, windowed=True, renderer=renderer)
+        page.add(main_text)
+        initial_patch_bytes = connection.sent_bytes
+
+        for position, key in enumerate(typed):
+            main_text.update_letters(
+                {
+                    position: (
+                        LetterColor.CORRECT
+                        if key == text[position]
+                        else LetterColor.WRONG
+                    )
+                }
+            )
+            main_text.set_cursor(position + 1)
+
+        results[renderer] = {
+            **main_text.get_render_stats(),
+            "initial_patch_bytes": initial_patch_bytes,
+            "typing_patch_bytes": connection.sent_bytes - initial_patch_bytes,
+        }
+        loop.close()
+
+    return results
+
+
+def char_to_key(char: str, language: str) -> str:
+    """Returns key which needs to be pressed to type char
+    (flet sends latin letters for russian layout)"""
+
+    if language == "ru" and char in constants.QWERTY_RU_CHARS:
+        return constants.QWERTY_NOT_RU_CHARS[constants.QWERTY_RU_CHARS.index(char)]
+    return char
+
+
+def scripted_stream(
+    keys: Iterable[str], language: str = "en", delay_ns: int = 0
+) -> Iterator[SimulatedKey]:
+    """Yields given chars (or "backspace") with constant delay"""
+
+    for key in keys:
+        if key == "backspace":
+            yield BACKSPACE_KEY, delay_ns
+        else:
+            yield char_to_key(key, language), delay_ns
+
+
+def random_typist_stream(
+    typing_test: TypingTest,
+    wpm: float = 80.0,
+    error_rate: float = 0.05,
+    seed: int | None = None,
+) -> Iterator[SimulatedKey]:
+    """Yields keys of typist who types with given speed and makes errors
+    (each error is fixed with backspace)
+
+    Args:
+        typing_test (TypingTest): test which text is typed
+        wpm (float, optional): average typing speed
+        error_rate (float, optional): probability to press wrong key
+        seed (int | None, optional): seed for random generator
+    """
+
+    rng = random.Random(seed)
+    mean_delay_ns = (
+        constants.SECONDS_IN_MINUTE
+        / (wpm * constants.CHARACTERS_IN_WORD)
+        * constants.NANOSECONDS_IN_SECOND
+    )
+    letters = constants.LANGUAGE_LETTERS[typing_test.language]
+    has_error = False
+
+    while not typing_test.typing_state.is_finished():
+        delay_ns = int(rng.expovariate(1.0) * mean_delay_ns)
+
+        if has_error:
+            has_error = False
+            yield BACKSPACE_KEY, delay_ns
+            continue
+
+        expected = typing_test.typing_state.get_expected()
+        if rng.random() < error_rate:
+            has_error = True
+            wrong = rng.choice(letters)
+            if wrong == expected:
+                wrong = rng.choice(constants.PUNCTUATION_CHARS)
+            yield char_to_key(wrong, typing_test.language), delay_ns
+        else:
+            yield char_to_key(expected, typing_test.language), delay_ns
+
+
+def recorded_stream(log: KeystrokeLog, language: str = "en") -> Iterator[SimulatedKey]:
+    """Yields keys from keystroke log with original delays"""
+
+    previous_timestamp = log.start_timestamp
+    for timestamp, key in zip(log.timestamps, log.keys):
+        key = chr(key)
+        yield (
+            BACKSPACE_KEY
+            if key == KeystrokeLog.BACKSPACE
+            else char_to_key(key, language)
+        ), timestamp - previous_timestamp
+        previous_timestamp = timestamp
+
+
+class SimulationReport:
+    """Timings of simulated key presses"""
+
+    def __init__(self):
+        # time spent in TypingTest.key_pressed and rendering for every event
+        self.handling_times_ns = array("q")
+        self.total_time_ns = 0
+        # page.update() calls (render scheduler frames) and direct control updates
+        self.page_updates = 0
+        self.control_updates = 0
+        self.render_stats = {}
+
+    def get_events_count(self) -> int:
+        """Returns amount of simulated key presses"""
+        return len(self.handling_times_ns)
+
+    def get_throughput(self) -> float:
+        """Returns handled key presses per second"""
+
+        if self.total_time_ns == 0:
+            return 0.0
+        return (
+            self.get_events_count()
+            / self.total_time_ns
+            * constants.NANOSECONDS_IN_SECOND
+        )
+
+    def get_percentile(self, percent: float) -> int:
+        """Returns handling time (ns) which percent of events did not exceed"""
+
+        if self.get_events_count() == 0:
+            return 0
+
+        handling_times = sorted(self.handling_times_ns)
+        index = min(len(handling_times) - 1, int(len(handling_times) * percent / 100))
+        return handling_times[index]
+
+    def merge(self, other: "SimulationReport"):
+        """Adds results of other report to this one"""
+
+        self.handling_times_ns.extend(other.handling_times_ns)
+        self.total_time_ns += other.total_time_ns
+        self.page_updates += other.page_updates
+        self.control_updates += other.control_updates
+        self.render_stats = other.render_stats
+
+    def summary(self) -> str:
+        """Returns human readable report"""
+
+        return (
+            f"events: {self.get_events_count()}, "
+            f"throughput: {self.get_throughput():.0f} keys/s, "
+            f"p50: {self.get_percentile(50) / 1000:.1f} us, "
+            f"p99: {self.get_percentile(99) / 1000:.1f} us, "
+            f"max: {self.get_percentile(100) / 1000:.1f} us, "
+            f"page updates: {self.page_updates}, "
+            f"control updates: {self.control_updates}, "
+            f"render: {self.render_stats}"
+        )
+
+
+class LoadDriver:
+    """Feeds simulated keystroke streams into TypingTest without gui"""
+
+    def __init__(self, typing_test: TypingTest | None = None, save_results=False):
+        """
+        Args:
+            typing_test (TypingTest | None, optional):
+                test to drive, new one with HeadlessPage if None
+            save_results (bool, optional): if False ended tests are not saved
+        """
+
+        self.save_results = save_results
+        # only test created by driver is closed by it
+        self.owns_typing_test = typing_test is None
+        with patch.object(ft.Control, "update", lambda _: None):
+            self.typing_test = (
+                typing_test if typing_test is not None else TypingTest(HeadlessPage())
+            )
+
+    def run(
+        self,
+        stream: Iterable[SimulatedKey],
+        rate: float | None = None,
+        use_stream_timing: bool = False,
+    ) -> SimulationReport:
+        """Presses keys from stream until it ends or test is over
+
+        Args:
+            stream (Iterable[SimulatedKey]): keys to press
+            rate (float | None, optional): key presses per second,
+                as fast as possible if None
+            use_stream_timing (bool, optional): wait delays given by stream
+                (rate is ignored)
+
+        Returns:
+            SimulationReport: timings of key presses
+        """
+
+        report = SimulationReport()
+        page = self.typing_test.page
+        page_update = page.update
+
+        def count_page_update(*controls):
+            report.page_updates += 1
+            page_update(*controls)
+
+        def count_update(_):
+            report.control_updates += 1
+
+        with ExitStack() as stack:
+            stack.enter_context(patch.object(page, "update", count_page_update))
+            # headless controls are never added to page, render scheduler
+            # must not skip them as removed ones
+            stack.enter_context(
+                patch.object(ft.Control, "page", property(lambda _: page))
+            )
+            stack.enter_context(patch.object(ft.Control, "update", count_update))
+            if not self.save_results:
+                stack.enter_context(patch.object(Statistics, "save", lambda _: None))
+                stack.enter_context(
+                    patch.object(HeatmapStatistics, "save", lambda _: None)
+                )
+
+            start_time_ns = time.perf_counter_ns()
+            next_press_ns = start_time_ns
+
+            for key, delay_ns in stream:
+                if self.typing_test.status == TypingTest.TestStatus.ENDED:
+                    break
+
+                if use_stream_timing:
+                    next_press_ns += delay_ns
+                elif rate is not None:
+                    next_press_ns += int(constants.NANOSECONDS_IN_SECOND / rate)
+
+                wait_ns = next_press_ns - time.perf_counter_ns()
+                if wait_ns > 0:
+                    time.sleep(wait_ns / constants.NANOSECONDS_IN_SECOND)
+
+                event = ft.KeyboardEvent(key, False, False, False, False)
+                handling_start_ns = time.perf_counter_ns()
+                self.typing_test.key_pressed(event)
+                # frame is sent at once, so handling time includes rendering
+                self.typing_test.render_scheduler.flush()
+                report.handling_times_ns.append(
+                    time.perf_counter_ns() - handling_start_ns
+                )
+
+            report.total_time_ns = time.perf_counter_ns() - start_time_ns
+
+        report.render_stats = self.typing_test.main_text.get_render_stats()
+        return report
+
+    def restart(self, text_seed: int | None = None):
+        """Prepares new test with same settings
+
+        Args:
+            text_seed (int | None, optional): seed of text (random text if None)
+        """
+
+        with patch.object(ft.Control, "update", lambda _: None):
+            self.typing_test.restart()
+            if text_seed is not None:
+                self.typing_test.regenerate_text(seed=text_seed)
+
+    def set_text(self, text: str):
+        """Replaces text of test (e.g. to replay recorded stream)"""
+
+        with patch.object(ft.Control, "update", lambda _: None):
+            self.typing_test.set_text(text)
+
+    def close(self):
+        """Stops background threads of test created by driver"""
+
+        if self.owns_typing_test:
+            self.typing_test.close()
+
+
+def main(args: List[str] | None = None):
+    """Runs random typist on several tests and prints report"""
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--language", default="en", choices=["en", "ru"])
+    parser.add_argument("--words", type=int, default=constants.DEFAULT_WORDS_COUNT[1])
+    parser.add_argument("--tests", type=int, default=1)
+    parser.add_argument("--wpm", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument(
+        "--rate", type=float, default=None, help="keys per second (max if not set)"
+    )
+    parser.add_argument(
+        "--realtime", action="store_true", help="wait delays of typist model"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--compare-renderers",
+        action="store_true",
+        help="print controls and patch bytes of every renderer for last text",
+    )
+    options = parser.parse_args(args)
+
+    load_assets()
+    driver = LoadDriver()
+    with patch.object(ft.Control, "update", lambda _: None):
+        driver.typing_test.set_language(options.language)
+        driver.typing_test.select_words(options.words)
+
+    total = SimulationReport()
+    for test_index in range(options.tests):
+        # with seed both texts and typist are the same in every run
+        driver.restart(
+            text_seed=None if options.seed is None else options.seed + test_index
+        )
+        stream = random_typist_stream(
+            driver.typing_test,
+            wpm=options.wpm,
+            error_rate=options.error_rate,
+            seed=None if options.seed is None else options.seed + test_index,
+        )
+        total.merge(
+            driver.run(stream, rate=options.rate, use_stream_timing=options.realtime)
+        )
+
+    driver.close()
+    print(total.summary())
+
+    if options.compare_renderers:
+        text = driver.typing_test.correct_text
+        for renderer, stats in compare_renderers(text).items():
+            print(f"{renderer.name.lower()}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
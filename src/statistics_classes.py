@@ -1,13 +1,280 @@
-"""Statistics and HeatmapStatistics classes"""
+"""KeystrokeLog, Statistics and HeatmapStatistics classes"""
 
+import os
+import sys
+import glob
+import struct
+import json
 import datetime
-from csv import DictWriter
+from array import array
+from collections import Counter
+from functools import partial
+from typing import Any, Dict, List, Tuple
 import pandas as pd
 import numpy as np
-from src.constants import LANGUAGE_LETTERS, STATISTICS_FIELD_NAMES
+from src.constants import LANGUAGE_LETTERS
+from src.aggregates import get_aggregate_store
+from src.history import get_history_store
+from src.persistence import get_writer, write_atomically
+from src.timing import now_ns
 from src import constants
 
 
+class KeystrokeLog:
+    """
+    Timestamped log of key presses during test.
+    Events are stored in parallel arrays (no python object per event)
+    """
+
+    BACKSPACE = "\b"
+    # magic, version, events count, start timestamp, end timestamp
+    HEADER = struct.Struct("<4sHIqq")
+    MAGIC = b"TKLG"
+    VERSION = 1
+
+    def __init__(self, start_timestamp: int | None = None):
+        """
+        Args:
+            start_timestamp (int | None, optional): now_ns()
+                of test start, current time if None
+        """
+
+        self.start_timestamp = (
+            start_timestamp if start_timestamp is not None else now_ns()
+        )
+        # if None it means, that test is not over yet
+        self.end_timestamp: int | None = None
+
+        # now_ns() of event
+        self.timestamps = array("q")
+        # code points of typed key and char needed to type (0 if unknown)
+        self.keys = array("I")
+        self.expected = array("I")
+        # 1 if key was correct
+        self.correct = array("b")
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def add(
+        self,
+        key: str,
+        expected: str | None = None,
+        is_correct: bool | None = None,
+        timestamp: int | None = None,
+    ):
+        """Appends event to log
+
+        Args:
+            key (str): allowed char or "backspace"
+            expected (str | None, optional): char which was needed to type
+            is_correct (bool | None, optional): Must be not None if key != backspace.
+            timestamp (int | None, optional): now_ns() of event,
+                current time if None
+        """
+
+        if key == "backspace":
+            key = self.BACKSPACE
+
+        self.timestamps.append(timestamp if timestamp is not None else now_ns())
+        self.keys.append(ord(key))
+        self.expected.append(ord(expected) if expected else 0)
+        self.correct.append(bool(is_correct))
+
+    def end(self, timestamp: int | None = None):
+        """Writes end_timestamp (current time if None)"""
+        self.end_timestamp = timestamp if timestamp is not None else now_ns()
+
+    def copy(self) -> "KeystrokeLog":
+        """Returns snapshot of log (e.g. to be saved by other thread)"""
+
+        log = KeystrokeLog(start_timestamp=self.start_timestamp)
+        log.end_timestamp = self.end_timestamp
+
+        # correct is appended last, so events up to its length are complete
+        count = len(self.correct)
+        log.timestamps = self.timestamps[:count]
+        log.keys = self.keys[:count]
+        log.expected = self.expected[:count]
+        log.correct = self.correct[:count]
+        return log
+
+    def get_duration(self) -> datetime.timedelta:
+        """Returns time from start to end (or to last event if test not over)"""
+
+        end_timestamp = self.end_timestamp
+        if end_timestamp is None:
+            end_timestamp = self.timestamps[-1] if len(self) else self.start_timestamp
+
+        return datetime.timedelta(
+            microseconds=(end_timestamp - self.start_timestamp) / 1000
+        )
+
+    def save(self, path: str):
+        """Saves log to binary file (atomically)"""
+
+        arrays = [self.timestamps, self.keys, self.expected, self.correct]
+        if sys.byteorder != "little":
+            arrays = [array(values.typecode, values) for values in arrays]
+            for values in arrays:
+                values.byteswap()
+
+        write_atomically(path, partial(self.write, arrays))
+
+    def write(self, arrays: List[array], path: str):
+        """Writes header and arrays of log to file"""
+
+        with open(path, "wb") as log_file:
+            log_file.write(
+                self.HEADER.pack(
+                    self.MAGIC,
+                    self.VERSION,
+                    len(self),
+                    self.start_timestamp,
+                    self.end_timestamp if self.end_timestamp is not None else -1,
+                )
+            )
+            for values in arrays:
+                values.tofile(log_file)
+
+    @classmethod
+    def load(cls, path: str) -> "KeystrokeLog":
+        """Loads log from binary file"""
+
+        with open(path, "rb") as log_file:
+            magic, version, count, start_timestamp, end_timestamp = cls.HEADER.unpack(
+                log_file.read(cls.HEADER.size)
+            )
+            if magic != cls.MAGIC or version != cls.VERSION:
+                raise ValueError(f"{path} is not a keystroke log file")
+
+            log = cls(start_timestamp=start_timestamp)
+            if end_timestamp != -1:
+                log.end_timestamp = end_timestamp
+
+            for values in [log.timestamps, log.keys, log.expected, log.correct]:
+                values.fromfile(log_file, count)
+                if sys.byteorder != "little":
+                    values.byteswap()
+
+        return log
+
+    def replay(
+        self,
+        start_time: datetime.datetime | None = None,
+        heatmap: "HeatmapStatistics | None" = None,
+    ) -> "Statistics":
+        """Replays log, so wpm, accuracy and heatmap can be calculated from it
+
+        Args:
+            start_time (datetime.datetime | None, optional):
+                wall clock time of test start, current time if None
+            heatmap (HeatmapStatistics | None, optional):
+                if set, errors from log are added to it
+
+        Returns:
+            Statistics: statistics of test (with end_time if log is ended)
+        """
+
+        if start_time is None:
+            start_time = datetime.datetime.now()
+
+        statistics = Statistics(
+            start_time=start_time,
+            keystroke_log=KeystrokeLog(start_timestamp=self.start_timestamp),
+        )
+
+        for timestamp, key, expected, correct in zip(
+            self.timestamps, self.keys, self.expected, self.correct
+        ):
+            key = chr(key)
+            expected = chr(expected) if expected else None
+
+            if key == self.BACKSPACE:
+                statistics.key_pressed("backspace", timestamp=timestamp)
+                continue
+
+            statistics.key_pressed(
+                key, is_correct=bool(correct), expected=expected, timestamp=timestamp
+            )
+            if heatmap is not None and expected is not None:
+                heatmap.add_key_press(need_type=expected, typed=key)
+
+        statistics.start_ns = self.start_timestamp
+        if self.end_timestamp is not None:
+            statistics.keystroke_log.end(self.end_timestamp)
+            statistics.end_ns = self.end_timestamp
+            statistics.end_time = start_time + self.get_duration()
+
+        return statistics
+
+
+class RollingWpm:
+    """
+    Wpm over last window of time, calculated from ring buffer
+    of correct key presses timestamps (add and get are O(1) amortized)
+    """
+
+    def __init__(
+        self,
+        window_ns: int = constants.ROLLING_WPM["window_s"]
+        * constants.NANOSECONDS_IN_SECOND,
+        capacity: int = constants.ROLLING_WPM["capacity"],
+    ):
+        """
+        Args:
+            window_ns (int, optional): length of window
+            capacity (int, optional): maximum amount of key presses in window
+                (if exceeded, oldest key presses are overwritten)
+        """
+
+        self.window_ns = window_ns
+        self.timestamps = array("q", [0]) * capacity
+        # index of oldest timestamp and amount of timestamps in buffer
+        self.head = 0
+        self.size = 0
+
+    def add(self, timestamp: int):
+        """Adds correct key press (timestamps must not decrease)"""
+
+        capacity = len(self.timestamps)
+        if self.size == capacity:
+            self.head = (self.head + 1) % capacity
+            self.size -= 1
+
+        self.timestamps[(self.head + self.size) % capacity] = timestamp
+        self.size += 1
+
+    def expire(self, now: int):
+        """Removes key presses which are out of window"""
+
+        while self.size > 0 and self.timestamps[self.head] <= now - self.window_ns:
+            self.head = (self.head + 1) % len(self.timestamps)
+            self.size -= 1
+
+    def get_wpm(self, now: int, start_ns: int | None = None) -> float:
+        """Returns wpm over last window
+
+        Args:
+            now (int): now_ns() of calculation
+            start_ns (int | None, optional): now_ns() of test start,
+                if window started before it, window is shortened
+        """
+
+        self.expire(now)
+
+        window_ns = self.window_ns
+        if start_ns is not None:
+            window_ns = min(window_ns, now - start_ns)
+        if window_ns <= 0:
+            return constants.DEFAULT_CPM_WITH_NO_TIME
+
+        delta_minutes = (
+            window_ns / constants.NANOSECONDS_IN_SECOND / constants.SECONDS_IN_MINUTE
+        )
+        return self.size / delta_minutes / constants.CHARACTERS_IN_WORD
+
+
 class Statistics:
     """
     Stores information about running or completed test
@@ -25,6 +292,9 @@ class Statistics:
         end_time: datetime.datetime | None = None,
         total_key_presses: int = 0,
         correct_key_presses: int = 0,
+        keystroke_log: KeystrokeLog | None = None,
+        seed: int | None = None,
+        generator_settings: Dict[str, Any] | None = None,
     ):
         self.test_size_mode = test_size_mode
         self.test_size = test_size
@@ -43,14 +313,51 @@ class Statistics:
         self.punctuation = punctuation
         self.numbers = numbers
 
-    def key_pressed(self, key: str, is_correct: bool | None = None):
+        # text of test is TextGenerator.regenerate(generator_settings, seed, ...),
+        # None for tests saved before seeds were recorded
+        self.seed = seed
+        self.generator_settings = generator_settings
+
+        self.keystroke_log = (
+            keystroke_log if keystroke_log is not None else KeystrokeLog()
+        )
+
+        # now_ns() of start and end, None for tests loaded from saves
+        # (then start_time and end_time are used)
+        self.start_ns = (
+            self.keystroke_log.start_timestamp if start_time is None else None
+        )
+        self.end_ns: int | None = None
+
+        self.rolling_wpm = RollingWpm()
+        # wpm over rolling window at the end of every second of test
+        self.wpm_series: List[float] = []
+
+    def key_pressed(
+        self,
+        key: str,
+        is_correct: bool | None = None,
+        expected: str | None = None,
+        timestamp: int | None = None,
+    ):
         """Handles key press
 
         Args:
             key (str): allowed char or backspace
             is_correct (bool | None, optional): Must be not None if key != backspace.
+            expected (str | None, optional): char which was needed to type
+            timestamp (int | None, optional): now_ns() of key press
         """
 
+        if timestamp is None:
+            timestamp = now_ns()
+
+        self.keystroke_log.add(
+            key, expected=expected, is_correct=is_correct, timestamp=timestamp
+        )
+        if key != "backspace" and is_correct:
+            self.rolling_wpm.add(timestamp)
+
         if key != "backspace":
             self.total_key_presses += 1
             self.correct_key_presses += is_correct
@@ -66,16 +373,22 @@ class Statistics:
 
     def get_cpm(self) -> float:
         """Returns average cpm"""
-        current_time = self.end_time
-        if current_time is None:
-            current_time = datetime.datetime.now()
 
-        start_timestamp = self.start_time.timestamp()
-        current_timestamp = current_time.timestamp()
+        if self.start_ns is not None:
+            current_ns = self.end_ns if self.end_ns is not None else now_ns()
+            delta_minutes = (
+                (current_ns - self.start_ns)
+                / constants.NANOSECONDS_IN_SECOND
+                / constants.SECONDS_IN_MINUTE
+            )
+        else:
+            current_time = self.end_time
+            if current_time is None:
+                current_time = datetime.datetime.now()
 
-        delta_minutes = (
-            current_timestamp - start_timestamp
-        ) / constants.SECONDS_IN_MINUTE
+            delta_minutes = (
+                current_time.timestamp() - self.start_time.timestamp()
+            ) / constants.SECONDS_IN_MINUTE
 
         if delta_minutes == 0:
             return constants.DEFAULT_CPM_WITH_NO_TIME
@@ -86,12 +399,65 @@ class Statistics:
         """Returns average wpm (1 word == {constants.CHARACTERS_IN_WORD} chars)"""
         return self.get_cpm() / constants.CHARACTERS_IN_WORD
 
+    def get_rolling_wpm(self) -> float:
+        """Returns wpm over last {constants.ROLLING_WPM["window_s"]} seconds"""
+
+        current_ns = self.end_ns if self.end_ns is not None else now_ns()
+        return self.rolling_wpm.get_wpm(current_ns, start_ns=self.start_ns)
+
+    def calculate_wpm_series(self) -> List[float]:
+        """Returns wpm over rolling window at the end of every second of test
+        (calculated from keystroke log)"""
+
+        log = self.keystroke_log
+        if log.end_timestamp is None:
+            return []
+
+        correct_timestamps = [
+            timestamp
+            for timestamp, key, correct in zip(log.timestamps, log.keys, log.correct)
+            if correct and chr(key) != KeystrokeLog.BACKSPACE
+        ]
+
+        series = []
+        rolling_wpm = RollingWpm(capacity=max(1, len(correct_timestamps)))
+        added = 0
+        second_end = log.start_timestamp + constants.NANOSECONDS_IN_SECOND
+
+        while second_end <= log.end_timestamp:
+            while (
+                added < len(correct_timestamps)
+                and correct_timestamps[added] <= second_end
+            ):
+                rolling_wpm.add(correct_timestamps[added])
+                added += 1
+
+            series.append(rolling_wpm.get_wpm(second_end, start_ns=log.start_timestamp))
+            second_end += constants.NANOSECONDS_IN_SECOND
+
+        return series
+
     def end(self):
         """Writes end_time with current time"""
         self.end_time = datetime.datetime.now()
+        self.keystroke_log.end()
+        self.end_ns = self.keystroke_log.end_timestamp
+        self.wpm_series = self.calculate_wpm_series()
+
+    def get_id(self) -> str:
+        """Returns test identifier (based on start time)"""
+        return self.start_time.strftime("%Y%m%d_%H%M%S_%f")
+
+    def is_reproducible(self) -> bool:
+        """Returns True if text of test can be regenerated (test can be retried)"""
+        return self.seed is not None and self.generator_settings is not None
 
     def save(self):
-        """Saves to file"""
+        """Saves test to history in background (keystroke log is saved
+        to separate file), see PersistenceWriter"""
+
+        keystroke_log_name = self.get_id() + ".bin"
+
         stats_dict = {
             "wpm": self.get_wpm(),
             "accuracy": self.get_accuracy(),
@@ -103,34 +469,148 @@ class Statistics:
             "total_key_presses": self.total_key_presses,
             "correct_key_presses": self.correct_key_presses,
             "start_time": self.start_time.strftime(
-                constants.DATE_FORMATS["test_start_end_time"]
+                constants.DATE_FORMATS["history_time"]
             ),
-            "end_time": self.end_time.strftime(
-                constants.DATE_FORMATS["test_start_end_time"]
+            "end_time": self.end_time.strftime(constants.DATE_FORMATS["history_time"]),
+            "keystroke_log": keystroke_log_name,
+            "wpm_series": " ".join(f"{wpm:.1f}" for wpm in self.wpm_series),
+            "seed": self.seed,
+            "generator": (
+                json.dumps(self.generator_settings)
+                if self.generator_settings is not None
+                else None
             ),
         }
 
-        with open(
-            "./saves/" + constants.FILE_NAMES["data"], "a", newline="", encoding="utf-8"
-        ) as stats_file:
-            DictWriter(stats_file, fieldnames=STATISTICS_FIELD_NAMES).writerow(
-                stats_dict
+        # key events of ui thread must not change saved log
+        get_writer().submit(
+            partial(
+                self.write, stats_dict, self.keystroke_log.copy(), keystroke_log_name
             )
+        )
+
+    @staticmethod
+    def write(
+        stats_dict: Dict[str, Any], keystroke_log: KeystrokeLog, keystroke_log_name: str
+    ):
+        """Writes saved test to keystroke log file, history and aggregates"""
+
+        keystrokes_dir = "./saves/" + constants.FILE_NAMES["keystrokes_dir"]
+        os.makedirs(keystrokes_dir, exist_ok=True)
+        keystroke_log.save(os.path.join(keystrokes_dir, keystroke_log_name))
+
+        # opened before test is added, so opening does not aggregate it twice
+        aggregate_store = get_aggregate_store()
+        get_history_store().add(stats_dict)
+        aggregate_store.add(stats_dict)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Statistics":
+        """Creates statistics of saved test (row of history store)"""
+
+        return cls(
+            test_size_mode=row["test_size_mode"],
+            test_size=row["test_size"],
+            language=row["language"],
+            punctuation=bool(row["punctuation"]),
+            numbers=bool(row["numbers"]),
+            start_time=datetime.datetime.strptime(
+                row["start_time"], constants.DATE_FORMATS["history_time"]
+            ),
+            end_time=datetime.datetime.strptime(
+                row["end_time"], constants.DATE_FORMATS["history_time"]
+            ),
+            total_key_presses=row["total_key_presses"],
+            correct_key_presses=row["correct_key_presses"],
+            seed=row["seed"],
+            generator_settings=(
+                json.loads(row["generator"]) if row["generator"] is not None else None
+            ),
+        )
 
 
 class HeatmapStatistics:
-    """Calculates and stores error heatmap"""
+    """
+    Calculates and stores error heatmap. Saved as heatmap file
+    and journal of errors of later tests ("language,need_type,typed,count"
+    lines), journal is compacted to heatmap file when it becomes big.
+    Heatmap file stores generation (amount of compactions), so journal
+    which is already in heatmap file is not added twice after crash
+    """
+
+    def __init__(self, path: str | None = None, journal_path: str | None = None):
+        """
+        Args:
+            path (str | None, optional): heatmap csv file, saves/heatmap.csv if None
+            journal_path (str | None, optional): journal file,
+                saves/heatmap_journal.csv if None
+        """
+
+        self.path = path or "./saves/" + constants.FILE_NAMES["heatmap"]
+        self.journal_path = (
+            journal_path or "./saves/" + constants.FILE_NAMES["heatmap_journal"]
+        )
+
+        self.stats, generation = self.read(self.path)
+        # journal of compaction which was interrupted by crash
+        for compacting_generation, compacting_path in self.get_compacting_journals(
+            self.journal_path
+        ):
+            if compacting_generation > generation:
+                self.apply_journal(self.stats, compacting_path)
+        self.apply_journal(self.stats, self.journal_path)
 
-    def __init__(self):
-        df = pd.read_csv("./saves/" + constants.FILE_NAMES["heatmap"])
+        # errors which are not saved yet: (language, need_index, typed_index) -> count
+        self.unsaved: Counter = Counter()
+
+    @staticmethod
+    def read(path: str) -> Tuple[Dict[str, np.ndarray], int]:
+        """Returns heatmaps of csv file and its generation"""
+
+        df = pd.read_csv(path)
 
         en_length = len(constants.LANGUAGE_LETTERS["en"])
         ru_length = len(constants.LANGUAGE_LETTERS["ru"])
 
-        self.stats = {
+        stats = {
             "en": np.array(df["en"][: en_length**2]).reshape(en_length, en_length),
             "ru": np.array(df["ru"]).reshape(ru_length, ru_length),
         }
+        # files of older versions have no generation
+        generation = int(df["generation"][0]) if "generation" in df else 0
+        return stats, generation
+
+    @staticmethod
+    def get_compacting_journals(journal_path: str) -> List[Tuple[int, str]]:
+        """Returns generations and paths of journals which are being compacted"""
+
+        suffix = "." + constants.HEATMAP_JOURNAL["compacting_suffix"]
+        journals = []
+        for compacting_path in glob.glob(f"{glob.escape(journal_path)}.*{suffix}"):
+            generation = compacting_path[len(journal_path) + 1 : -len(suffix)]
+            if generation.isdigit():
+                journals.append((int(generation), compacting_path))
+
+        return sorted(journals)
+
+    @staticmethod
+    def apply_journal(stats: Dict[str, np.ndarray], journal_path: str):
+        """Adds errors from journal to heatmaps (last line is skipped
+        if it was not written completely)"""
+
+        if not os.path.isfile(journal_path):
+            return
+
+        with open(journal_path, "r", encoding="utf-8") as journal_file:
+            for line in journal_file:
+                if not line.endswith("\n"):
+                    break
+
+                language, need_type, typed, count = line.rstrip("\n").split(",")
+                letters = LANGUAGE_LETTERS[language]
+                stats[language][letters.find(need_type)][letters.find(typed)] += int(
+                    count
+                )
 
     def add_key_press(self, need_type: str, typed: str):
         """Updates stats"""
@@ -139,25 +619,131 @@ class HeatmapStatistics:
         if need_type == typed:
             return
 
-        if need_type in LANGUAGE_LETTERS["en"] and typed in LANGUAGE_LETTERS["en"]:
-            need_index = LANGUAGE_LETTERS["en"].find(need_type)
-            typed_index = LANGUAGE_LETTERS["en"].find(typed)
+        for language in ["en", "ru"]:
+            letters = LANGUAGE_LETTERS[language]
+            if need_type in letters and typed in letters:
+                need_index = letters.find(need_type)
+                typed_index = letters.find(typed)
+
+                self.stats[language][need_index][typed_index] += 1
+                self.unsaved[(language, need_index, typed_index)] += 1
+                return
+
+    def get_worst_cells(
+        self, language: str, count: int = constants.ADAPTIVE_GENERATION["worst_cells"]
+    ) -> List[Tuple[str, str, int]]:
+        """Returns (need to type, typed, errors) of cells with most errors"""
+
+        stats = self.stats[language].reshape(-1)
+        count = min(count, len(stats))
+        # only {count} biggest cells are sorted
+        worst = np.argpartition(stats, len(stats) - count)[len(stats) - count :]
+        worst = worst[np.argsort(stats[worst])[::-1]]
+
+        letters = LANGUAGE_LETTERS[language]
+        return [
+            (
+                letters[index // len(letters)],
+                letters[index % len(letters)],
+                int(stats[index]),
+            )
+            for index in worst
+            if stats[index] > 0
+        ]
+
+    def get_targets(
+        self, language: str, count: int = constants.ADAPTIVE_GENERATION["worst_cells"]
+    ) -> Tuple[Tuple[str, float], ...]:
+        """Returns letters and bigrams to train with their weights:
+        for every worst cell letter which needed to be typed
+        and pairs of it with letter which was typed instead"""
 
-            self.stats["en"][need_index][typed_index] += 1
-        elif need_type in LANGUAGE_LETTERS["ru"] and typed in LANGUAGE_LETTERS["ru"]:
-            need_index = LANGUAGE_LETTERS["ru"].find(need_type)
-            typed_index = LANGUAGE_LETTERS["ru"].find(typed)
+        weights = {}
+        for need_type, typed, errors in self.get_worst_cells(language, count):
+            for ngram in [need_type, need_type + typed, typed + need_type]:
+                weights[ngram] = weights.get(ngram, 0) + errors
 
-            self.stats["ru"][need_index][typed_index] += 1
+        return tuple(sorted(weights.items()))
 
     def save(self):
-        """Saves data to csv file"""
+        """Appends errors made since last save to journal in background
+        (see PersistenceWriter), so cost depends only on amount of errors"""
+
+        if not self.unsaved:
+            return
+
+        lines = [
+            f"{language},{LANGUAGE_LETTERS[language][need_index]},"
+            f"{LANGUAGE_LETTERS[language][typed_index]},{count}\n"
+            for (language, need_index, typed_index), count in self.unsaved.items()
+        ]
+        self.unsaved = Counter()
+
+        get_writer().submit(
+            partial(self.append_journal, lines, self.path, self.journal_path)
+        )
+
+    @classmethod
+    def append_journal(cls, lines: List[str], path: str, journal_path: str):
+        """Appends lines to journal, compacts journal if it became too big"""
+
+        with open(journal_path, "ab+") as journal_file:
+            # last line can be written partly (crash during saving)
+            size = journal_file.seek(0, os.SEEK_END)
+            if size > 0:
+                journal_file.seek(max(0, size - 4 * 1024))
+                tail = journal_file.read()
+                if not tail.endswith(b"\n"):
+                    last_line_start = size - len(tail) + tail.rfind(b"\n") + 1
+                    journal_file.truncate(last_line_start)
+
+            journal_file.write("".join(lines).encode("utf-8"))
+            size = journal_file.tell()
+
+        if size >= constants.HEATMAP_JOURNAL["compact_bytes"]:
+            cls.compact(path, journal_path)
+
+    @classmethod
+    def compact(cls, path: str, journal_path: str):
+        """Adds journal to heatmap file. Journal is renamed to compacting journal
+        of next generation first (new errors go to new journal), heatmap file
+        with this generation replaces old one atomically, then compacting
+        journal is removed. After crash at any step errors are counted once"""
+
+        stats, generation = cls.read(path)
+        compacting_journals = cls.get_compacting_journals(journal_path)
+        pending = [
+            (compacting_generation, compacting_path)
+            for compacting_generation, compacting_path in compacting_journals
+            if compacting_generation > generation
+        ]
+
+        # compaction interrupted by crash is finished first
+        if not pending:
+            compacting_path = (
+                f"{journal_path}.{generation + 1}."
+                + constants.HEATMAP_JOURNAL["compacting_suffix"]
+            )
+            os.replace(journal_path, compacting_path)
+            pending = [(generation + 1, compacting_path)]
+            compacting_journals.append(pending[0])
+
+        for _, compacting_path in pending:
+            cls.apply_journal(stats, compacting_path)
+        cls.write(stats, path, generation=pending[-1][0])
+
+        for _, compacting_path in compacting_journals:
+            os.remove(compacting_path)
+
+    @staticmethod
+    def write(stats: Dict[str, np.ndarray], path: str, generation: int = 0):
+        """Writes heatmaps and generation to csv file (atomically)"""
 
         df = pd.DataFrame(
             {
                 "en": np.concatenate(
                     [
-                        self.stats["en"].reshape(-1),
+                        stats["en"].reshape(-1),
                         # adding zeros so length of cols will be same
                         np.zeros(
                             len(constants.LANGUAGE_LETTERS["ru"]) ** 2
@@ -166,8 +752,9 @@ class HeatmapStatistics:
                         ),
                     ]
                 ),
-                "ru": self.stats["ru"].reshape(-1),
+                "ru": stats["ru"].reshape(-1),
             }
         )
+        df["generation"] = generation
 
-        df.to_csv("./saves/" + constants.FILE_NAMES["heatmap"], index=False)
+        write_atomically(path, partial(df.to_csv, index=False))
@@ -1,8 +1,11 @@
 """Realizes statistics page graphical class"""
 
-import datetime
-import pandas as pd
+import threading
+from typing import Callable
 import flet as ft
+from src.aggregates import get_aggregate_store
+from src.history import get_history_store
+from src.persistence import get_writer
 from src.statistics_classes import Statistics
 from src.constants import color_scheme
 from src import constants
@@ -34,10 +37,29 @@ class StatisticsPage(ft.UserControl):
                 alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
             )
 
-        def __init__(self, index: int, statistics: Statistics):
+        def __init__(
+            self,
+            index: int,
+            statistics: Statistics,
+            on_retry: Callable[[Statistics], None] | None = None,
+        ):
+            """
+            Args:
+                index (int): index of test in history
+                statistics (Statistics): shown test
+                on_retry (Callable[[Statistics], None] | None, optional):
+                    called with test when retry button is clicked,
+                    button is shown only if text of test can be regenerated
+            """
+
             super().__init__()
 
             self.statistics = statistics
+            self.retry_button = (
+                ft.ElevatedButton("Retry", on_click=lambda _: on_retry(statistics))
+                if on_retry is not None and statistics.is_reproducible()
+                else None
+            )
 
             self.index = index
             self.text_stats = ft.Column(
@@ -79,16 +101,120 @@ class StatisticsPage(ft.UserControl):
                 spacing=constants.STATISTICS_PAGE["text_stats_spacing"],
             )
 
+        def build(self):
+            return ft.Container(
+                ft.Column(
+                    [
+                        ft.Row(
+                            [
+                                ft.Text(
+                                    f"TEST #{self.index + 1}",
+                                    color=color_scheme["secondary"],
+                                    theme_style=ft.TextThemeStyle.HEADLINE_MEDIUM,
+                                )
+                            ]
+                            + ([self.retry_button] if self.retry_button else []),
+                            width=constants.STATISTICS_PAGE["test_content_width"],
+                            alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                        ),
+                        ft.Row([self.text_stats]),
+                    ]
+                ),
+                padding=constants.STATISTICS_PAGE["test_padding"],
+                border_radius=constants.STATISTICS_PAGE["test_border_radius"],
+                width=constants.STATISTICS_PAGE["test_width"],
+                bgcolor=color_scheme["nav_background"],
+            )
+
+    class SummaryVisualizer(ft.UserControl):
+        """Graphical element for aggregates (bests, averages, streaks),
+        read from aggregate store without loading tests history"""
+
+        def create_text_element(self, label: str, value: str) -> ft.Row:
+            """Creates formated text graphical element"""
+
+            return ft.Row(
+                [
+                    ft.Text(
+                        f"{label}: ",
+                        color=color_scheme["secondary"],
+                        theme_style=ft.TextThemeStyle.TITLE_SMALL,
+                    ),
+                    ft.Text(
+                        value,
+                        color=color_scheme["primary"],
+                        theme_style=ft.TextThemeStyle.TITLE_SMALL,
+                    ),
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+            )
+
+        def create_bucket_element(self, key, aggregate) -> ft.Column:
+            """Creates graphical element for one bucket of tests"""
+
+            language, test_size_mode, test_size, punctuation, numbers = key
+            title = f"{language} {test_size}" + (
+                " words" if test_size_mode == "words" else "s"
+            )
+            if punctuation:
+                title += " punctuation"
+            if numbers:
+                title += " numbers"
+
+            return ft.Column(
+                [
+                    ft.Text(
+                        title,
+                        color=color_scheme["secondary"],
+                        theme_style=ft.TextThemeStyle.TITLE_MEDIUM,
+                    ),
+                    self.create_text_element("BEST WPM", f"{aggregate.best_wpm:.1f}"),
+                    self.create_text_element(
+                        "AVERAGE WPM",
+                        f"{aggregate.get_average_wpm():.1f}"
+                        f" ± {aggregate.get_wpm_deviation():.1f}",
+                    ),
+                    self.create_text_element(
+                        f"LAST {len(aggregate.last_wpm)} WPM",
+                        f"{aggregate.get_last_average_wpm():.1f}",
+                    ),
+                    self.create_text_element(
+                        "ACCURACY", f"{aggregate.get_average_accuracy():.1f}%"
+                    ),
+                    self.create_text_element("TESTS", str(aggregate.count)),
+                ],
+                width=constants.STATISTICS_PAGE["summary_bucket_width"],
+                spacing=constants.STATISTICS_PAGE["text_stats_spacing"],
+            )
+
+        def __init__(self):
+            super().__init__()
+
+            aggregate_store = get_aggregate_store()
+            self.streaks = ft.Text(
+                f"STREAK: {aggregate_store.get_current_streak()} days"
+                f" (BEST: {aggregate_store.best_streak})",
+                color=color_scheme["primary"],
+                theme_style=ft.TextThemeStyle.TITLE_MEDIUM,
+            )
+            self.buckets = [
+                self.create_bucket_element(key, aggregate)
+                for key, aggregate in aggregate_store.get_buckets()[
+                    : constants.STATISTICS_PAGE["summary_buckets"]
+                ]
+            ]
+
         def build(self):
             return ft.Container(
                 ft.Column(
                     [
                         ft.Text(
-                            f"TEST #{self.index + 1}",
+                            "SUMMARY",
                             color=color_scheme["secondary"],
                             theme_style=ft.TextThemeStyle.HEADLINE_MEDIUM,
                         ),
-                        ft.Row([self.text_stats]),
+                        self.streaks,
+                        ft.Row(self.buckets, wrap=True),
                     ]
                 ),
                 padding=constants.STATISTICS_PAGE["test_padding"],
@@ -97,46 +223,151 @@ class StatisticsPage(ft.UserControl):
                 bgcolor=color_scheme["nav_background"],
             )
 
-    def __init__(self):
+    def __init__(
+        self,
+        sort_by: str = "start_time",
+        descending: bool = True,
+        last_test: Statistics | None = None,
+        on_retry: Callable[[Statistics], None] | None = None,
+        **filters,
+    ):
+        """
+        Args:
+            sort_by (str, optional): one of HISTORY_SORT_COLUMNS
+            descending (bool, optional): sort direction
+            last_test (Statistics | None, optional): just ended test,
+                shown before it is written to history
+            on_retry (Callable[[Statistics], None] | None, optional):
+                called with test which user wants to retry
+            **filters: HISTORY_FILTERS of shown tests
+        """
+
         super().__init__()
 
-        self.list_content = []
+        self.on_retry = on_retry
+
+        self.sort_by = sort_by
+        self.descending = descending
+        self.filters = filters
+        # last test if it is still in writer queue (page is reloaded when saved)
+        self.unsaved_test = (
+            last_test
+            if last_test is not None and not get_writer().flush(timeout=0)
+            else None
+        )
+        # amount of loaded tests and whether all tests are loaded
+        self.loaded = 0
+        self.exhausted = False
+        # scroll events are handled in other threads
+        self.lock = threading.Lock()
+
+        self.list_view = ft.ListView(
+            [],
+            expand=1,
+            spacing=constants.STATISTICS_PAGE["spacing"],
+            auto_scroll=False,
+            on_scroll=self.on_scroll,
+            on_scroll_interval=constants.STATISTICS_PAGE["scroll_interval"],
+        )
+
+        self.fill()
 
-        self.stats = pd.read_csv("./saves/" + constants.FILE_NAMES["data"])
-        if len(self.stats) == 0:
-            self.list_content = [
+    def fill(self):
+        """Shows summary and first page of tests"""
+
+        with self.lock:
+            self.loaded = 0
+            self.exhausted = False
+            self.list_view.controls = []
+
+        # only first page is read from history, so page opens in same time
+        # with any amount of saved tests
+        self.load_next_page()
+
+        # newest test goes first in default order
+        if (
+            self.unsaved_test is not None
+            and self.sort_by == "start_time"
+            and self.descending
+            and all(value is None for value in self.filters.values())
+        ):
+            self.list_view.controls.insert(
+                0,
+                self.TestStatisticsVisualizer(
+                    get_history_store().count_tests(),
+                    self.unsaved_test,
+                    self.on_retry,
+                ),
+            )
+
+        if len(self.list_view.controls) == 0:
+            self.list_view.controls = [
                 ft.Text(
-                    "You haven't passed any tests yet",
+                    (
+                        "No tests match filters"
+                        if any(value is not None for value in self.filters.values())
+                        else "You haven't passed any tests yet"
+                    ),
                     color=color_scheme["secondary"],
                     theme_style=ft.TextThemeStyle.HEADLINE_LARGE,
                 )
             ]
         else:
-            for index, row in self.stats.iloc[::-1].iterrows():
-                statistics_object = Statistics(
-                    test_size_mode=row["test_size_mode"],
-                    test_size=row["test_size"],
-                    language=row["language"],
-                    punctuation=row["punctuation"],
-                    numbers=row["numbers"],
-                    start_time=datetime.datetime.strptime(
-                        row["start_time"], constants.DATE_FORMATS["test_start_end_time"]
-                    ),
-                    end_time=datetime.datetime.strptime(
-                        row["end_time"], constants.DATE_FORMATS["test_start_end_time"]
-                    ),
-                    total_key_presses=row["total_key_presses"],
-                    correct_key_presses=row["correct_key_presses"],
-                )
+            self.list_view.controls.insert(0, self.SummaryVisualizer())
+
+    def reload_when_saved(self):
+        """Reloads tests and summary in background when last test is saved
+        (called after page is shown, so saving does not delay opening)"""
+
+        if self.unsaved_test is not None:
+            threading.Thread(target=self.reload_saved, daemon=True).start()
+
+    def reload_saved(self):
+        """Waits for writer and reloads tests and summary from saved history"""
 
-                self.list_content.append(
-                    self.TestStatisticsVisualizer(index, statistics_object)
+        get_writer().flush()
+        self.unsaved_test = None
+        self.fill()
+        # page can be already left
+        if self.list_view.page is not None:
+            self.list_view.update()
+
+    def load_next_page(self) -> bool:
+        """Reads next page of tests from history and appends them to list,
+        returns whether any tests were added"""
+
+        with self.lock:
+            if self.exhausted:
+                return False
+
+            page_size = constants.STATISTICS_PAGE["page_size"]
+            rows = get_history_store().query(
+                sort_by=self.sort_by,
+                descending=self.descending,
+                limit=page_size,
+                offset=self.loaded,
+                **self.filters,
+            )
+            self.loaded += len(rows)
+            self.exhausted = len(rows) < page_size
+
+            for row in rows:
+                self.list_view.controls.append(
+                    self.TestStatisticsVisualizer(
+                        row["id"] - 1, Statistics.from_row(row), self.on_retry
+                    )
                 )
+            return len(rows) > 0
+
+    def on_scroll(self, event: ft.OnScrollEvent):
+        """Loads next page when list is scrolled close to the end"""
+
+        if (
+            event.max_scroll_extent - event.pixels
+            <= constants.STATISTICS_PAGE["load_more_extent"]
+            and self.load_next_page()
+        ):
+            self.list_view.update()
 
     def build(self):
-        return ft.ListView(
-            self.list_content,
-            expand=1,
-            spacing=constants.STATISTICS_PAGE["spacing"],
-            auto_scroll=False,
-        )
+        return self.list_view
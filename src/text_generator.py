@@ -1,26 +1,88 @@
 """Realizes TextGenerator"""
 
 import random
-from src.constants import LANGUAGE_TO_PATH, PUNCTUATION_CHARS
+import secrets
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+from src.constants import (
+    LANGUAGE_TO_BOOKS,
+    LANGUAGE_TO_CORPUS,
+    LANGUAGE_TO_PATH,
+    PUNCTUATION_CHARS,
+)
+from src.markov import MarkovModel, get_markov_model
+from src.passages import PassageIndex, get_passage_index
+from src.sampling import AliasTable
+from src.vocabulary import Vocabulary, get_vocabulary
 from src import constants
 
 
+def new_seed() -> int:
+    """Returns random seed for text (it is exactly representable as float,
+    so it is not changed when saved data with empty cells is read by pandas)"""
+    return secrets.randbits(52)
+
+
 class TextGenerator:
-    """Generates text according to settings"""
+    """
+    Generates text according to settings.
+    Every generator has own random generators, so text is determined
+    by settings and seed (see generate_text)
+    """
 
     def __init__(
         self,
         language: str = "en",
         punctuation: bool = False,
         numbers: bool = False,
+        sampling: str = constants.TEXT_GENERATOR["sampling"],
+        zipf_exponent: float = constants.TEXT_GENERATOR["zipf_exponent"],
+        targets: Tuple[Tuple[str, float], ...] = (),
+        seed: int | None = None,
     ):
+        """
+        Args:
+            language (str, optional): language of vocabulary
+            punctuation (bool, optional): add punctuation to words
+            numbers (bool, optional): replace some words with numbers
+            sampling (str, optional): how words are drawn from vocabulary:
+                "uniform", "zipf" (by frequency rank, vocabularies are sorted
+                by frequency), "weights" (explicit weights of vocabulary),
+                "adaptive" (words containing targets), "markov" (n-gram model
+                trained on corpus of language, see LANGUAGE_TO_CORPUS)
+                or "passages" (real passages of books, see LANGUAGE_TO_BOOKS,
+                punctuation and numbers settings are not used)
+            zipf_exponent (float, optional): skew of "zipf" sampling
+                (0 is uniform, bigger values prefer frequent words more)
+            targets (Tuple[Tuple[str, float], ...], optional): letters or bigrams
+                and their weights for "adaptive" sampling
+            seed (int | None, optional): seed of random generators, random if None
+        """
+
         self.language = language
-        self.vocabulary = ["empty"]
+        self.vocabulary = Vocabulary.from_words(["empty"])
+        self.reseed(seed if seed is not None else new_seed())
         self.punctuation = punctuation
         self.numbers = numbers
+        self.sampling = sampling
+        self.zipf_exponent = zipf_exponent
+        # list of lists if settings were loaded from json
+        self.targets = tuple(tuple(target) for target in targets)
+        # targets with words: bounds of their rows in ngram index and weights table
+        self.adaptive_table: Tuple[np.ndarray, np.ndarray, AliasTable] | None = None
+        # previous words of "markov" sampling (None at start of text)
+        self.markov_context: np.ndarray | None = None
 
         self.load_vocabulary(LANGUAGE_TO_PATH[language])
 
+    def reseed(self, seed: int):
+        """Resets random generators to seed"""
+
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.numpy_rng = np.random.default_rng(seed)
+
     def toggle_punctuation(self):
         """Toggles punctuation for generation"""
         self.punctuation = not self.punctuation
@@ -34,37 +96,286 @@ class TextGenerator:
 
         self.language = language
         self.load_vocabulary(LANGUAGE_TO_PATH[language])
+        self.adaptive_table = None
+        self.markov_context = None
+
+    def set_sampling(self, sampling: str, zipf_exponent: float | None = None):
+        """Updates how words are drawn from vocabulary"""
+
+        self.sampling = sampling
+        self.markov_context = None
+        if zipf_exponent is not None:
+            self.zipf_exponent = zipf_exponent
+
+    def set_targets(self, targets: Tuple[Tuple[str, float], ...]):
+        """Updates letters and bigrams which "adaptive" sampling trains"""
+
+        targets = tuple(tuple(target) for target in targets)
+        if targets != self.targets:
+            self.targets = targets
+            self.adaptive_table = None
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Returns settings (without seed),
+        TextGenerator(**settings) generates same texts with same seeds"""
+
+        return {
+            "language": self.language,
+            "punctuation": self.punctuation,
+            "numbers": self.numbers,
+            "sampling": self.sampling,
+            "zipf_exponent": self.zipf_exponent,
+            "targets": self.targets,
+        }
 
     def load_vocabulary(self, path: str):
-        """Loads vocab from certain path"""
-        with open(path, "r", encoding="utf8") as vocabulary_file:
-            self.vocabulary = [line[:-1] for line in vocabulary_file.readlines()]
+        """Loads vocab from certain path (shared by all generators in process)"""
+        self.vocabulary = get_vocabulary(path)
 
-    def generate(self, words_count: int = 20) -> str:
-        """Generates text to print according to settings."""
-        words = []
+    def get_alias_table(self) -> AliasTable | None:
+        """Returns alias table for weighted sampling (None if sampling is uniform)"""
+
+        if self.sampling == "zipf":
+            return self.vocabulary.get_zipf_table(self.zipf_exponent)
+        if self.sampling == "weights":
+            return self.vocabulary.get_weights_table()
+        return None
+
+    def get_adaptive_table(self) -> Tuple[np.ndarray, np.ndarray, AliasTable] | None:
+        """Returns starts and lengths of targets' rows in ngram index
+        and alias table of targets' weights (None if no target is in vocabulary)"""
+
+        if self.adaptive_table is None:
+            ngram_index = self.vocabulary.get_ngram_index()
+            bounds, weights = [], []
+            for ngram, weight in self.targets:
+                start, end = ngram_index.get_bounds(ngram)
+                if end > start and weight > 0:
+                    bounds.append((start, end - start))
+                    weights.append(weight)
+
+            if not bounds:
+                return None
 
-        for _ in range(words_count):
-            current_word = random.choice(self.vocabulary).lower()
+            bounds = np.array(bounds, dtype=np.int64)
+            self.adaptive_table = (bounds[:, 0], bounds[:, 1], AliasTable(weights))
 
-            # add numbers
+        return self.adaptive_table
+
+    def sample_word_id(self) -> int:
+        """Draws index of word in vocabulary according to sampling"""
+
+        if self.sampling == "adaptive":
+            adaptive_table = self.get_adaptive_table()
             if (
-                self.numbers
-                and random.uniform(0, 1)
-                <= constants.TEXT_GENERATOR["numbers_probability"]
+                adaptive_table is not None
+                and self.rng.uniform(0, 1)
+                <= constants.ADAPTIVE_GENERATION["targeted_share"]
             ):
-                current_word = str(
-                    random.randint(0, constants.TEXT_GENERATOR["max_number"])
+                starts, lengths, alias_table = adaptive_table
+                target = alias_table.sample_one(self.rng)
+                return int(
+                    self.vocabulary.get_ngram_index().word_ids[
+                        starts[target] + self.rng.randrange(lengths[target])
+                    ]
                 )
 
-            # add punctuation
-            if (
-                self.punctuation
-                and random.uniform(0, 1)
-                <= constants.TEXT_GENERATOR["punctuation_probability"]
-            ):
-                current_word += random.choice(PUNCTUATION_CHARS)
+        alias_table = self.get_alias_table()
+        if alias_table is None:
+            return self.rng.randrange(len(self.vocabulary))
+        return alias_table.sample_one(self.rng)
+
+    def sample_word_ids(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Draws array of word indices with given shape (vectorized sample_word_id)"""
+
+        alias_table = self.get_alias_table()
+        if alias_table is None:
+            indices = self.numpy_rng.integers(0, len(self.vocabulary), size=shape)
+        else:
+            indices = alias_table.sample(self.numpy_rng, shape)
+
+        adaptive_table = (
+            self.get_adaptive_table() if self.sampling == "adaptive" else None
+        )
+        if adaptive_table is not None:
+            starts, lengths, targets_table = adaptive_table
+            targets = targets_table.sample(self.numpy_rng, shape)
+            positions = starts[targets] + (
+                self.numpy_rng.random(shape) * lengths[targets]
+            ).astype(np.int64)
+            targeted_mask = (
+                self.numpy_rng.random(shape)
+                <= constants.ADAPTIVE_GENERATION["targeted_share"]
+            )
+            indices = np.where(
+                targeted_mask,
+                self.vocabulary.get_ngram_index().word_ids[positions],
+                indices,
+            )
+
+        return indices
+
+    def get_markov_model(self) -> MarkovModel:
+        """Returns n-gram model of language (shared by all generators in process)"""
+        return get_markov_model(LANGUAGE_TO_CORPUS[self.language])
+
+    def sample_markov_word(self) -> str:
+        """Draws next word of "markov" text"""
+
+        markov_model = self.get_markov_model()
+        if self.markov_context is None:
+            self.markov_context = markov_model.random_contexts(self.numpy_rng, 1)
+
+        word_ids, self.markov_context = markov_model.step(
+            self.markov_context, self.numpy_rng
+        )
+        return markov_model.words[int(word_ids[0])]
+
+    def get_passage_index(self) -> PassageIndex:
+        """Returns passages of language (shared by all generators in process)"""
+
+        passage_index = get_passage_index(LANGUAGE_TO_BOOKS[self.language])
+        if len(passage_index) == 0:
+            raise ValueError(f"{LANGUAGE_TO_BOOKS[self.language]} has no passages")
+        return passage_index
 
-            words.append(current_word)
+    def passage_words(self) -> Iterator[str]:
+        """Infinitely yields words of passages starting from random one"""
+
+        passage_index = self.get_passage_index()
+        return passage_index.iterate_words(self.rng.randrange(len(passage_index)))
+
+    def generate_word(self) -> str:
+        """Generates one word according to settings"""
+
+        if self.sampling == "markov":
+            current_word = self.sample_markov_word()
+        else:
+            current_word = self.vocabulary[self.sample_word_id()]
+
+        # add numbers
+        if (
+            self.numbers
+            and self.rng.uniform(0, 1)
+            <= constants.TEXT_GENERATOR["numbers_probability"]
+        ):
+            current_word = str(
+                self.rng.randint(0, constants.TEXT_GENERATOR["max_number"])
+            )
+
+        # add punctuation
+        if (
+            self.punctuation
+            and self.rng.uniform(0, 1)
+            <= constants.TEXT_GENERATOR["punctuation_probability"]
+        ):
+            current_word += self.rng.choice(PUNCTUATION_CHARS)
+
+        return current_word
+
+    def generate(self, words_count: int = 20) -> str:
+        """Generates text to print according to settings."""
+
+        if self.sampling == "passages":
+            return " ".join(islice(self.passage_words(), words_count))
+
+        # every text starts from random place of corpus
+        self.markov_context = None
+        return " ".join(self.generate_word() for _ in range(words_count))
+
+    def generate_text(self, words_count: int, seed: int) -> str:
+        """Generates text which is determined by settings, words count and seed"""
+
+        self.reseed(seed)
+        return self.generate_batch(1, words_count)[0]
+
+    @classmethod
+    def regenerate(cls, settings: Dict[str, Any], seed: int, words_count: int) -> str:
+        """Returns same text as generate_text of generator with settings
+        (e.g. to retry saved test)"""
+        return cls(**settings).generate_text(words_count, seed)
+
+    def stream(self, seed: int | None = None) -> Iterator[str]:
+        """Infinitely yields words according to settings
+        (for texts which are extended while typing)
+
+        Args:
+            seed (int | None, optional): seed of text, words continue
+                its generate_text (stream uses seed + 1, so text is not repeated)
+        """
+
+        if seed is not None:
+            self.reseed(seed + 1)
+
+        if self.sampling == "passages":
+            yield from self.passage_words()
+            return
+
+        self.markov_context = None
+        while True:
+            yield self.generate_word()
+
+    def generate_markov_words(self, shape: Tuple[int, int]) -> np.ndarray:
+        """Returns array of "markov" words (row is text),
+        all texts do the same step at once"""
+
+        markov_model = self.get_markov_model()
+        texts_count, words_count = shape
+
+        contexts = markov_model.random_contexts(self.numpy_rng, texts_count)
+        word_ids = np.zeros(shape, dtype=np.int64)
+        for position in range(words_count):
+            word_ids[:, position], contexts = markov_model.step(
+                contexts, self.numpy_rng
+            )
+
+        return markov_model.words.take(word_ids)
+
+    def generate_batch(self, texts_count: int, words_count: int = 20) -> List[str]:
+        """Generates several texts at once (vectorized with numpy),
+        distribution of words is the same as in generate()
+
+        Args:
+            texts_count (int): amount of texts
+            words_count (int, optional): amount of words in every text
+
+        Returns:
+            List[str]: generated texts
+        """
+
+        if self.sampling == "passages":
+            # passages are read one by one, there is nothing to vectorize
+            return [self.generate(words_count) for _ in range(texts_count)]
+
+        shape = (texts_count, words_count)
+
+        if self.sampling == "markov":
+            words = self.generate_markov_words(shape)
+        else:
+            words = self.vocabulary.take(self.sample_word_ids(shape))
+
+        # add numbers
+        if self.numbers:
+            numbers_mask = (
+                self.numpy_rng.random(shape)
+                <= constants.TEXT_GENERATOR["numbers_probability"]
+            )
+            numbers = self.numpy_rng.integers(
+                0, constants.TEXT_GENERATOR["max_number"] + 1, size=shape
+            ).astype(str)
+            words = np.where(numbers_mask, numbers, words)
+
+        # add punctuation
+        if self.punctuation:
+            punctuation_mask = (
+                self.numpy_rng.random(shape)
+                <= constants.TEXT_GENERATOR["punctuation_probability"]
+            )
+            punctuation_chars = np.array(list(PUNCTUATION_CHARS))[
+                self.numpy_rng.integers(0, len(PUNCTUATION_CHARS), size=shape)
+            ]
+            words = np.where(
+                punctuation_mask, np.char.add(words, punctuation_chars), words
+            )
 
-        return " ".join(words)
+        return [" ".join(text_words) for text_words in words.tolist()]
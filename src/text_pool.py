@@ -0,0 +1,180 @@
+"""Realizes TextPool"""
+
+import threading
+import traceback
+from itertools import product
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Tuple
+from src.text_generator import TextGenerator, new_seed
+from src import constants
+
+# TextGenerator settings without targets (as tuple of items) and words count
+PoolKey = Tuple[Tuple[Tuple[str, Any], ...], int]
+
+
+class TextPool:
+    """
+    Keeps ready texts for every settings combination,
+    so restart and settings changes do not generate text on event path.
+    Texts are generated by background worker thread.
+    Adaptive targets change after every test, so they are not part of key:
+    pool keeps texts only for last targets of every key
+    """
+
+    def __init__(
+        self,
+        texts_per_key: int = constants.TEXT_POOL["texts_per_key"],
+        prefill: bool = True,
+    ):
+        """
+        Args:
+            texts_per_key (int, optional): amount of ready texts for every settings
+            prefill (bool, optional): generate texts for all default settings
+        """
+
+        self.texts_per_key = texts_per_key
+        # seeds and texts
+        self.texts: Dict[PoolKey, Deque[Tuple[int, str]]] = defaultdict(deque)
+        # targets of texts of every key
+        self.targets: Dict[PoolKey, Tuple] = {}
+
+        # settings which texts need to be generated by worker
+        self.refill_keys: Deque[PoolKey] = deque()
+        self.condition = threading.Condition()
+        self.stopped = False
+
+        # used only by worker thread
+        self.generators: Dict[Tuple[Tuple[str, Any], ...], TextGenerator] = {}
+
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+        if prefill:
+            with self.condition:
+                for key in self.get_default_keys():
+                    self.request_refill(key)
+
+    @staticmethod
+    def get_default_keys():
+        """Returns keys of all settings which can be selected in settings bar"""
+
+        for language, punctuation, numbers, words_count in product(
+            constants.LANGUAGE_TO_PATH.keys(),
+            [False, True],
+            [False, True],
+            constants.DEFAULT_WORDS_COUNT + [constants.TEXT_STREAM["initial_words"]],
+        ):
+            settings = TextGenerator(language, punctuation, numbers).get_settings()
+            yield TextPool.get_key(settings, words_count)
+
+    @staticmethod
+    def get_key(settings: Dict[str, Any], words_count: int) -> PoolKey:
+        """Returns key of texts (settings without targets)"""
+
+        return (
+            tuple(
+                (name, value) for name, value in settings.items() if name != "targets"
+            ),
+            words_count,
+        )
+
+    def get(self, settings: Dict[str, Any], words_count: int) -> Tuple[int, str]:
+        """Returns ready text for settings (generates it if there is no one)
+
+        Args:
+            settings (Dict[str, Any]): TextGenerator.get_settings()
+            words_count (int): amount of words in text
+
+        Returns:
+            Tuple[int, str]: seed of text and text
+                (same as TextGenerator(**settings).generate_text(words_count, seed))
+        """
+
+        key = self.get_key(settings, words_count)
+
+        with self.condition:
+            self.update_targets(key, settings.get("targets", ()))
+            seeded_text = self.texts[key].popleft() if self.texts[key] else None
+            self.request_refill(key)
+
+        if seeded_text is None:
+            seed = new_seed()
+            seeded_text = seed, TextGenerator(**settings).generate_text(
+                words_count, seed
+            )
+
+        return seeded_text
+
+    def prefetch(self, settings: Dict[str, Any], words_count: int):
+        """Asks worker to prepare texts for settings (e.g. after adaptive
+        targets changed), so next get() does not generate text"""
+
+        key = self.get_key(settings, words_count)
+
+        with self.condition:
+            self.update_targets(key, settings.get("targets", ()))
+            self.request_refill(key)
+
+    def update_targets(self, key: PoolKey, targets: Tuple):
+        """Drops texts generated for other targets (self.condition must be held)"""
+
+        if self.targets.get(key, ()) != targets:
+            self.targets[key] = targets
+            self.texts[key].clear()
+
+    def request_refill(self, key: PoolKey):
+        """Asks worker to generate texts for settings (self.condition must be held)"""
+
+        if key not in self.refill_keys:
+            self.refill_keys.append(key)
+            self.condition.notify()
+
+    def get_generator(self, settings: Tuple[Tuple[str, Any], ...]) -> TextGenerator:
+        """Returns worker's generator for settings"""
+
+        if settings not in self.generators:
+            self.generators[settings] = TextGenerator(**dict(settings))
+        return self.generators[settings]
+
+    def work(self):
+        """Worker thread loop, generates texts for requested settings"""
+
+        while True:
+            with self.condition:
+                while not self.refill_keys and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+
+                key = self.refill_keys.popleft()
+                missing = self.texts_per_key - len(self.texts[key])
+                targets = self.targets.get(key, ())
+
+            if missing <= 0:
+                continue
+
+            settings, words_count = key
+            try:
+                generator = self.get_generator(settings)
+                generator.set_targets(targets)
+                texts = []
+                for seed in (new_seed() for _ in range(missing)):
+                    texts.append((seed, generator.generate_text(words_count, seed)))
+            except Exception:
+                # e.g. missing corpus, get() reports it when generates text itself,
+                # worker must keep filling texts of other settings
+                traceback.print_exc()
+                continue
+
+            with self.condition:
+                # targets could change while texts were generated
+                if self.targets.get(key, ()) == targets:
+                    self.texts[key].extend(texts)
+
+    def close(self):
+        """Stops worker thread"""
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.worker.join()
@@ -1,9 +1,12 @@
 """MainText and needed for it classes"""
 
+from bisect import bisect_right
 from enum import Enum
-from typing import List
+from itertools import groupby
+from typing import Dict, List
 import flet as ft
 from src.constants import FONT_SIZE, color_scheme
+from src.render_scheduler import RenderScheduler, send_updates
 from src import constants
 
 
@@ -23,19 +26,100 @@ class Letter(ft.UserControl):
         self.value = value
         self.color = color.value
 
-    def build(self):
-        return ft.Text(
+        self.text_element = ft.Text(
             self.value,
             size=FONT_SIZE,
             color=self.color,
             font_family="RobotoMono",
         )
 
+    def set_color(self, color: LetterColor):
+        """Changes color of letter (without updating gui)"""
+        self.color = color.value
+        self.text_element.color = self.color
+
+    def build(self):
+        return self.text_element
+
+
+class TextRenderer(Enum):
+    """Enum for MainText rendering backends"""
+
+    # one Letter control per char
+    LETTERS = "letters"
+    # one Text control per line with run-length colored spans
+    SPANS = "spans"
+
+
+def count_controls(control: ft.Control) -> int:
+    """Returns amount of controls in tree of MainText content (including control)"""
+
+    if isinstance(control, Letter):
+        # UserControl and its Text
+        return 2
+
+    children = []
+    if isinstance(control, (ft.Row, ft.Column)):
+        children = control.controls
+    elif isinstance(control, ft.Container) and control.content is not None:
+        children = [control.content]
+
+    return 1 + sum(count_controls(child) for child in children)
+
+
+def split_into_lines(text: str, line_length: int) -> List[int]:
+    """Splits text into lines (by words, like gui wraps it)
+
+    Args:
+        text (str): text to split
+        line_length (int): maximum amount of chars in line
+
+    Returns:
+        List[int]: start positions of lines in text
+    """
+
+    line_starts = [0]
+    current_length = 0
+    word_start = 0
+
+    while word_start < len(text):
+        word_end = text.find(" ", word_start)
+        word_end = len(text) if word_end == -1 else word_end + 1
+        word_length = word_end - word_start
+
+        if current_length > 0 and current_length + word_length > line_length:
+            line_starts.append(word_start)
+            current_length = 0
+
+        current_length += word_length
+        word_start = word_end
+
+    return line_starts
+
 
 class MainText(ft.UserControl):
     """Graphic element for displaying typing test text"""
 
-    def __init__(self, text: str, letter_colors: List[LetterColor] = None):
+    def __init__(
+        self,
+        text: str,
+        letter_colors: List[LetterColor] = None,
+        windowed: bool = False,
+        renderer: TextRenderer = TextRenderer.LETTERS,
+        render_scheduler: RenderScheduler | None = None,
+    ):
+        """
+        Args:
+            text (str): text to visualize
+            letter_colors (List[LetterColor], optional):
+                if None it equivalent to List[LetterColor.UNUSED]
+            windowed (bool, optional): if True only lines around cursor are built,
+                so render cost does not depend on text length
+            renderer (TextRenderer, optional): rendering backend
+            render_scheduler (RenderScheduler | None, optional):
+                if set, changes made while typing are sent to gui through it
+        """
+
         super().__init__()
         self.text = text
         self.letter_colors = (
@@ -43,17 +127,59 @@ class MainText(ft.UserControl):
             if letter_colors is not None
             else [LetterColor.UNUSED] * len(text)
         )
+        self.windowed = windowed
+        self.renderer = renderer
+        self.render_scheduler = render_scheduler
+
+        self.line_starts = split_into_lines(
+            self.text, constants.MAIN_TEXT_WINDOW["line_length"]
+        )
+        self.first_visible_line = 0
+
+        # Letter controls by position in text, kept alive between updates
+        # (in windowed mode only for visible letters)
+        self.letters: Dict[int, Letter] = {}
+        # Text controls by line index (only with TextRenderer.SPANS)
+        self.line_texts: Dict[int, ft.Text] = {}
 
         self.content_container = ft.Container(self.generate_content())
 
-    def generate_content(self):
-        """Returns content with self.text and self.letter_colors"""
+    def get_line(self, position: int) -> int:
+        """Returns index of line which contains position"""
+        return bisect_right(self.line_starts, position) - 1
+
+    def get_line_end(self, line: int) -> int:
+        """Returns end position (exclusive) of line"""
+        if line + 1 < len(self.line_starts):
+            return self.line_starts[line + 1]
+        return len(self.text)
+
+    def get_visible_lines(self) -> range:
+        """Returns indices of lines which are built"""
+
+        if not self.windowed:
+            return range(len(self.line_starts))
+
+        last_line = min(
+            len(self.line_starts),
+            self.first_visible_line
+            + constants.MAIN_TEXT_WINDOW["lines_before"]
+            + constants.MAIN_TEXT_WINDOW["lines_after"]
+            + 1,
+        )
+        return range(self.first_visible_line, last_line)
+
+    def generate_words_row(self, start: int, end: int, wrap: bool = False) -> ft.Row:
+        """Returns row of words with letters from self.text[start:end]"""
 
         current_word_letters: List[Letter] = []
         completed_words = []
 
-        for letter, color in zip(self.text, self.letter_colors):
-            current_word_letters.append(Letter(letter, color))
+        for position in range(start, end):
+            letter = self.text[position]
+
+            self.letters[position] = Letter(letter, self.letter_colors[position])
+            current_word_letters.append(self.letters[position])
             if letter == " ":
                 completed_words.append(
                     ft.Row(current_word_letters, spacing=0, run_spacing=0, wrap=True)
@@ -65,14 +191,71 @@ class MainText(ft.UserControl):
                 ft.Row(current_word_letters, spacing=0, run_spacing=0, wrap=True)
             )
 
+        return ft.Row(controls=completed_words, wrap=wrap, spacing=0, run_spacing=0)
+
+    def generate_spans(self, start: int, end: int) -> List[ft.TextSpan]:
+        """Returns spans for self.text[start:end],
+        consecutive chars with same color are joined into one span"""
+
+        spans = []
+        position = start
+
+        for color, group in groupby(self.letter_colors[start:end]):
+            length = sum(1 for _ in group)
+            spans.append(
+                ft.TextSpan(
+                    self.text[position : position + length],
+                    style=ft.TextStyle(color=color.value),
+                )
+            )
+            position += length
+
+        return spans
+
+    def generate_line(self, line: int) -> ft.Control:
+        """Returns control for one line of text"""
+
+        start, end = self.line_starts[line], self.get_line_end(line)
+
+        if self.renderer == TextRenderer.SPANS:
+            self.line_texts[line] = ft.Text(
+                spans=self.generate_spans(start, end),
+                size=FONT_SIZE,
+                font_family="RobotoMono",
+            )
+            return self.line_texts[line]
+
+        return self.generate_words_row(start, end)
+
+    def generate_content(self):
+        """Returns content with self.text and self.letter_colors"""
+
+        self.letters = {}
+        self.line_texts = {}
+
+        if self.windowed or self.renderer == TextRenderer.SPANS:
+            content = ft.Column(
+                [self.generate_line(line) for line in self.get_visible_lines()],
+                spacing=0,
+            )
+        else:
+            content = self.generate_words_row(0, len(self.text), wrap=True)
+
         return ft.Container(
-            content=ft.Row(
-                controls=completed_words, wrap=True, spacing=0, run_spacing=0
-            ),
+            content=content,
             alignment=ft.alignment.center,
             width=constants.MAIN_TEXT_WIDTH,
         )
 
+    def get_render_stats(self) -> Dict[str, int]:
+        """Returns amount of built controls and spans (to compare renderers,
+        patch bytes are measured by simulator.compare_renderers)"""
+
+        return {
+            "controls": count_controls(self.content_container),
+            "spans": sum(len(text.spans) for text in self.line_texts.values()),
+        }
+
     def update_content(self, text: str, letter_colors: List[LetterColor] | None = None):
         """Updates gui with new text
 
@@ -83,15 +266,115 @@ class MainText(ft.UserControl):
         """
 
         if letter_colors is None:
-            letter_colors = [LetterColor.UNUSED] * len(self.text)
+            letter_colors = [LetterColor.UNUSED] * len(text)
 
         self.text = text
         self.letter_colors = letter_colors
 
+        self.line_starts = split_into_lines(
+            self.text, constants.MAIN_TEXT_WINDOW["line_length"]
+        )
+        self.first_visible_line = 0
+
         self.content_container.content = self.generate_content()
 
         self.content_container.update()
         self.update()
 
+    def extend_content(self, text: str):
+        """Appends text to the end, letter_colors are padded with LetterColor.UNUSED
+
+        Args:
+            text (str): text to append
+        """
+
+        self.text += text
+        self.letter_colors.extend(
+            [LetterColor.UNUSED] * (len(self.text) - len(self.letter_colors))
+        )
+
+        # last line can be continued by appended text
+        last_line = len(self.line_starts) - 1
+        last_line_start = self.line_starts.pop()
+        self.line_starts.extend(
+            last_line_start + line_start
+            for line_start in split_into_lines(
+                self.text[last_line_start:], constants.MAIN_TEXT_WINDOW["line_length"]
+            )
+        )
+
+        # appended text is not visible
+        if self.windowed and self.get_visible_lines().stop <= last_line:
+            return
+
+        self.content_container.content = self.generate_content()
+        send_updates(self.render_scheduler, self.content_container)
+
+    def set_cursor(self, position: int):
+        """Scrolls visible lines (in windowed mode) so line with cursor is shown
+
+        Args:
+            position (int): position of cursor in text
+        """
+
+        if not self.windowed:
+            return
+
+        window_size = (
+            constants.MAIN_TEXT_WINDOW["lines_before"]
+            + constants.MAIN_TEXT_WINDOW["lines_after"]
+            + 1
+        )
+        first_visible_line = min(
+            max(
+                0, self.get_line(position) - constants.MAIN_TEXT_WINDOW["lines_before"]
+            ),
+            max(0, len(self.line_starts) - window_size),
+        )
+
+        if first_visible_line == self.first_visible_line:
+            return
+
+        self.first_visible_line = first_visible_line
+        self.content_container.content = self.generate_content()
+        send_updates(self.render_scheduler, self.content_container)
+
+    def update_letters(self, letter_colors: Dict[int, LetterColor]):
+        """Recolors letters on given positions without rebuilding content,
+        so only changed letters are sent to gui
+
+        Args:
+            letter_colors (Dict[int, LetterColor]): new colors by position in text
+        """
+
+        changed_letters: List[Letter] = []
+        changed_lines = set()
+
+        for position, color in letter_colors.items():
+            self.letter_colors[position] = color
+
+            if self.renderer == TextRenderer.SPANS:
+                # line is not built (out of visible lines)
+                if self.get_line(position) in self.line_texts:
+                    changed_lines.add(self.get_line(position))
+                continue
+
+            # letter is not built (out of visible lines)
+            letter = self.letters.get(position)
+            if letter is not None and letter.color != color.value:
+                letter.set_color(color)
+                changed_letters.append(letter)
+
+        for line in sorted(changed_lines):
+            self.line_texts[line].spans = self.generate_spans(
+                self.line_starts[line], self.get_line_end(line)
+            )
+
+        send_updates(
+            self.render_scheduler,
+            *changed_letters,
+            *(self.line_texts[line] for line in sorted(changed_lines))
+        )
+
     def build(self):
         return self.content_container
@@ -0,0 +1,122 @@
+"""Monotonic clock and DeadlineTimer"""
+
+import time
+import asyncio
+import threading
+from functools import partial
+from typing import Callable
+from src import constants
+
+
+def now_ns() -> int:
+    """Returns monotonic clock time (in nanoseconds), used for all test timings"""
+    return time.perf_counter_ns()
+
+
+class DeadlineTimer:
+    """
+    Calls on_tick with given refresh rate and on_deadline exactly at deadline.
+    Callbacks are scheduled on asyncio loop (if given) and run in its executor,
+    so they can use sync flet api, otherwise threading.Timer is used
+    """
+
+    def __init__(
+        self,
+        on_tick: Callable[[], None] | None = None,
+        on_deadline: Callable[[], None] | None = None,
+        refresh_rate: float = constants.TIMER["refresh_rate"],
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        """
+        Args:
+            on_tick (Callable[[], None] | None, optional): called refresh_rate
+                times per second until timer is stopped or deadline is reached
+            on_deadline (Callable[[], None] | None, optional): called at deadline
+            refresh_rate (float, optional): ticks per second
+            loop (asyncio.AbstractEventLoop | None, optional): loop to schedule on
+        """
+
+        self.on_tick = on_tick
+        self.on_deadline = on_deadline
+        self.tick_interval_ns = int(constants.NANOSECONDS_IN_SECOND / refresh_rate)
+        self.loop = loop
+
+        self.start_ns: int | None = None
+        self.deadline_ns: int | None = None
+        # callbacks scheduled with older generation are ignored
+        self.generation = 0
+
+    def start(self, start_ns: int | None = None, duration_ns: int | None = None):
+        """Starts timer
+
+        Args:
+            start_ns (int | None, optional): now_ns() of start, current time if None
+            duration_ns (int | None, optional): time from start to deadline,
+                timer has no deadline if None
+        """
+
+        self.generation += 1
+        self.start_ns = start_ns if start_ns is not None else now_ns()
+        self.deadline_ns = None if duration_ns is None else self.start_ns + duration_ns
+
+        if self.on_tick is not None:
+            self.call_at(
+                self.start_ns + self.tick_interval_ns, self.tick, self.generation, 1
+            )
+        if self.deadline_ns is not None:
+            self.call_at(self.deadline_ns, self.deadline, self.generation)
+
+    def stop(self):
+        """Stops timer, scheduled callbacks will not be called"""
+        self.generation += 1
+
+    def tick(self, generation: int, tick_index: int):
+        """Calls on_tick and schedules next tick"""
+
+        if generation != self.generation:
+            return
+
+        # ticks are counted from start, so they do not drift
+        next_tick_ns = self.start_ns + (tick_index + 1) * self.tick_interval_ns
+        if self.deadline_ns is None or next_tick_ns < self.deadline_ns:
+            self.call_at(next_tick_ns, self.tick, generation, tick_index + 1)
+
+        self.on_tick()
+
+    def deadline(self, generation: int):
+        """Stops timer and calls on_deadline"""
+
+        if generation != self.generation:
+            return
+
+        self.stop()
+        self.on_deadline()
+
+    def call_at(self, time_ns: int, callback: Callable, *args):
+        """Schedules callback(*args) at now_ns() == time_ns"""
+
+        if self.loop is None:
+            timer = threading.Timer(
+                max(0.0, (time_ns - now_ns()) / constants.NANOSECONDS_IN_SECOND),
+                callback,
+                args,
+            )
+            timer.daemon = True
+            timer.start()
+            return
+
+        def schedule():
+            # delay is calculated in loop thread, right before scheduling
+            delay = (time_ns - now_ns()) / constants.NANOSECONDS_IN_SECOND
+            self.loop.call_at(
+                self.loop.time() + max(0.0, delay),
+                self.loop.run_in_executor,
+                None,
+                partial(callback, *args),
+            )
+
+        try:
+            self.loop.call_soon_threadsafe(schedule)
+        except RuntimeError:
+            # loop is closed (application is closing)
+            pass
@@ -0,0 +1,74 @@
+"""Realizes TypingState"""
+
+from typing import List, Tuple
+
+
+class TypingState:
+    """
+    State of typed text with cursor.
+    Buffer is preallocated, so typing and deleting a char are O(1)
+    """
+
+    def __init__(self, correct_text: str):
+        self.correct_text = correct_text
+
+        # typed chars, only buffer[:cursor] is meaningful
+        self.buffer: List[str] = [""] * len(correct_text)
+        self.cursor = 0
+
+    def extend(self, text: str):
+        """Appends text to the end of correct text"""
+
+        self.correct_text += text
+        self.buffer.extend([""] * len(text))
+
+    def is_finished(self) -> bool:
+        """Returns True if whole correct text is typed"""
+        return self.cursor == len(self.correct_text)
+
+    def get_expected(self) -> str:
+        """Returns char which needs to be typed next"""
+        return self.correct_text[self.cursor]
+
+    def type_char(self, key: str) -> Tuple[int, bool]:
+        """Types char at cursor
+
+        Args:
+            key (str): typed char
+
+        Returns:
+            Tuple[int, bool]: position of typed char and if it is correct
+        """
+
+        position = self.cursor
+        self.buffer[position] = key
+        self.cursor += 1
+
+        return position, key == self.correct_text[position]
+
+    def can_delete(self) -> bool:
+        """Returns True if char before cursor can be deleted
+        (it is not possible to delete correctly typed space)"""
+
+        if self.cursor == 0:
+            return False
+
+        position = self.cursor - 1
+        return self.buffer[position] != " " or self.correct_text[position] != " "
+
+    def delete(self) -> int:
+        """Deletes char before cursor, returns its position"""
+
+        self.cursor -= 1
+        return self.cursor
+
+    def get_printed_text(self) -> str:
+        """Returns typed text (O(n), not used while typing)"""
+        return "".join(self.buffer[: self.cursor])
+
+    def set_printed_text(self, printed_text: str):
+        """Replaces typed text (O(n), not used while typing)"""
+
+        self.cursor = 0
+        for key in printed_text:
+            self.type_char(key)
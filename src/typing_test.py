@@ -1,16 +1,21 @@
 """Realizes Typing test class"""
 
-import datetime
+import threading
 from enum import Enum
-from flet_timer.flet_timer import Timer
+from itertools import islice
+from typing import Iterator
 import flet as ft
 
 from src import constants
-from .text_generator import TextGenerator
+from .text_generator import TextGenerator, new_seed
+from .text_pool import TextPool
 from .settings_bar import SettingsBar
 from .information_bar import InformationBar
 from .statistics_classes import Statistics, HeatmapStatistics
-from .text_visualizing import MainText, LetterColor
+from .render_scheduler import RenderScheduler
+from .typing_state import TypingState
+from .timing import DeadlineTimer
+from .text_visualizing import MainText, LetterColor, TextRenderer
 
 
 class TypingTest:
@@ -25,6 +30,8 @@ class TypingTest:
 
     def __init__(self, page: ft.Page):
         self.status = self.TestStatus.NOT_STARTED
+        # stop() is called by timer thread (deadline) and ui thread (last key)
+        self.status_lock = threading.Lock()
         self.page = page
 
         self.language = "en"
@@ -32,22 +39,40 @@ class TypingTest:
         # if not None (size_mode = time) means amount of seconds given for test
         self.available_time: int | None = None
 
-        self.timer = None
+        # updates information bar and ends test in time mode
+        self.timer = DeadlineTimer(
+            on_tick=self.on_timer_tick,
+            on_deadline=self.stop,
+            loop=getattr(page, "loop", None),
+        )
 
         self.words_to_generate = constants.DEFAULT_WORDS_COUNT[1]
 
         self.text_generator = TextGenerator(language=self.language)
-        self.correct_text = self.text_generator.generate(self.words_to_generate)
+        # ready texts for all settings, generated in background
+        self.text_pool = TextPool()
+        # words for extending text while typing (only in time mode)
+        self.text_stream: Iterator[str] | None = None
+        # text is determined by generator settings and seed
+        self.text_seed = new_seed()
+        self.typing_state = TypingState(
+            self.text_generator.generate_text(self.words_to_generate, self.text_seed)
+        )
         self.letter_colors = [LetterColor.UNUSED] * len(self.correct_text)
         self.display_text = self.correct_text
 
-        self.printed_text = ""
+        # collects gui changes made while typing and sends them once per frame
+        self.render_scheduler = RenderScheduler(page)
 
         self.main_text = MainText(
-            text=self.display_text, letter_colors=self.letter_colors
+            text=self.display_text,
+            letter_colors=self.letter_colors,
+            windowed=True,
+            renderer=TextRenderer(constants.MAIN_TEXT_RENDERER),
+            render_scheduler=self.render_scheduler,
         )
         self.settings_bar = SettingsBar(typing_test=self, language="en")
-        self.information_bar = InformationBar()
+        self.information_bar = InformationBar(render_scheduler=self.render_scheduler)
         self.statistics: Statistics = None
         self.heatmap = HeatmapStatistics()
 
@@ -58,6 +83,20 @@ class TypingTest:
             horizontal_alignment=ft.CrossAxisAlignment.CENTER,
         )
 
+    @property
+    def correct_text(self) -> str:
+        """Text which needs to be typed"""
+        return self.typing_state.correct_text
+
+    @property
+    def printed_text(self) -> str:
+        """Already typed text (O(n), use typing_state while typing)"""
+        return self.typing_state.get_printed_text()
+
+    @printed_text.setter
+    def printed_text(self, value: str):
+        self.typing_state.set_printed_text(value)
+
     def start(self):
         """Initializes new test (after user pressed button)"""
 
@@ -72,32 +111,51 @@ class TypingTest:
             language=self.language,
             punctuation=self.text_generator.punctuation,
             numbers=self.text_generator.numbers,
+            seed=self.text_seed,
+            generator_settings=self.text_generator.get_settings(),
         )
 
         self.visual_element.controls[0] = self.information_bar
         self.visual_element.update()
 
-        self.timer = Timer(name="timer", interval_s=1, callback=self.every_second)
-        self.page.views[-1].controls.append(self.timer)
-        self.page.views[-1].update()
+        self.timer.start(
+            start_ns=self.statistics.start_ns,
+            duration_ns=(
+                self.available_time * constants.NANOSECONDS_IN_SECOND
+                if self.size_mode == "time"
+                else None
+            ),
+        )
 
     def stop(self):
         """Ends test (when user typed everything or time run out)"""
 
-        if self.status is not self.TestStatus.RUNNING:
-            return
+        with self.status_lock:
+            if self.status is not self.TestStatus.RUNNING:
+                return
+            self.status = self.TestStatus.ENDED
 
-        self.status = self.TestStatus.ENDED
+        self.timer.stop()
         self.statistics.end()
         self.statistics.save()
         self.heatmap.save()
 
-        self.timer = None
-        self.page.views[-1].controls.pop()
-        self.page.views[-1].update()
+        # targets changed, so next text is generated while statistics are shown
+        self.update_targets()
+        self.text_pool.prefetch(
+            self.text_generator.get_settings(), self.words_to_generate
+        )
+
+        self.render_scheduler.flush()
 
         self.page.go("/stats")
 
+    def close(self):
+        """Stops background threads of test (when page is closed)"""
+
+        self.timer.stop()
+        self.text_pool.close()
+
     def restart(self):
         """
         Restart test
@@ -105,29 +163,84 @@ class TypingTest:
         """
 
         self.status = self.TestStatus.NOT_STARTED
+        self.timer.stop()
         self.statistics = None
         self.regenerate_text()
-        self.printed_text = ""
 
         self.visual_element.controls[0] = self.settings_bar
         self.visual_element.update()
 
-    def every_second(self):
-        """Updates statistics and checks if test ended"""
+    def on_timer_tick(self):
+        """Updates statistics during test"""
         if self.status == self.TestStatus.RUNNING:
             self.update_information_bar()
 
-            if self.size_mode == "time":
-                current_time = datetime.datetime.now()
-                delta = current_time - self.statistics.start_time
+    def regenerate_text(self, seed: int | None = None):
+        """Updates text content according to settings
+
+        Args:
+            seed (int | None, optional): seed of text (random text if None)
+        """
+
+        if seed is None:
+            self.update_targets()
+            seed, text = self.text_pool.get(
+                self.text_generator.get_settings(), self.words_to_generate
+            )
+        else:
+            text = self.text_generator.generate_text(self.words_to_generate, seed)
+
+        self.text_seed = seed
+        # in time mode text is extended while typing
+        self.text_stream = (
+            self.text_generator.stream(seed) if self.size_mode == "time" else None
+        )
+
+        self.set_text(text)
+
+    def update_targets(self):
+        """Sets adaptive sampling targets from heatmap (if sampling is adaptive)"""
+
+        if self.text_generator.sampling == "adaptive":
+            self.text_generator.set_targets(self.heatmap.get_targets(self.language))
+
+    def retry(self, statistics: Statistics):
+        """Restarts test with same text as in saved test (with its settings and size)
+
+        Raises:
+            ValueError: test was saved without seed or generator settings
+        """
+
+        if not statistics.is_reproducible():
+            raise ValueError("test was saved without seed, its text is unknown")
+
+        settings = statistics.generator_settings
+        self.status = self.TestStatus.NOT_STARTED
+        self.timer.stop()
+        self.statistics = None
 
-                if delta.total_seconds() >= self.available_time:
-                    self.stop()
+        self.language = settings["language"]
+        self.text_generator = TextGenerator(**settings)
+        self.size_mode = statistics.test_size_mode
+        if self.size_mode == "time":
+            self.available_time = int(statistics.test_size)
+            self.words_to_generate = constants.TEXT_STREAM["initial_words"]
+        else:
+            self.available_time = None
+            self.words_to_generate = int(statistics.test_size)
 
-    def regenerate_text(self):
-        """Updates text content according to settings"""
+        self.regenerate_text(seed=statistics.seed)
 
-        self.correct_text = self.text_generator.generate(self.words_to_generate)
+        self.visual_element.controls[0] = self.settings_bar
+        self.visual_element.update()
+        self.settings_bar.show_settings()
+
+    def set_text(self, text: str):
+        """Replaces text which needs to be typed
+        (resizes letter colors and rebuilds main text)"""
+
+        self.typing_state = TypingState(text)
+        self.display_text = text
         self.letter_colors = [LetterColor.UNUSED] * len(self.correct_text)
         self.main_text.update_content(self.correct_text, self.letter_colors)
 
@@ -143,11 +256,21 @@ class TypingTest:
         self.text_generator.toggle_numbers()
         self.regenerate_text()
 
+    def toggle_adaptive(self):
+        """Switches between adaptive and default words sampling"""
+
+        self.text_generator.set_sampling(
+            constants.TEXT_GENERATOR["sampling"]
+            if self.text_generator.sampling == "adaptive"
+            else "adaptive"
+        )
+        self.regenerate_text()
+
     def select_time(self, count: int = 15):
         """Changes test mode to "time" and sets time to {count}"""
         self.size_mode = "time"
         self.available_time = count
-        self.words_to_generate = constants.TYPING_TEST_DEFAULT_WORDS_ON_TIME
+        self.words_to_generate = constants.TEXT_STREAM["initial_words"]
 
         self.regenerate_text()
 
@@ -168,6 +291,17 @@ class TypingTest:
 
         self.regenerate_text()
 
+    def extend_text(self):
+        """Appends next chunk of words from text stream (in time mode)"""
+
+        chunk = " " + " ".join(
+            islice(self.text_stream, constants.TEXT_STREAM["chunk_words"])
+        )
+
+        self.typing_state.extend(chunk)
+        self.letter_colors.extend([LetterColor.UNUSED] * len(chunk))
+        self.main_text.extend_content(chunk)
+
     def update_information_bar(self):
         """Update wpm & accuracy text (during test)"""
 
@@ -177,6 +311,9 @@ class TypingTest:
         wpm = self.statistics.get_wpm()
         self.information_bar.set_wpm(f"{wpm:.1f}")
 
+        rolling_wpm = self.statistics.get_rolling_wpm()
+        self.information_bar.set_rolling_wpm(f"{rolling_wpm:.1f}")
+
     def key_pressed(self, e):
         """Handles user key press event"""
 
@@ -194,35 +331,46 @@ class TypingTest:
         ):
             self.start()
 
-        if key == "backspace":
-            idx = len(self.printed_text) - 1
-            if idx >= 0 and (
-                self.printed_text[idx] != " "
-                or self.printed_text[idx] != self.correct_text[idx]
-            ):
+        # positions of letters which color was changed by this key press
+        changed_positions = []
 
-                self.printed_text = self.printed_text[:-1]
-                self.letter_colors[idx] = LetterColor.UNUSED
+        if key == "backspace":
+            if self.typing_state.can_delete():
+                position = self.typing_state.delete()
+                self.letter_colors[position] = LetterColor.UNUSED
                 self.statistics.key_pressed(key)
+                changed_positions.append(position)
 
         elif key in constants.ALLOWED_CHARS:
-            position = len(self.printed_text)
-            need_key = self.correct_text[position]
+            need_key = self.typing_state.get_expected()
 
             self.heatmap.add_key_press(need_type=need_key, typed=key)
 
-            self.printed_text += key
-            if need_key == key:
-                self.letter_colors[position] = LetterColor.CORRECT
-                self.statistics.key_pressed(key, is_correct=True)
-            else:
-                self.letter_colors[position] = LetterColor.WRONG
-                self.statistics.key_pressed(key, is_correct=False)
+            position, is_correct = self.typing_state.type_char(key)
+            self.letter_colors[position] = (
+                LetterColor.CORRECT if is_correct else LetterColor.WRONG
+            )
+            self.statistics.key_pressed(key, is_correct=is_correct, expected=need_key)
+            changed_positions.append(position)
+
+            if (
+                self.text_stream is not None
+                and len(self.correct_text) - self.typing_state.cursor
+                < constants.TEXT_STREAM["refill_chars"]
+            ):
+                self.extend_text()
 
-        self.main_text.update_content(self.correct_text, self.letter_colors)
+        if changed_positions:
+            self.main_text.update_letters(
+                {
+                    position: self.letter_colors[position]
+                    for position in changed_positions
+                }
+            )
+            self.main_text.set_cursor(self.typing_state.cursor)
 
         if self.status == self.TestStatus.RUNNING:
             self.update_information_bar()
 
-        if len(self.correct_text) == len(self.printed_text):
+        if self.typing_state.is_finished():
             self.stop()
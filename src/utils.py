@@ -2,7 +2,8 @@ import os
 import wget
 import numpy as np
 import pandas as pd
-from src.constants import STATISTICS_FIELD_NAMES
+from src.aggregates import get_aggregate_store
+from src.history import get_history_store
 from src import constants
 
 
@@ -29,11 +30,10 @@ def load_assets():
     if not os.path.exists("./saves"):
         os.makedirs("./saves")
 
-    if not os.path.isfile("./saves/" + constants.FILE_NAMES["data"]):
-        with open(
-            "./saves/" + constants.FILE_NAMES["data"], "w", encoding="utf-8"
-        ) as f:
-            f.write(",".join(STATISTICS_FIELD_NAMES) + "\n")
+    # creates database (and imports data.csv of older versions)
+    get_history_store()
+    # rebuilds aggregates if they miss saved tests
+    get_aggregate_store()
 
     if not os.path.isfile("./saves/" + constants.FILE_NAMES["heatmap"]):
         with open(
@@ -0,0 +1,379 @@
+"""Vocabulary and process-wide vocabulary store"""
+
+import os
+import mmap
+import struct
+import threading
+from array import array
+from functools import partial
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Tuple
+import numpy as np
+from src.ngram_index import NgramIndex
+from src.persistence import write_atomically, write_parts
+from src.sampling import AliasTable, zipf_weights
+from src import constants
+
+
+def normalize_word(line: str) -> str | None:
+    """Returns lowercased and stripped word (None if it has not ALLOWED_CHARS)"""
+
+    word = line.strip().lower()
+    if word and " " not in word and all(c in constants.ALLOWED_CHARS for c in word):
+        return word
+    return None
+
+
+def normalize_words(lines: Iterable[str]) -> List[str]:
+    """Returns lowercased and stripped words which consist of ALLOWED_CHARS only"""
+    return [word for word in map(normalize_word, lines) if word is not None]
+
+
+class Vocabulary:
+    """
+    Normalized words stored as utf-8 blob and array of word offsets in it.
+    Compiled vocabulary is saved to binary cache file, which is memory-mapped,
+    so loading it does not parse anything
+    """
+
+    # magic, version, words count, size and modification time of source file
+    HEADER = struct.Struct("<4sHIqq")
+    MAGIC = b"TVOC"
+    VERSION = 1
+    OFFSET_DTYPE = np.dtype("<u8")
+    CACHE_SUFFIX = ".bin"
+
+    def __init__(self, offsets: np.ndarray, blob, source: mmap.mmap | None = None):
+        """
+        Args:
+            offsets (np.ndarray): start of every word in blob (and end of blob)
+            blob: utf-8 encoded words without separators (bytes or memoryview)
+            source (mmap.mmap | None, optional): mapped file (kept open)
+        """
+
+        self.offsets = offsets
+        self.blob = blob
+        self.source = source
+        # all words decoded, created only when needed
+        self.words_array: np.ndarray | None = None
+        # weighted sampling tables ("weights" or ("zipf", exponent))
+        self.alias_tables: Dict[Hashable, AliasTable] = {}
+        self.ngram_index: NgramIndex | None = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("vocabulary index out of range")
+
+        return bytes(
+            self.blob[int(self.offsets[index]) : int(self.offsets[index + 1])]
+        ).decode("utf-8")
+
+    def to_array(self) -> np.ndarray:
+        """Returns numpy array of all words (decoded once)"""
+
+        if self.words_array is None:
+            self.words_array = np.array([self[index] for index in range(len(self))])
+        return self.words_array
+
+    def take(self, indices: np.ndarray) -> np.ndarray:
+        """Returns numpy array of words with given indices (same shape)"""
+
+        if (
+            self.words_array is None
+            and len(self) > constants.VOCABULARY["max_materialized_words"]
+        ):
+            # only needed words are decoded, so only their pages are touched
+            indices = np.asarray(indices)
+            return np.array(
+                [self[index] for index in indices.reshape(-1).tolist()], dtype=str
+            ).reshape(indices.shape)
+
+        return self.to_array()[indices]
+
+    def get_zipf_table(self, exponent: float) -> AliasTable:
+        """Returns alias table with Zipf weights by rank (built once)"""
+
+        if ("zipf", exponent) not in self.alias_tables:
+            self.alias_tables[("zipf", exponent)] = AliasTable(
+                zipf_weights(len(self), exponent)
+            )
+        return self.alias_tables[("zipf", exponent)]
+
+    def set_weights(self, weights: Iterable[float]):
+        """Sets explicit weights of words (used with "weights" sampling)"""
+
+        weights = np.fromiter(weights, dtype=np.float64)
+        if len(weights) != len(self):
+            raise ValueError("amount of weights must be equal to amount of words")
+        self.alias_tables["weights"] = AliasTable(weights)
+
+    def get_weights_table(self) -> AliasTable:
+        """Returns alias table with explicit weights"""
+
+        if "weights" not in self.alias_tables:
+            raise ValueError("weights of vocabulary are not set")
+        return self.alias_tables["weights"]
+
+    def get_ngram_index(self) -> NgramIndex:
+        """Returns index from letters and bigrams to word ids (built once)"""
+
+        if self.ngram_index is None:
+            self.ngram_index = NgramIndex.from_words(
+                self[index] for index in range(len(self))
+            )
+        return self.ngram_index
+
+    @classmethod
+    def from_words(cls, words: List[str]) -> "Vocabulary":
+        """Creates vocabulary from list of words"""
+
+        encoded = [word.encode("utf-8") for word in words]
+        offsets = np.zeros(len(encoded) + 1, dtype=cls.OFFSET_DTYPE)
+        np.cumsum([len(word) for word in encoded], out=offsets[1:])
+
+        return cls(offsets, b"".join(encoded))
+
+    @classmethod
+    def compile(cls, source_path: Path, cache_path: Path):
+        """Normalizes words from source file and writes binary cache file"""
+
+        with open(source_path, "r", encoding="utf8") as source_file:
+            vocabulary = cls.from_words(normalize_words(source_file))
+
+        cls.write_cache(
+            source_path,
+            cache_path,
+            len(vocabulary),
+            vocabulary.offsets.tobytes(),
+            vocabulary.blob,
+        )
+
+    @classmethod
+    def map_cache(
+        cls, cache_path: Path, source_path: Path | None = None
+    ) -> Tuple[mmap.mmap, int]:
+        """Memory-maps cache file and checks its header
+
+        Args:
+            cache_path (Path): cache file
+            source_path (Path | None, optional): if set, raises ValueError
+                when cache was compiled from other version of source file
+
+        Returns:
+            Tuple[mmap.mmap, int]: mapped file and amount of words
+        """
+
+        with open(cache_path, "rb") as cache_file:
+            source = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(source) < cls.HEADER.size:
+            source.close()
+            raise ValueError(f"{cache_path} is not a vocabulary cache file")
+
+        magic, version, count, source_size, source_mtime_ns = cls.HEADER.unpack_from(
+            source
+        )
+        if magic != cls.MAGIC or version != cls.VERSION:
+            source.close()
+            raise ValueError(f"{cache_path} is not a vocabulary cache file")
+
+        if source_path is not None:
+            source_stat = os.stat(source_path)
+            if (source_stat.st_size, source_stat.st_mtime_ns) != (
+                source_size,
+                source_mtime_ns,
+            ):
+                source.close()
+                raise ValueError(f"{cache_path} is outdated")
+
+        return source, count
+
+    @classmethod
+    def write_cache(cls, source_path: Path, cache_path: Path, count: int, *parts):
+        """Writes header and parts (bytes-like) to cache file atomically"""
+
+        source_stat = os.stat(source_path)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+        header = cls.HEADER.pack(
+            cls.MAGIC,
+            cls.VERSION,
+            count,
+            source_stat.st_size,
+            source_stat.st_mtime_ns,
+        )
+        write_atomically(str(cache_path), partial(write_parts, (header,) + parts))
+
+    @classmethod
+    def load(cls, cache_path: Path, source_path: Path | None = None) -> "Vocabulary":
+        """Memory-maps binary cache file
+
+        Args:
+            cache_path (Path): compiled vocabulary
+            source_path (Path | None, optional): if set, raises ValueError
+                when cache was compiled from other version of source file
+        """
+
+        source, count = cls.map_cache(cache_path, source_path)
+
+        offsets = np.frombuffer(
+            source, dtype=cls.OFFSET_DTYPE, count=count + 1, offset=cls.HEADER.size
+        )
+        blob = memoryview(source)[cls.HEADER.size + offsets.nbytes :]
+
+        return cls(offsets, blob, source=source)
+
+
+class IndexedVocabulary(Vocabulary):
+    """
+    Vocabulary which words are read from memory-mapped source file itself.
+    Only index of words (their bounds in source file) is persisted,
+    so loading is O(1) and only pages of drawn words are read into memory.
+    Used for big word lists and corpora
+    """
+
+    MAGIC = b"TVIX"
+    CACHE_SUFFIX = ".idx"
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        text,
+        source: mmap.mmap | None = None,
+    ):
+        """
+        Args:
+            starts (np.ndarray): start of every word in text
+            ends (np.ndarray): end of every word in text
+            text: utf-8 encoded source file (bytes or mmap)
+            source (mmap.mmap | None, optional): mapped index file (kept open)
+        """
+
+        super().__init__(starts, text, source=source)
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("vocabulary index out of range")
+
+        # source is not normalized, words are only stripped in index
+        return (
+            self.blob[int(self.offsets[index]) : int(self.ends[index])]
+            .decode("utf-8")
+            .lower()
+        )
+
+    @classmethod
+    def compile(cls, source_path: Path, cache_path: Path):
+        """Finds bounds of all words in source file (in one streaming pass)
+        and writes them to index file"""
+
+        starts, ends = array("Q"), array("Q")
+
+        with open(source_path, "rb") as source_file:
+            position = 0
+            for line in source_file:
+                word = line.strip()
+                if normalize_word(word.decode("utf-8", errors="replace")) is not None:
+                    start = position + len(line) - len(line.lstrip())
+                    starts.append(start)
+                    ends.append(start + len(word))
+                position += len(line)
+
+        cls.write_cache(
+            source_path,
+            cache_path,
+            len(starts),
+            np.frombuffer(starts, dtype=np.uint64).astype(cls.OFFSET_DTYPE).tobytes(),
+            np.frombuffer(ends, dtype=np.uint64).astype(cls.OFFSET_DTYPE).tobytes(),
+        )
+
+    @classmethod
+    def load(
+        cls, cache_path: Path, source_path: Path | None = None
+    ) -> "IndexedVocabulary":
+        """Memory-maps index file and source file
+
+        Args:
+            cache_path (Path): index file
+            source_path (Path | None, optional): source file, must be set
+        """
+
+        if source_path is None:
+            raise ValueError("source_path is required for indexed vocabulary")
+
+        source, count = cls.map_cache(cache_path, source_path)
+        starts = np.frombuffer(
+            source, dtype=cls.OFFSET_DTYPE, count=count, offset=cls.HEADER.size
+        )
+        ends = np.frombuffer(
+            source,
+            dtype=cls.OFFSET_DTYPE,
+            count=count,
+            offset=cls.HEADER.size + starts.nbytes,
+        )
+
+        text = b""
+        if os.path.getsize(source_path) > 0:
+            with open(source_path, "rb") as source_file:
+                text = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return cls(starts, ends, text, source=source)
+
+
+def get_cache_path(source_path: Path, vocabulary_class=Vocabulary) -> Path:
+    """Returns path of binary cache for vocabulary file"""
+    return Path(constants.VOCABULARY_CACHE_DIR) / (
+        Path(source_path).name + vocabulary_class.CACHE_SUFFIX
+    )
+
+
+_vocabularies: Dict[Tuple[str, str | None], Vocabulary] = {}
+_vocabularies_lock = threading.Lock()
+
+
+def get_vocabulary(source_path: Path, vocabulary_class=None) -> Vocabulary:
+    """Returns vocabulary of file, it is loaded once per process
+    (from binary cache, which is compiled if missing or outdated)
+
+    Args:
+        source_path (Path): source file
+        vocabulary_class (optional): Vocabulary or its subclass,
+            if None big files are read through IndexedVocabulary
+    """
+
+    key = (
+        os.path.abspath(source_path),
+        None if vocabulary_class is None else vocabulary_class.__name__,
+    )
+
+    with _vocabularies_lock:
+        if key not in _vocabularies:
+            if vocabulary_class is None:
+                vocabulary_class = (
+                    IndexedVocabulary
+                    if os.path.getsize(source_path)
+                    >= constants.VOCABULARY["indexed_min_bytes"]
+                    else Vocabulary
+                )
+            cache_path = get_cache_path(source_path, vocabulary_class)
+            try:
+                vocabulary = vocabulary_class.load(cache_path, source_path=source_path)
+            except (OSError, ValueError):
+                vocabulary_class.compile(source_path, cache_path)
+                vocabulary = vocabulary_class.load(cache_path, source_path=source_path)
+
+            _vocabularies[key] = vocabulary
+
+        return _vocabularies[key]
@@ -0,0 +1,104 @@
+import datetime
+import pytest
+from src.aggregates import AggregateStore
+from src.history import HistoryStore
+from src import aggregates
+from tests.test_history import make_row
+
+
+@pytest.fixture
+def aggregate_store(tmp_path):
+    return AggregateStore(str(tmp_path / "aggregates.json"))
+
+
+def test_add_bests_and_averages(aggregate_store):
+    aggregate_store.add(make_row("2024-01-01 10:00:00.000000", wpm=40.0))
+    aggregate_store.add(make_row("2024-01-01 11:00:00.000000", wpm=60.0))
+    aggregate_store.add(make_row("2024-01-01 12:00:00.000000", language="ru"))
+
+    buckets = aggregate_store.get_buckets()
+    assert len(buckets) == 2
+
+    key, aggregate = buckets[0]
+    assert key == ("en", "words", 25, False, True)
+    assert aggregate.count == 2
+    assert aggregate.best_wpm == 60.0
+    assert aggregate.best_wpm_time == "2024-01-01 11:00:00.000000"
+    assert aggregate.get_average_wpm() == pytest.approx(50.0)
+    assert aggregate.get_wpm_deviation() == pytest.approx(10.0)
+    assert aggregate.get_average_accuracy() == pytest.approx(95.0)
+
+
+def test_last_results(aggregate_store):
+    for wpm in range(20):
+        aggregate_store.add(
+            make_row("2024-01-01 10:00:00.000000", wpm=float(wpm)), save=False
+        )
+
+    aggregate = aggregate_store.get_buckets()[0][1]
+    assert list(aggregate.last_wpm) == [float(wpm) for wpm in range(10, 20)]
+    assert aggregate.get_last_average_wpm() == pytest.approx(14.5)
+
+
+def test_streaks(aggregate_store):
+    for day in ["2024-01-01", "2024-01-02", "2024-01-02", "2024-01-03", "2024-01-05"]:
+        aggregate_store.add(make_row(f"{day} 10:00:00.000000"), save=False)
+
+    assert aggregate_store.best_streak == 3
+    assert aggregate_store.get_current_streak(datetime.date(2024, 1, 6)) == 1
+    assert aggregate_store.get_current_streak(datetime.date(2024, 1, 7)) == 0
+
+
+def test_save_and_load(aggregate_store):
+    aggregate_store.add(make_row("2024-01-01 10:00:00.000000", wpm=70.0))
+    aggregate_store.add(make_row("2024-01-02 10:00:00.000000"))
+
+    loaded = AggregateStore(aggregate_store.path)
+    key, aggregate = loaded.get_buckets()[0]
+    assert key == ("en", "words", 25, False, True)
+    assert aggregate.to_dict() == aggregate_store.get_buckets()[0][1].to_dict()
+    assert loaded.last_day == "2024-01-02"
+    assert loaded.best_streak == 2
+    assert loaded.tests_count == 2
+
+
+def test_rebuild(aggregate_store):
+    aggregate_store.add(make_row("2024-01-01 10:00:00.000000", wpm=100.0))
+
+    aggregate_store.rebuild(
+        [
+            make_row("2024-01-02 10:00:00.000000", wpm=30.0),
+            make_row("2024-01-03 10:00:00.000000", wpm=50.0),
+        ]
+    )
+
+    aggregate = AggregateStore(aggregate_store.path).get_buckets()[0][1]
+    assert aggregate.count == 2
+    assert aggregate.best_wpm == 50.0
+    assert aggregate_store.best_streak == 2
+
+
+def test_rebuilt_when_history_has_other_tests(tmp_path, monkeypatch):
+    history_store = HistoryStore(str(tmp_path / "history.db"))
+    history_store.add(make_row("2024-01-01 10:00:00.000000", wpm=30.0))
+    history_store.add(make_row("2024-01-02 10:00:00.000000", wpm=50.0))
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "saves").mkdir()
+    monkeypatch.setattr("src.aggregates.get_history_store", lambda: history_store)
+
+    # aggregates.json is missing
+    monkeypatch.setattr("src.aggregates._aggregate_store", None)
+    aggregate = aggregates.get_aggregate_store().get_buckets()[0][1]
+    assert aggregate.count == 2
+    assert aggregate.best_wpm == 50.0
+
+    # test was saved to history, but not to aggregates (crash)
+    history_store.add(make_row("2024-01-03 10:00:00.000000", wpm=70.0))
+    monkeypatch.setattr("src.aggregates._aggregate_store", None)
+    aggregate_store = aggregates.get_aggregate_store()
+    assert aggregate_store.tests_count == 3
+    assert aggregate_store.get_buckets()[0][1].best_wpm == 70.0
+    assert aggregate_store.best_streak == 3
+
+    history_store.close()
@@ -0,0 +1,135 @@
+import os
+import datetime
+import numpy as np
+import pytest
+from src.columnar_history import ColumnarHistory, main
+from src.history import HistoryStore
+from tests.test_history import make_row
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ColumnarHistory(str(tmp_path / "columns"))
+
+
+def test_same_rows_as_sqlite(history, tmp_path):
+    history_store = HistoryStore(str(tmp_path / "history.db"))
+    rows = [
+        make_row("2024-01-02 10:00:00.000001", wpm=50.5, seed=2**52 - 1),
+        make_row("2024-01-01 10:00:00.000000", language="ru", generator='{"a": 1}'),
+        make_row("2024-01-03 10:00:00.999999", test_size_mode="time", test_size=30),
+    ]
+    for row in rows:
+        assert history.add(row) == history_store.add(row)
+
+    assert history.count_tests() == 3
+    assert history.get_tests(limit=2, offset=1) == history_store.get_tests(
+        limit=2, offset=1
+    )
+    history_store.close()
+
+
+def test_columns_are_memory_mapped(history):
+    history.add(make_row("2024-01-02 10:00:00.000000", language="ru"))
+    history.add(make_row("2024-01-03 10:00:00.000000"))
+
+    columns = history.load()
+    assert isinstance(columns["wpm"], np.memmap)
+    assert columns["wpm"].dtype == np.float32
+    assert list(columns["language"]) == [0, 1]
+    assert history.meta["codes"]["language"] == ["ru", "en"]
+
+
+def test_torn_row_is_cut(history):
+    history.add(make_row("2024-01-02 10:00:00.000000", keystroke_log="first.bin"))
+
+    # crash after some columns of second row were written
+    with open(history.get_path("wpm"), "ab") as wpm_file:
+        wpm_file.write(np.float32(1.0).tobytes())
+    with open(history.get_path("keystroke_log", "blob"), "ab") as blob_file:
+        blob_file.write(b"torn")
+
+    assert history.count_tests() == 1
+    history.add(make_row("2024-01-03 10:00:00.000000", keystroke_log="second.bin"))
+
+    tests = history.get_tests()
+    assert [test["keystroke_log"] for test in tests] == ["second.bin", "first.bin"]
+    assert tests[0]["wpm"] == 50.0
+
+
+def test_csv_conversion(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text(
+        "wpm,accuracy,test_size_mode,test_size,language,punctuation,numbers,"
+        "total_key_presses,correct_key_presses,start_time,end_time,seed\n"
+        "42.5,90.0,time,30,ru,True,False,10,9,"
+        "10:00:00.000001 02/01/24,10:00:30.000001 02/01/24,\n"
+        "60.0,100.0,words,25,en,False,True,50,50,"
+        "11:00:00.000000 02/01/24,11:00:30.000000 02/01/24,12345\n",
+        encoding="utf-8",
+    )
+    directory = str(tmp_path / "columns")
+
+    main(["from-csv", str(csv_path), directory])
+    history = ColumnarHistory(directory)
+    assert history.count_tests() == 2
+    assert history.get_tests()[0]["seed"] == 12345
+
+    main(["to-csv", str(tmp_path / "exported.csv"), directory])
+    exported = (tmp_path / "exported.csv").read_text(encoding="utf-8").splitlines()
+    assert exported[1].startswith("42.5,90.0,time,30,ru,True,False,10,9,")
+    assert "10:00:00.000001 02/01/24" in exported[1]
+    assert exported[2].endswith(",12345,")
+    assert os.path.exists(csv_path)
+
+
+def test_same_query_as_sqlite(history, tmp_path):
+    history_store = HistoryStore(str(tmp_path / "history.db"))
+    for row in [
+        make_row("2024-01-01 10:00:00.000000", wpm=40.0),
+        make_row("2024-01-02 10:00:00.000000", wpm=70.0, language="ru"),
+        make_row("2024-01-03 10:00:00.000000", wpm=60.0),
+        make_row("2024-01-04 10:00:00.000000", wpm=70.0, test_size_mode="time"),
+    ]:
+        history.add(row)
+        history_store.add(row)
+
+    for query in [
+        {"sort_by": "wpm", "language": "en", "wpm_min": 50.0},
+        {"sort_by": "wpm", "descending": False, "limit": 2, "offset": 1},
+        {"start_from": datetime.datetime(2024, 1, 2), "wpm_max": 65.0},
+        {"language": "de"},
+    ]:
+        assert history.query(**query) == history_store.query(**query)
+
+    assert history.count_tests(test_size_mode="words") == 3
+    history_store.close()
+
+
+def test_pages_same_as_sqlite(history, tmp_path):
+    history_store = HistoryStore(str(tmp_path / "history.db"))
+    rows = [
+        make_row(f"2024-01-{day:02d} 10:00:00.000000", wpm=float(wpm))
+        for day, wpm in [(1, 40), (2, 70), (2, 60), (3, 70), (4, 50), (5, 70)]
+    ]
+    for row in rows:
+        history.add(row)
+        history_store.add(row)
+    assert history.meta["time_ordered"]
+
+    for sort_by in ["start_time", "wpm"]:
+        for descending in [True, False]:
+            for offset, limit in [(0, 2), (2, 2), (4, 2), (5, 10), (8, 2), (1, None)]:
+                query = {
+                    "sort_by": sort_by,
+                    "descending": descending,
+                    "limit": limit,
+                    "offset": offset,
+                }
+                assert history.query(**query) == history_store.query(**query)
+
+    history.add(make_row("2023-01-01 10:00:00.000000"))
+    assert not history.meta["time_ordered"]
+    assert not ColumnarHistory(history.directory).meta["time_ordered"]
+    assert history.get_tests()[-1]["id"] == 7
+    history_store.close()
@@ -0,0 +1,124 @@
+import datetime
+import sqlite3
+import pytest
+from src.history import HistoryStore
+from src.statistics_classes import Statistics
+from src.constants import STATISTICS_FIELD_NAMES
+
+
+@pytest.fixture
+def history_store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def make_row(start_time: str, **values):
+    row = {
+        "wpm": 50.0,
+        "accuracy": 95.0,
+        "test_size_mode": "words",
+        "test_size": 25,
+        "language": "en",
+        "punctuation": False,
+        "numbers": True,
+        "total_key_presses": 100,
+        "correct_key_presses": 95,
+        "start_time": start_time,
+        "end_time": start_time,
+    }
+    row.update(values)
+    return row
+
+
+def test_add_and_get_tests(history_store):
+    history_store.add(make_row("2024-01-02 10:00:00.000000"))
+    history_store.add(make_row("2024-01-01 10:00:00.000000", language="ru"))
+    history_store.add(make_row("2024-01-03 10:00:00.000000", seed=2**52 - 1))
+
+    assert history_store.count_tests() == 3
+
+    tests = history_store.get_tests(limit=2)
+    assert [test["id"] for test in tests] == [3, 1]
+    assert tests[0]["seed"] == 2**52 - 1
+    assert [test["language"] for test in history_store.get_tests(offset=2)] == ["ru"]
+
+    statistics = Statistics.from_row(tests[1])
+    assert statistics.numbers is True
+    assert statistics.get_accuracy() == 95.0
+    assert statistics.start_time.day == 2
+
+
+def test_wal_and_indexes(history_store):
+    assert (
+        history_store.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    )
+    indexes = {
+        row["name"]
+        for row in history_store.connection.execute("PRAGMA index_list(tests)")
+    }
+    assert set(HistoryStore.INDEXES) <= indexes
+
+
+def test_missing_columns_are_added(tmp_path):
+    path = str(tmp_path / "history.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE tests (id INTEGER PRIMARY KEY, wpm REAL)")
+    connection.close()
+
+    store = HistoryStore(path)
+    columns = {
+        row["name"] for row in store.connection.execute("PRAGMA table_info(tests)")
+    }
+    assert set(STATISTICS_FIELD_NAMES) <= columns
+    store.close()
+
+
+def test_import_csv(history_store, tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text(
+        "wpm,accuracy,test_size_mode,test_size,language,punctuation,numbers,"
+        "total_key_presses,correct_key_presses,start_time,end_time\n"
+        "42.5,90.0,time,30,ru,True,False,10,9,"
+        "10:00:00.000001 02/01/24,10:00:30.000001 02/01/24\n",
+        encoding="utf-8",
+    )
+
+    assert history_store.import_csv(str(csv_path)) == 1
+    assert not csv_path.exists()
+    assert (tmp_path / "data.csv.imported").exists()
+
+    test = history_store.get_tests()[0]
+    assert test["wpm"] == 42.5
+    assert test["test_size"] == 30
+    assert test["punctuation"] == 1
+    assert test["start_time"] == "2024-01-02 10:00:00.000001"
+    assert test["seed"] is None
+
+
+def test_query(history_store):
+    history_store.add(make_row("2024-01-01 10:00:00.000000", wpm=40.0))
+    history_store.add(make_row("2024-01-02 10:00:00.000000", wpm=70.0, language="ru"))
+    history_store.add(make_row("2024-01-03 10:00:00.000000", wpm=60.0))
+    history_store.add(
+        make_row("2024-01-04 10:00:00.000000", wpm=70.0, test_size_mode="time")
+    )
+
+    tests = history_store.query(sort_by="wpm", language="en", wpm_min=50.0)
+    assert [test["id"] for test in tests] == [4, 3]
+
+    tests = history_store.query(
+        start_from=datetime.datetime(2024, 1, 2),
+        start_to=datetime.datetime(2024, 1, 4),
+        descending=False,
+    )
+    assert [test["id"] for test in tests] == [2, 3]
+
+    tests = history_store.query(sort_by="wpm", limit=2, offset=1, language=None)
+    assert [test["id"] for test in tests] == [2, 3]
+    assert history_store.count_tests(test_size_mode="words", wpm_max=60.0) == 2
+
+    with pytest.raises(ValueError):
+        history_store.query(mode="words")
+    with pytest.raises(ValueError):
+        history_store.query(sort_by="language")
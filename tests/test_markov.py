@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from src.markov import MarkovModel, get_markov_model, tokenize
+from src.text_generator import TextGenerator
+from src import constants
+
+CORPUS = [
+    "The cat sat on the mat.\n",
+    "The cat ate the fish, and the dog sat\n",
+    "on the mat 42 times.\n",
+]
+
+
+def test_tokenize():
+    assert tokenize("«Hello», world 42 it's!") == ["hello", "world", None, None]
+
+
+def test_train():
+    model = MarkovModel.train(CORPUS, order=2)
+    rng = np.random.default_rng(42)
+
+    words = [model.words[index] for index in range(len(model.words))]
+    cat = np.array([[words.index("cat")]])
+    on = np.array([[words.index("on")]])
+
+    successors = {model.words[int(model.step(cat, rng)[0][0])] for _ in range(100)}
+    assert successors == {"sat", "ate"}
+    assert model.words[int(model.step(on, rng)[0][0])] == "the"
+
+    # "the" is followed by "cat" and "mat" twice, "fish" and "dog" once
+    the = np.repeat([[words.index("the")]], 10000, axis=0)
+    next_words, contexts = model.step(the, rng)
+    frequencies = np.bincount(next_words, minlength=len(words)) / len(next_words)
+    assert frequencies[words.index("fish")] == pytest.approx(1 / 6, abs=0.02)
+    assert list(contexts[0]) == [next_words[0]]
+
+
+def test_dead_end():
+    model = MarkovModel.train(["a b c"], order=3)
+    rng = np.random.default_rng(42)
+
+    # context "b c" has no successors, so text continues from "a b"
+    next_words, _ = model.step(np.array([[1, 2]]), rng)
+    assert model.words[int(next_words[0])] == "c"
+
+
+def test_compile_and_load(monkeypatch, tmp_path):
+    monkeypatch.setattr(constants, "MARKOV_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr("src.markov._models", {})
+    source_path = tmp_path / "corpus.txt"
+    source_path.write_text("".join(CORPUS), encoding="utf8")
+
+    model = get_markov_model(source_path, order=2)
+    assert get_markov_model(source_path, order=2) is model
+    assert model.source is not None
+
+    trained = MarkovModel.train(CORPUS, order=2)
+    assert np.array_equal(model.context_keys, trained.context_keys)
+    assert np.array_equal(model.cumulative, trained.cumulative)
+    assert model.words[len(model.words) - 1] == "times"
+
+
+def test_markov_generation(monkeypatch, tmp_path):
+    monkeypatch.setattr(constants, "MARKOV_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr("src.markov._models", {})
+    source_path = tmp_path / "corpus.txt"
+    source_path.write_text("one two three four\n" * 3, encoding="utf8")
+    monkeypatch.setitem(constants.LANGUAGE_TO_CORPUS, "en", source_path)
+
+    text_generator = TextGenerator(language="en", sampling="markov")
+    text = text_generator.generate(20)
+    assert len(text.split()) == 20
+    assert "two three" in text
+
+    for text in text_generator.generate_batch(3, 10):
+        words = text.split()
+        assert len(words) == 10
+        order = ["one", "two", "three", "four"]
+        for previous, current in zip(words, words[1:]):
+            # "four" is end of corpus, after it text continues from random place
+            assert (
+                previous == "four" or order.index(current) == order.index(previous) + 1
+            )
+
+
+def test_missing_corpus(tmp_path):
+    with pytest.raises(FileNotFoundError, match="LANGUAGE_TO_CORPUS"):
+        get_markov_model(tmp_path / "missing.txt")
@@ -0,0 +1,63 @@
+import pytest
+from src.passages import PassageIndex, get_passage_index
+from src.text_generator import TextGenerator
+from src import constants
+
+BOOK = (
+    "Chapter one\n"
+    "\n"
+    "It was a bright cold day in april, and the clocks\n"
+    "were striking thirteen.\n"
+    "\n"
+    'This paragraph has "quotes" so it can not be typed at all.\n'
+    "\n"
+    "  The last paragraph is short, but long enough to be a passage.  \n"
+)
+
+
+@pytest.fixture
+def book_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(constants, "VOCABULARY_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr("src.vocabulary._vocabularies", {})
+    path = tmp_path / "book.txt"
+    path.write_text(BOOK, encoding="utf8")
+    return path
+
+
+def test_passage_index(book_path):
+    passage_index = get_passage_index(book_path)
+
+    assert isinstance(passage_index, PassageIndex)
+    assert list(passage_index) == [
+        "it was a bright cold day in april, and the clocks were striking thirteen.",
+        "the last paragraph is short, but long enough to be a passage.",
+    ]
+    assert (book_path.parent / "cache" / "book.txt.pidx").exists()
+
+
+def test_long_paragraph_is_split(monkeypatch, book_path):
+    monkeypatch.setitem(constants.PASSAGES, "min_chars", 5)
+    monkeypatch.setitem(constants.PASSAGES, "max_chars", 40)
+    book_path.write_text(
+        "first sentence is here.\nsecond one\nends here.\nand then the end\n",
+        encoding="utf8",
+    )
+
+    assert list(get_passage_index(book_path)) == [
+        "first sentence is here.",
+        "second one ends here.",
+        "and then the end",
+    ]
+
+
+def test_passages_generation(monkeypatch, book_path):
+    monkeypatch.setitem(constants.LANGUAGE_TO_BOOKS, "en", book_path)
+    text_generator = TextGenerator(language="en", sampling="passages", seed=42)
+    text = text_generator.generate(30)
+    assert len(text.split()) == 30
+    # passages follow each other like in book
+    assert "thirteen. the last paragraph" in text or "passage. it was" in text
+
+    stream = text_generator.stream()
+    assert len([next(stream) for _ in range(100)]) == 100
+    assert len(text_generator.generate_batch(2, 5)) == 2
@@ -0,0 +1,95 @@
+import json
+import threading
+from functools import partial
+import pytest
+from src.persistence import PersistenceWriter, write_atomically, write_json
+
+
+@pytest.fixture
+def writer():
+    writer = PersistenceWriter()
+    yield writer
+    writer.close()
+
+
+def test_jobs_run_in_order_before_flush(writer):
+    done = []
+    release = threading.Event()
+
+    writer.submit(release.wait)
+    for index in range(5):
+        writer.submit(lambda index=index: done.append(index))
+
+    # first job blocks the worker, so nothing is written yet
+    assert not writer.flush(timeout=0.01)
+    assert done == []
+
+    release.set()
+    assert writer.flush(timeout=5)
+    assert done == [0, 1, 2, 3, 4]
+
+
+def test_failed_job_does_not_stop_writer(writer, capsys):
+    done = []
+
+    def fail():
+        raise OSError("disk is full")
+
+    writer.submit(fail)
+    writer.submit(lambda: done.append(True))
+
+    assert writer.flush(timeout=5)
+    assert done == [True]
+    assert "disk is full" in capsys.readouterr().err
+
+
+def test_close_finishes_queued_jobs():
+    writer = PersistenceWriter()
+    done = []
+    for index in range(100):
+        writer.submit(lambda index=index: done.append(index))
+    writer.close()
+
+    assert done == list(range(100))
+    # closed writer runs jobs in caller thread
+    writer.submit(lambda: done.append(100))
+    assert done[-1] == 100
+
+
+def test_write_atomically(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("old")
+
+    def write_half(temporary_path):
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write("ne")
+        raise OSError("crash")
+
+    with pytest.raises(OSError):
+        write_atomically(str(path), write_half)
+    assert path.read_text() == "old"
+    assert [file.name for file in tmp_path.iterdir()] == ["data.csv"]
+
+    write_atomically(
+        str(path),
+        lambda temporary_path: open(temporary_path, "w", encoding="utf-8").close(),
+    )
+    assert path.read_text() == ""
+
+
+def test_threads_write_same_file(tmp_path):
+    path = str(tmp_path / "meta.json")
+    threads = [
+        threading.Thread(
+            target=write_atomically, args=(path, partial(write_json, {"thread": i}))
+        )
+        for i in range(16)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(path, "r", encoding="utf-8") as file:
+        assert json.load(file)["thread"] in range(16)
+    assert [file.name for file in tmp_path.iterdir()] == ["meta.json"]
@@ -0,0 +1,82 @@
+import time
+import flet as ft
+from src.render_scheduler import RenderScheduler, send_updates
+
+
+class MockPage:
+    """A mock implementation of the flet.Page class for testing purposes."""
+
+    def __init__(self):
+        self.updates = []
+
+    def update(self, *controls):
+        self.updates.append(controls)
+
+
+def test_burst_is_collapsed_into_one_update():
+    page = MockPage()
+    # big interval, so timer never fires during test
+    scheduler = RenderScheduler(page, max_fps=0.001)
+    scheduler.last_flush_time = time.perf_counter()
+
+    first, second = ft.Text("a"), ft.Text("b")
+    first.page = second.page = page
+
+    for _ in range(100):
+        scheduler.mark_dirty(first)
+        scheduler.mark_dirty(second, first)
+
+    assert page.updates == []
+
+    scheduler.flush()
+    assert page.updates == [(first, second)]
+
+    scheduler.flush()
+    assert len(page.updates) == 1
+
+
+def test_removed_controls_are_skipped():
+    page = MockPage()
+    scheduler = RenderScheduler(page)
+
+    mounted, removed = ft.Text("a"), ft.Text("b")
+    mounted.page = page
+
+    scheduler.mark_dirty(removed, mounted)
+    scheduler.flush()
+
+    assert page.updates == [(mounted,)]
+
+
+def test_flushes_by_timer():
+    page = MockPage()
+    scheduler = RenderScheduler(page, max_fps=5)
+    scheduler.last_flush_time = time.perf_counter()
+
+    control = ft.Text("a")
+    control.page = page
+    scheduler.mark_dirty(control)
+
+    timer = scheduler.flush_timer
+    assert page.updates == []
+    timer.join()
+
+    assert page.updates == [(control,)]
+
+
+def test_send_updates():
+    page = MockPage()
+    scheduler = RenderScheduler(page, max_fps=0.001)
+    scheduler.last_flush_time = time.perf_counter()
+
+    control = ft.Text("a")
+    control.page = page
+    send_updates(scheduler, control)
+    assert page.updates == []
+    scheduler.flush()
+    assert page.updates == [(control,)]
+
+    updated = []
+    control.update = lambda: updated.append(True)
+    send_updates(None, control)
+    assert updated == [True]
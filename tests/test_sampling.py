@@ -0,0 +1,33 @@
+import random
+import numpy as np
+import pytest
+from src.sampling import AliasTable, zipf_weights
+
+
+def test_alias_table_distribution():
+    weights = np.array([1.0, 2.0, 0.0, 7.0])
+    alias_table = AliasTable(weights)
+
+    samples = alias_table.sample(np.random.default_rng(42), 100000)
+    frequencies = np.bincount(samples, minlength=len(weights)) / len(samples)
+
+    assert frequencies[2] == 0
+    assert np.allclose(frequencies, weights / weights.sum(), atol=0.01)
+
+
+def test_alias_table_sample_one():
+    alias_table = AliasTable(zipf_weights(3, 1.0))
+    rng = random.Random(42)
+
+    counts = [0, 0, 0]
+    for _ in range(30000):
+        counts[alias_table.sample_one(rng)] += 1
+
+    # weights are 1, 1/2, 1/3
+    assert counts[0] > counts[1] > counts[2]
+    assert abs(counts[0] / counts[2] - 3) < 0.3
+
+
+def test_alias_table_invalid_weights():
+    with pytest.raises(ValueError):
+        AliasTable(np.array([0.0, 0.0]))
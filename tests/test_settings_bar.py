@@ -36,7 +36,8 @@ def typing_test_mock(monkeypatch):
     page = MockPage()
     typing_test = TypingTest(page)
 
-    return typing_test
+    yield typing_test
+    typing_test.close()
 
 
 def test_toggle_punctuation(typing_test_mock):
@@ -0,0 +1,86 @@
+import pytest
+from src.simulator import (
+    LoadDriver,
+    scripted_stream,
+    random_typist_stream,
+    recorded_stream,
+    char_to_key,
+    compare_renderers,
+)
+from src.typing_test import TypingTest, LetterColor
+from src.text_visualizing import TextRenderer
+from src.utils import load_assets
+
+# fixed text, so seeded streams are reproducible
+TEXT = "the quick brown fox jumps over the lazy dog and runs far away"
+
+
+@pytest.fixture
+def driver():
+    load_assets()
+    driver = LoadDriver()
+    yield driver
+    driver.close()
+
+
+def test_scripted_stream_ends_test(driver):
+    typing_test = driver.typing_test
+    text = typing_test.correct_text
+
+    report = driver.run(scripted_stream(["x", "backspace"] + list(text)))
+
+    assert typing_test.status == TypingTest.TestStatus.ENDED
+    assert report.get_events_count() == len(text) + 2
+    # every key press is rendered with its own frame (timer ticks add more)
+    assert report.page_updates >= report.get_events_count()
+    assert typing_test.statistics.total_key_presses == len(text) + 1
+    assert typing_test.statistics.correct_key_presses == len(text)
+
+
+def test_random_typist(driver):
+    typing_test = driver.typing_test
+    driver.set_text(TEXT)
+    stream = random_typist_stream(typing_test, wpm=100, error_rate=0.1, seed=1)
+
+    report = driver.run(stream)
+
+    assert typing_test.status == TypingTest.TestStatus.ENDED
+    # error in last char is not fixed, because test ends on it
+    assert typing_test.statistics.correct_key_presses == sum(
+        color == LetterColor.CORRECT for color in typing_test.letter_colors
+    )
+    assert report.get_throughput() > 0
+    assert report.get_percentile(50) <= report.get_percentile(100)
+
+
+def test_recorded_stream(driver):
+    typing_test = driver.typing_test
+    driver.set_text(TEXT)
+    driver.run(random_typist_stream(typing_test, error_rate=0.2, seed=2))
+    statistics = typing_test.statistics
+
+    replay_driver = LoadDriver()
+    replay_driver.set_text(TEXT)
+    replay_driver.run(recorded_stream(statistics.keystroke_log))
+
+    replayed = replay_driver.typing_test.statistics
+    replay_driver.close()
+    assert replayed.total_key_presses == statistics.total_key_presses
+    assert replayed.correct_key_presses == statistics.correct_key_presses
+
+
+def test_char_to_key():
+    assert char_to_key("й", "ru") == "q"
+    assert char_to_key("a", "en") == "a"
+    assert char_to_key(" ", "ru") == " "
+
+
+def test_compare_renderers():
+    text = " ".join(["abc"] * 100)
+    results = compare_renderers(text, typed="abd" + text[3:60])
+    letters, spans = results[TextRenderer.LETTERS], results[TextRenderer.SPANS]
+
+    assert spans["controls"] < letters["controls"]
+    assert spans["initial_patch_bytes"] < letters["initial_patch_bytes"]
+    assert letters["typing_patch_bytes"] > 0
+    assert spans["typing_patch_bytes"] > 0
@@ -1,10 +1,18 @@
 import datetime
+import os
 from unittest.mock import patch, MagicMock
 from src.constants import LANGUAGE_LETTERS, STATISTICS_FIELD_NAMES
 from src import constants
-from src.statistics_classes import Statistics, HeatmapStatistics
+from src.statistics_classes import (
+    Statistics,
+    HeatmapStatistics,
+    KeystrokeLog,
+    RollingWpm,
+)
 import numpy as np
+import pytest
 import pandas as pd
+from src.persistence import get_writer
 
 
 @patch("src.statistics_classes.datetime")
@@ -48,11 +56,19 @@ def test_statistics_get_accuracy():
     assert stats.get_accuracy() == 80.0
 
 
-@patch("src.statistics_classes.datetime")
-def test_statistics_get_cpm(mock_datetime):
+@patch("src.statistics_classes.now_ns")
+def test_statistics_get_cpm(mock_now_ns):
+    mock_now_ns.return_value = 0
     stats = Statistics()
+    mock_now_ns.return_value = 60 * 10**9
+    stats.correct_key_presses = 300
+    assert stats.get_cpm() == 300.0
+
+
+@patch("src.statistics_classes.datetime")
+def test_statistics_get_cpm_loaded(mock_datetime):
+    stats = Statistics(start_time=datetime.datetime(2023, 1, 1))
     mock_datetime.datetime.now.return_value = datetime.datetime(2023, 1, 1, 0, 1)
-    stats.start_time = datetime.datetime(2023, 1, 1)
     stats.correct_key_presses = 300
     assert stats.get_cpm() == 300.0
 
@@ -62,3 +78,226 @@ def test_statistics_get_wpm():
     stats.correct_key_presses = 300
     with patch.object(stats, "get_cpm", return_value=300):
         assert stats.get_wpm() == 60.0
+
+
+def test_keystroke_log_add():
+    stats = Statistics()
+    stats.key_pressed("a", is_correct=True, expected="a", timestamp=10)
+    stats.key_pressed("b", is_correct=False, expected="c", timestamp=20)
+    stats.key_pressed("backspace", timestamp=30)
+
+    log = stats.keystroke_log
+    assert len(log) == 3
+    assert list(log.timestamps) == [10, 20, 30]
+    assert [chr(key) for key in log.keys] == ["a", "b", KeystrokeLog.BACKSPACE]
+    assert list(log.correct) == [1, 0, 0]
+
+
+def test_keystroke_log_save_load(tmp_path):
+    log = KeystrokeLog(start_timestamp=0)
+    log.add("a", expected="a", is_correct=True, timestamp=100)
+    log.add("ы", expected="ф", is_correct=False, timestamp=200)
+    log.end(300)
+
+    log.save(tmp_path / "log.bin")
+    loaded = KeystrokeLog.load(tmp_path / "log.bin")
+
+    assert loaded.start_timestamp == 0
+    assert loaded.end_timestamp == 300
+    assert loaded.timestamps == log.timestamps
+    assert loaded.keys == log.keys
+    assert loaded.expected == log.expected
+    assert loaded.correct == log.correct
+
+
+def test_keystroke_log_copy():
+    log = KeystrokeLog(start_timestamp=0)
+    log.add("a", expected="a", is_correct=True, timestamp=100)
+    log.end(200)
+    # event which is being added by other thread
+    log.timestamps.append(300)
+
+    copy = log.copy()
+    log.add("b", expected="b", is_correct=True, timestamp=400)
+
+    assert len(copy) == 1
+    assert list(copy.keys) == [ord("a")]
+    assert copy.end_timestamp == 200
+
+
+def test_save_submits_snapshot(monkeypatch):
+    jobs = []
+    writer = MagicMock()
+    writer.submit.side_effect = jobs.append
+    monkeypatch.setattr("src.statistics_classes.get_writer", lambda: writer)
+
+    stats = Statistics()
+    stats.key_pressed("a", is_correct=True, expected="a")
+    stats.end()
+    stats.save()
+    stats.key_pressed("b", is_correct=True, expected="b")
+
+    keystroke_log = jobs[0].args[1]
+    assert keystroke_log is not stats.keystroke_log
+    assert len(keystroke_log) == 1
+
+
+def test_keystroke_log_replay():
+    log = KeystrokeLog(start_timestamp=0)
+    for i, (key, expected) in enumerate(["aa", "bc", "cc"]):
+        log.add(key, expected=expected, is_correct=key == expected, timestamp=i)
+    log.add("backspace", timestamp=3)
+    # one minute
+    log.end(60 * 10**9)
+
+    heatmap = MagicMock()
+    stats = log.replay(start_time=datetime.datetime(2023, 1, 1), heatmap=heatmap)
+
+    assert stats.total_key_presses == 3
+    assert stats.correct_key_presses == 2
+    assert stats.end_time == datetime.datetime(2023, 1, 1, 0, 1)
+    assert stats.get_cpm() == 2.0
+    assert len(stats.keystroke_log) == 4
+    heatmap.add_key_press.assert_any_call(need_type="c", typed="b")
+
+
+def test_rolling_wpm():
+    second = 10**9
+    rolling_wpm = RollingWpm(window_ns=5 * second, capacity=4)
+
+    for timestamp in range(5):
+        rolling_wpm.add(timestamp * second)
+    # capacity is exceeded, oldest key press is overwritten
+    assert rolling_wpm.size == 4
+
+    # 4 chars in 5 seconds
+    assert rolling_wpm.get_wpm(5 * second) == 4 / (5 / 60) / 5
+    # 3 chars in 5 seconds
+    assert rolling_wpm.get_wpm(6 * second) == 3 / (5 / 60) / 5
+    assert rolling_wpm.get_wpm(100 * second) == 0.0
+
+    # window is shortened to test duration: 3 chars in 2 seconds, not in 5
+    rolling_wpm = RollingWpm(window_ns=5 * second, capacity=4)
+    for timestamp in [0, second // 2, second]:
+        rolling_wpm.add(timestamp)
+    assert rolling_wpm.get_wpm(2 * second, start_ns=0) == 3 / (2 / 60) / 5
+    assert rolling_wpm.get_wpm(2 * second) == 3 / (5 / 60) / 5
+
+
+def test_wpm_series():
+    second = 10**9
+    stats = Statistics()
+    stats.keystroke_log.start_timestamp = 0
+    stats.start_ns = 0
+    # one correct key press every 0.2 seconds during 3 seconds
+    for index in range(1, 16):
+        stats.key_pressed("a", is_correct=True, timestamp=index * second // 5)
+    stats.key_pressed("b", is_correct=False, timestamp=3 * second)
+    stats.keystroke_log.end(3 * second + 1)
+
+    # 5 chars per second == 60 wpm
+    assert stats.calculate_wpm_series() == [60.0, 60.0, 60.0]
+
+
+def test_heatmap_targets(tmp_path):
+    with patch("src.statistics_classes.pd.read_csv") as read_csv:
+        read_csv.return_value = {
+            "en": np.zeros(len(constants.LANGUAGE_LETTERS["ru"]) ** 2, dtype=int),
+            "ru": np.zeros(len(constants.LANGUAGE_LETTERS["ru"]) ** 2, dtype=int),
+        }
+        heatmap = HeatmapStatistics(journal_path=str(tmp_path / "journal.csv"))
+
+    for _ in range(3):
+        heatmap.add_key_press(need_type="q", typed="w")
+    heatmap.add_key_press(need_type="e", typed="r")
+
+    assert heatmap.get_worst_cells("en") == [("q", "w", 3), ("e", "r", 1)]
+    assert heatmap.get_worst_cells("ru") == []
+    assert dict(heatmap.get_targets("en")) == {
+        "q": 3,
+        "qw": 3,
+        "wq": 3,
+        "e": 1,
+        "er": 1,
+        "re": 1,
+    }
+
+
+def test_heatmap_journal(tmp_path, monkeypatch):
+    path = str(tmp_path / "heatmap.csv")
+    journal_path = str(tmp_path / "journal.csv")
+    HeatmapStatistics.write(
+        {
+            "en": np.zeros((26, 26), dtype=int),
+            "ru": np.zeros((33, 33), dtype=int),
+        },
+        path,
+    )
+    monkeypatch.setitem(constants.HEATMAP_JOURNAL, "compact_bytes", 25)
+
+    heatmap = HeatmapStatistics(path, journal_path)
+    heatmap.add_key_press(need_type="a", typed="s")
+    heatmap.add_key_press(need_type="a", typed="s")
+    heatmap.add_key_press(need_type="я", typed="ю")
+    heatmap.save()
+    get_writer().flush()
+
+    with open(journal_path, "r", encoding="utf-8") as journal_file:
+        assert journal_file.read() == "en,a,s,2\nru,я,ю,1\n"
+    # line of crashed save is skipped
+    with open(journal_path, "a", encoding="utf-8") as journal_file:
+        journal_file.write("en,b,")
+
+    loaded = HeatmapStatistics(path, journal_path)
+    assert loaded.stats["en"][0][18] == 2
+    assert loaded.stats["ru"][32][31] == 1
+    assert loaded.stats["en"].sum() + loaded.stats["ru"].sum() == 3
+
+    # journal becomes bigger than compact_bytes
+    heatmap.add_key_press(need_type="a", typed="s")
+    heatmap.save()
+    get_writer().flush()
+
+    assert not os.path.exists(journal_path)
+    stats, generation = HeatmapStatistics.read(path)
+    assert stats["en"][0][18] == 3
+    assert generation == 1
+    assert HeatmapStatistics(path, journal_path).stats["ru"][32][31] == 1
+
+
+def test_heatmap_compaction_crash(tmp_path, monkeypatch):
+    path = str(tmp_path / "heatmap.csv")
+    journal_path = str(tmp_path / "journal.csv")
+    HeatmapStatistics.write(
+        {
+            "en": np.zeros((26, 26), dtype=int),
+            "ru": np.zeros((33, 33), dtype=int),
+        },
+        path,
+    )
+
+    def get_errors():
+        return HeatmapStatistics(path, journal_path).stats["en"][0][18]
+
+    def crash(*_args, **_kwargs):
+        raise OSError("crash")
+
+    # crash after journal is renamed, before heatmap file is written
+    HeatmapStatistics.append_journal(["en,a,s,1\n"], path, journal_path)
+    with patch.object(HeatmapStatistics, "write", crash):
+        with pytest.raises(OSError):
+            HeatmapStatistics.compact(path, journal_path)
+    assert not os.path.exists(journal_path)
+    assert get_errors() == 1
+
+    # crash after heatmap file is written, before journal is removed
+    HeatmapStatistics.append_journal(["en,a,s,1\n"], path, journal_path)
+    with patch("src.statistics_classes.os.remove", crash):
+        with pytest.raises(OSError):
+            HeatmapStatistics.compact(path, journal_path)
+    assert HeatmapStatistics.read(path)[1] == 1
+    assert get_errors() == 2
+
+    HeatmapStatistics.compact(path, journal_path)
+    assert list(tmp_path.iterdir()) == [tmp_path / "heatmap.csv"]
+    assert get_errors() == 2
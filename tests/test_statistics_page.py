@@ -0,0 +1,94 @@
+import json
+import threading
+import pytest
+from src.aggregates import AggregateStore
+from src.history import HistoryStore
+from src.persistence import PersistenceWriter
+from src.statistics_classes import Statistics
+from src.statistics_page import StatisticsPage
+from src.text_generator import TextGenerator
+from tests.test_history import make_row
+
+
+@pytest.fixture
+def history_store(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.add(make_row("2024-01-01 10:00:00.000000"))
+    store.add(make_row("2024-01-02 10:00:00.000000"))
+
+    aggregate_store = AggregateStore(str(tmp_path / "aggregates.json"))
+    monkeypatch.setattr("src.statistics_page.get_history_store", lambda: store)
+    monkeypatch.setattr(
+        "src.statistics_page.get_aggregate_store", lambda: aggregate_store
+    )
+    yield store
+    store.close()
+
+
+def get_test_indices(statistics_page):
+    return [
+        control.index
+        for control in statistics_page.list_view.controls
+        if isinstance(control, StatisticsPage.TestStatisticsVisualizer)
+    ]
+
+
+def test_unsaved_test_is_shown_without_waiting(history_store, monkeypatch):
+    writer = PersistenceWriter()
+    monkeypatch.setattr("src.statistics_page.get_writer", lambda: writer)
+    release = threading.Event()
+    writer.submit(release.wait)
+    writer.submit(lambda: history_store.add(make_row("2024-01-03 10:00:00.000000")))
+
+    last_test = Statistics()
+    last_test.end()
+    statistics_page = StatisticsPage(last_test=last_test)
+
+    assert statistics_page.list_view.controls[1].statistics is last_test
+    assert get_test_indices(statistics_page) == [2, 1, 0]
+
+    release.set()
+    statistics_page.reload_saved()
+    assert statistics_page.unsaved_test is None
+    assert get_test_indices(statistics_page) == [2, 1, 0]
+    assert statistics_page.list_view.controls[1].statistics is not last_test
+    writer.close()
+
+
+def test_saved_test_is_read_from_history(history_store, monkeypatch):
+    writer = PersistenceWriter()
+    monkeypatch.setattr("src.statistics_page.get_writer", lambda: writer)
+
+    last_test = Statistics()
+    last_test.end()
+    statistics_page = StatisticsPage(last_test=last_test)
+
+    assert statistics_page.unsaved_test is None
+    assert get_test_indices(statistics_page) == [1, 0]
+    writer.close()
+
+
+def test_retry_button_only_for_reproducible_tests(history_store, monkeypatch):
+    writer = PersistenceWriter()
+    monkeypatch.setattr("src.statistics_page.get_writer", lambda: writer)
+    history_store.add(
+        make_row(
+            "2024-01-03 10:00:00.000000",
+            seed=7,
+            generator=json.dumps(TextGenerator("en").get_settings()),
+        )
+    )
+    retried = []
+
+    statistics_page = StatisticsPage(on_retry=retried.append)
+    visualizers = statistics_page.list_view.controls[1:]
+
+    assert [visualizer.retry_button is None for visualizer in visualizers] == [
+        False,
+        True,
+        True,
+    ]
+    visualizers[0].retry_button.on_click(None)
+    assert retried == [visualizers[0].statistics]
+    assert retried[0].seed == 7
+    writer.close()
@@ -20,7 +20,7 @@ def test_no_numbers(text_generator_setup):
 
 
 def test_numbers(text_generator_setup):
-    random.seed(42)
+    text_generator_setup.reseed(42)
     if text_generator_setup.numbers is False:
         text_generator_setup.toggle_numbers()
 
@@ -37,7 +37,7 @@ def test_no_punctuation(text_generator_setup):
 
 
 def test_punctuation(text_generator_setup):
-    random.seed(42)
+    text_generator_setup.reseed(42)
     if text_generator_setup.punctuation is False:
         text_generator_setup.toggle_punctuation()
 
@@ -54,3 +54,93 @@ def test_language(text_generator_setup):
         generated_text = text_generator_setup.generate(100)
         for letter in generated_text:
             assert letter not in constants.LANGUAGE_LETTERS[other_language]
+
+
+def test_generate_batch():
+    text_generator = TextGenerator(language="en")
+    texts = text_generator.generate_batch(texts_count=10, words_count=50)
+
+    assert len(texts) == 10
+    for text in texts:
+        words = text.split(" ")
+        assert len(words) == 50
+        assert all(word in text_generator.vocabulary.to_array() for word in words)
+
+
+def test_generate_batch_numbers_punctuation():
+    text_generator = TextGenerator(language="en", punctuation=True, numbers=True)
+    words = " ".join(text_generator.generate_batch(100, 100)).split(" ")
+
+    numbers_share = sum(
+        word.rstrip(constants.PUNCTUATION_CHARS).isdigit() for word in words
+    ) / len(words)
+    punctuation_share = sum(word[-1] in constants.PUNCTUATION_CHARS for word in words)
+    punctuation_share /= len(words)
+
+    assert abs(numbers_share - constants.TEXT_GENERATOR["numbers_probability"]) < 0.02
+    assert (
+        abs(punctuation_share - constants.TEXT_GENERATOR["punctuation_probability"])
+        < 0.02
+    )
+
+
+def test_zipf_sampling():
+    text_generator = TextGenerator(
+        language="en", sampling="zipf", zipf_exponent=1.5, seed=42
+    )
+
+    words = " ".join(text_generator.generate_batch(1, 2000)).split()
+    vocabulary = text_generator.vocabulary
+
+    # most frequent word has weight close to 40% with exponent 1.5
+    assert words.count(vocabulary[0]) > words.count(vocabulary[len(vocabulary) - 1])
+    assert words.count(vocabulary[0]) > 400
+
+
+def test_weights_sampling():
+    text_generator = TextGenerator(language="ru", sampling="weights")
+    vocabulary = text_generator.vocabulary
+    vocabulary.set_weights([1.0] + [0.0] * (len(vocabulary) - 1))
+
+    try:
+        assert set(text_generator.generate(50).split()) == {vocabulary[0]}
+        assert set(text_generator.generate_batch(2, 10)[1].split()) == {vocabulary[0]}
+    finally:
+        vocabulary.alias_tables.pop("weights")
+
+
+def test_adaptive_sampling():
+    text_generator = TextGenerator(language="en", sampling="adaptive", seed=42)
+    text_generator.set_targets((("g", 1.0), ("zz", 1.0)))
+
+    words = (
+        text_generator.generate(1000).split()
+        + text_generator.generate_batch(1, 1000)[0].split()
+    )
+    targeted = sum("g" in word for word in words) / len(words)
+
+    share = constants.ADAPTIVE_GENERATION["targeted_share"]
+    assert share - 0.05 < targeted < share + 0.1
+
+    # no target is in vocabulary
+    text_generator.set_targets((("zz", 1.0),))
+    assert text_generator.get_adaptive_table() is None
+    assert len(text_generator.generate(10).split()) == 10
+
+
+def test_seeded_generation():
+    settings = TextGenerator(
+        language="en", punctuation=True, numbers=True
+    ).get_settings()
+    first, second = TextGenerator(**settings), TextGenerator(**settings)
+
+    text = first.generate_text(50, seed=7)
+    assert second.generate_text(50, seed=7) == text
+    assert first.generate_text(50, seed=8) != text
+    assert TextGenerator.regenerate(settings, 7, 50) == text
+
+    # stream of text continues it in the same way
+    first_stream, second_stream = first.stream(seed=7), second.stream(seed=7)
+    assert [next(first_stream) for _ in range(20)] == [
+        next(second_stream) for _ in range(20)
+    ]
@@ -0,0 +1,90 @@
+import time
+import pytest
+from src.text_pool import TextPool
+from src.text_generator import TextGenerator
+from src.utils import load_assets
+from src import constants
+
+
+@pytest.fixture
+def text_pool():
+    load_assets()
+    pool = TextPool(texts_per_key=2, prefill=False)
+    yield pool
+    pool.close()
+
+
+def wait_for_texts(text_pool, key, count):
+    for _ in range(500):
+        with text_pool.condition:
+            if len(text_pool.texts[key]) >= count:
+                return
+        time.sleep(0.01)
+    raise TimeoutError
+
+
+def test_get_generates_missing_text(text_pool):
+    settings = TextGenerator("en").get_settings()
+    seed, text = text_pool.get(settings, 10)
+    assert len(text.split(" ")) == 10
+    assert TextGenerator.regenerate(settings, seed, 10) == text
+
+
+def test_pool_is_refilled(text_pool):
+    settings = TextGenerator("ru", punctuation=True).get_settings()
+    key = TextPool.get_key(settings, 25)
+    text_pool.get(settings, 25)
+    wait_for_texts(text_pool, key, 2)
+
+    seed, text = text_pool.get(settings, 25)
+    assert len(text.split(" ")) == 25
+    # texts generated by worker are also determined by seed
+    assert TextGenerator.regenerate(settings, seed, 25) == text
+    assert all(letter not in constants.LANGUAGE_LETTERS["en"] for letter in text)
+
+    wait_for_texts(text_pool, key, 2)
+
+
+def test_prefill():
+    load_assets()
+    text_pool = TextPool(texts_per_key=1)
+
+    for key in TextPool.get_default_keys():
+        wait_for_texts(text_pool, key, 1)
+    text_pool.close()
+
+
+def test_targets_are_not_part_of_key(text_pool):
+    generator = TextGenerator("en", sampling="adaptive")
+    key = TextPool.get_key(generator.get_settings(), 10)
+
+    for targets in [(("a", 1.0),), (("b", 1.0),), (("c", 1.0),)]:
+        generator.set_targets(targets)
+        text_pool.prefetch(generator.get_settings(), 10)
+        wait_for_texts(text_pool, key, 2)
+
+        seed, text = text_pool.get(generator.get_settings(), 10)
+        assert TextGenerator.regenerate(generator.get_settings(), seed, 10) == text
+
+    # texts of old targets are dropped, so pool does not grow
+    assert list(text_pool.texts) == [key]
+    assert text_pool.targets[key] == (("c", 1.0),)
+
+
+def test_failed_generation_does_not_stop_worker(text_pool, monkeypatch, capsys):
+    get_generator = text_pool.get_generator
+
+    def fail_for_ru(settings):
+        if dict(settings)["language"] == "ru":
+            raise FileNotFoundError("corpus is missing")
+        return get_generator(settings)
+
+    monkeypatch.setattr(text_pool, "get_generator", fail_for_ru)
+
+    text_pool.prefetch(TextGenerator("ru").get_settings(), 10)
+    settings = TextGenerator("en").get_settings()
+    text_pool.prefetch(settings, 10)
+
+    wait_for_texts(text_pool, TextPool.get_key(settings, 10), 2)
+    assert text_pool.worker.is_alive()
+    assert "corpus is missing" in capsys.readouterr().err
@@ -0,0 +1,128 @@
+import pytest
+from src.text_visualizing import (
+    MainText,
+    LetterColor,
+    TextRenderer,
+    split_into_lines,
+)
+from src import constants
+
+
+@pytest.fixture
+def main_text(monkeypatch):
+    def mock_update(_):
+        pass
+
+    monkeypatch.setattr("flet.Control.update", mock_update)
+    return MainText("hello world")
+
+
+def test_letters_created(main_text):
+    assert len(main_text.letters) == len("hello world")
+    assert (
+        "".join(letter.value for letter in main_text.letters.values()) == "hello world"
+    )
+
+
+def test_update_letters_keeps_controls(main_text):
+    letters_before = dict(main_text.letters)
+
+    main_text.update_letters({0: LetterColor.CORRECT, 1: LetterColor.WRONG})
+
+    assert main_text.letters == letters_before
+    assert main_text.letter_colors[0] == LetterColor.CORRECT
+    assert main_text.letters[0].text_element.color == LetterColor.CORRECT.value
+    assert main_text.letters[1].text_element.color == LetterColor.WRONG.value
+    assert main_text.letters[2].text_element.color == LetterColor.UNUSED.value
+
+
+def test_update_letters_only_changed(main_text, monkeypatch):
+    updated = []
+    monkeypatch.setattr("flet.Control.update", lambda control: updated.append(control))
+
+    main_text.update_letters({0: LetterColor.CORRECT})
+    main_text.update_letters({0: LetterColor.CORRECT, 1: LetterColor.UNUSED})
+
+    assert updated == [main_text.letters[0]]
+
+
+def test_split_into_lines():
+    assert split_into_lines("aaa bbb ccc", 8) == [0, 8]
+    assert split_into_lines("aaa bbb ccc", 4) == [0, 4, 8]
+    assert split_into_lines("aaaaaaaa bb", 4) == [0, 9]
+    assert split_into_lines("", 4) == [0]
+
+
+def test_windowed_builds_only_visible_lines(monkeypatch):
+    monkeypatch.setattr("flet.Control.update", lambda _: None)
+    monkeypatch.setitem(constants.MAIN_TEXT_WINDOW, "line_length", 4)
+
+    text = " ".join(["abc"] * 100)
+    main_text = MainText(text, windowed=True)
+
+    window_size = (
+        constants.MAIN_TEXT_WINDOW["lines_before"]
+        + constants.MAIN_TEXT_WINDOW["lines_after"]
+        + 1
+    )
+    assert len(main_text.letters) == 4 * window_size
+
+    main_text.update_letters({len(text) - 1: LetterColor.CORRECT})
+    assert main_text.letter_colors[len(text) - 1] == LetterColor.CORRECT
+
+    # moving cursor to the middle of text scrolls window
+    main_text.set_cursor(4 * 50)
+    assert min(main_text.letters) == 4 * (
+        50 - constants.MAIN_TEXT_WINDOW["lines_before"]
+    )
+    assert len(main_text.letters) == 4 * window_size
+
+    main_text.set_cursor(len(text) - 1)
+    assert max(main_text.letters) == len(text) - 1
+    assert main_text.letters[len(text) - 1].color == LetterColor.CORRECT.value
+
+
+def test_spans_renderer(monkeypatch):
+    monkeypatch.setattr("flet.Control.update", lambda _: None)
+
+    main_text = MainText("hello world", renderer=TextRenderer.SPANS)
+    line_text = main_text.line_texts[0]
+    assert len(main_text.letters) == 0
+    assert [span.text for span in line_text.spans] == ["hello world"]
+
+    main_text.update_letters(
+        {0: LetterColor.CORRECT, 1: LetterColor.CORRECT, 2: LetterColor.WRONG}
+    )
+    assert [span.text for span in line_text.spans] == ["he", "l", "lo world"]
+    assert [span.style.color for span in line_text.spans] == [
+        LetterColor.CORRECT.value,
+        LetterColor.WRONG.value,
+        LetterColor.UNUSED.value,
+    ]
+
+
+def test_renderers_controls_count(monkeypatch):
+    monkeypatch.setattr("flet.Control.update", lambda _: None)
+
+    text = " ".join(["abc"] * 100)
+    letters = MainText(text, windowed=True, renderer=TextRenderer.LETTERS)
+    spans = MainText(text, windowed=True, renderer=TextRenderer.SPANS)
+
+    assert spans.get_render_stats()["controls"] < letters.get_render_stats()["controls"]
+    assert spans.get_render_stats()["spans"] == len(spans.line_texts)
+
+
+def test_extend_content(monkeypatch):
+    monkeypatch.setattr("flet.Control.update", lambda _: None)
+    monkeypatch.setitem(constants.MAIN_TEXT_WINDOW, "line_length", 8)
+
+    letter_colors = [LetterColor.UNUSED] * len("abc")
+    main_text = MainText("abc", letter_colors=letter_colors, windowed=True)
+
+    letter_colors.extend([LetterColor.UNUSED] * len(" def ghi"))
+    main_text.extend_content(" def ghi")
+
+    assert main_text.text == "abc def ghi"
+    assert len(main_text.letter_colors) == len(main_text.text)
+    assert main_text.line_starts == split_into_lines(main_text.text, 8)
+    assert len(main_text.letters) == len(main_text.text)
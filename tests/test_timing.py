@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from src.timing import DeadlineTimer, now_ns
+
+
+def test_deadline_and_ticks():
+    ticks = []
+    deadline = threading.Event()
+
+    timer = DeadlineTimer(
+        on_tick=lambda: ticks.append(now_ns()),
+        on_deadline=deadline.set,
+        refresh_rate=100,
+    )
+    start_ns = now_ns()
+    timer.start(start_ns=start_ns, duration_ns=100 * 10**6)
+
+    assert deadline.wait(1)
+    assert now_ns() - start_ns >= 100 * 10**6
+    assert 1 <= len(ticks) <= 10
+    assert all(tick < start_ns + 100 * 10**6 for tick in ticks)
+
+
+def test_stopped_timer_does_not_call():
+    called = threading.Event()
+
+    timer = DeadlineTimer(on_tick=called.set, on_deadline=called.set, refresh_rate=50)
+    timer.start(duration_ns=20 * 10**6)
+    timer.stop()
+
+    assert not called.wait(0.1)
+
+
+def test_asyncio_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    deadline = threading.Event()
+    callback_thread = []
+
+    def on_deadline():
+        callback_thread.append(threading.current_thread())
+        deadline.set()
+
+    timer = DeadlineTimer(on_deadline=on_deadline, loop=loop)
+    start_ns = now_ns()
+    timer.start(duration_ns=50 * 10**6)
+
+    assert deadline.wait(1)
+    assert now_ns() - start_ns >= 50 * 10**6
+    # callback is not run in loop thread
+    assert callback_thread[0] is not thread
+
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,39 @@
+from src.typing_state import TypingState
+
+
+def test_type_and_delete():
+    state = TypingState("ab cd")
+
+    assert state.type_char("a") == (0, True)
+    assert state.type_char("x") == (1, False)
+    assert state.get_printed_text() == "ax"
+    assert state.get_expected() == " "
+
+    assert state.can_delete()
+    assert state.delete() == 1
+    assert state.get_printed_text() == "a"
+
+
+def test_cannot_delete_correct_space():
+    state = TypingState("ab cd")
+    state.set_printed_text("ab ")
+    assert not state.can_delete()
+
+    state.set_printed_text("abx")
+    assert state.can_delete()
+
+    assert not TypingState("ab").can_delete()
+
+
+def test_finished_and_extend():
+    state = TypingState("ab")
+    state.set_printed_text("ab")
+    assert state.is_finished()
+
+    state.extend(" cd")
+    assert not state.is_finished()
+    assert state.correct_text == "ab cd"
+
+    assert state.type_char(" ") == (2, True)
+    assert state.type_char("c") == (3, True)
+    assert state.get_printed_text() == "ab c"
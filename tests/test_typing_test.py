@@ -1,8 +1,11 @@
+import threading
 import pytest
 import flet as ft
 from unittest.mock import patch
 from src.typing_test import TypingTest, LetterColor
+from src.statistics_classes import Statistics
 from src.utils import load_assets
+from src import constants
 
 
 def setup():
@@ -34,7 +37,8 @@ def typing_test_mock(monkeypatch):
     page = MockPage()
     typing_test = TypingTest(page)
 
-    return typing_test
+    yield typing_test
+    typing_test.close()
 
 
 def test_stop(typing_test_mock):
@@ -43,6 +47,22 @@ def test_stop(typing_test_mock):
     assert typing_test_mock.status == typing_test_mock.TestStatus.ENDED
 
 
+def test_stop_saves_once(typing_test_mock):
+    typing_test_mock.start()
+
+    with patch.object(typing_test_mock.statistics, "save") as save, patch.object(
+        typing_test_mock.heatmap, "save"
+    ) as heatmap_save:
+        threads = [threading.Thread(target=typing_test_mock.stop) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert save.call_count == 1
+    assert heatmap_save.call_count == 1
+
+
 def test_settings_changes(typing_test_mock):
     old_punctuation = typing_test_mock.text_generator.punctuation
     typing_test_mock.toggle_punctuation()
@@ -74,7 +94,7 @@ def test_key_pressed_starts_test(typing_test_mock):
 
 
 def test_key_pressed_correct_key(typing_test_mock):
-    typing_test_mock.correct_text = "hello"
+    typing_test_mock.set_text("hello")
     typing_test_mock.printed_text = "he"
 
     event = ft.KeyboardEvent("l", False, False, False, False)
@@ -85,7 +105,7 @@ def test_key_pressed_correct_key(typing_test_mock):
 
 
 def test_key_pressed_wrong_key(typing_test_mock):
-    typing_test_mock.correct_text = "hello"
+    typing_test_mock.set_text("hello")
     typing_test_mock.printed_text = "he"
 
     event = ft.KeyboardEvent("a", False, False, False, False)
@@ -96,7 +116,7 @@ def test_key_pressed_wrong_key(typing_test_mock):
 
 
 def test_backspace_pressed(typing_test_mock):
-    typing_test_mock.correct_text = "hello"
+    typing_test_mock.set_text("hello")
     typing_test_mock.printed_text = "hea"
 
     event = ft.KeyboardEvent("backspace", False, False, False, False)
@@ -104,3 +124,68 @@ def test_backspace_pressed(typing_test_mock):
 
     assert typing_test_mock.printed_text == "he"
     assert typing_test_mock.letter_colors[2] == LetterColor.UNUSED
+
+
+def test_set_longer_text(typing_test_mock):
+    text = "a" * (len(typing_test_mock.correct_text) + 10)
+    typing_test_mock.set_text(text)
+    typing_test_mock.printed_text = text[:-1]
+
+    event = ft.KeyboardEvent("a", False, False, False, False)
+    typing_test_mock.key_pressed(event)
+
+    assert len(typing_test_mock.letter_colors) == len(text)
+    assert typing_test_mock.letter_colors[-1] == LetterColor.CORRECT
+    assert typing_test_mock.main_text.text == text
+
+
+def test_time_mode_text_is_extended(typing_test_mock):
+    typing_test_mock.select_time(15)
+    initial_length = len(typing_test_mock.correct_text)
+    assert len(typing_test_mock.correct_text.split()) == (
+        constants.TEXT_STREAM["initial_words"]
+    )
+
+    for _ in range(initial_length * 2):
+        key = typing_test_mock.typing_state.get_expected()
+        typing_test_mock.key_pressed(ft.KeyboardEvent(key, False, False, False, False))
+
+    assert typing_test_mock.status == TypingTest.TestStatus.RUNNING
+    assert len(typing_test_mock.correct_text) > initial_length * 2
+    assert len(typing_test_mock.letter_colors) == len(typing_test_mock.correct_text)
+    assert typing_test_mock.main_text.text == typing_test_mock.correct_text
+
+
+def test_retry_same_text(typing_test_mock):
+    typing_test_mock.select_time(15)
+    typing_test_mock.toggle_punctuation()
+    typing_test_mock.start()
+    statistics = typing_test_mock.statistics
+    typing_test_mock.extend_text()
+    text = typing_test_mock.correct_text
+
+    typing_test_mock.set_language("ru")
+    typing_test_mock.select_words(10)
+    typing_test_mock.retry(statistics)
+    typing_test_mock.extend_text()
+
+    assert typing_test_mock.size_mode == "time"
+    assert typing_test_mock.text_generator.punctuation is True
+    assert typing_test_mock.correct_text == text
+
+    # settings bar shows restored settings
+    settings_bar = typing_test_mock.settings_bar
+    assert settings_bar.language == "en"
+    assert settings_bar.punctuation.is_on
+    assert settings_bar.time.is_on and not settings_bar.words.is_on
+    assert settings_bar.selected_size_option == constants.DEFAULT_TIMES.index(15)
+    assert typing_test_mock.visual_element.controls[0] is settings_bar
+
+
+def test_retry_test_without_seed(typing_test_mock):
+    statistics = Statistics(test_size_mode="words", test_size=25, language="en")
+    text = typing_test_mock.correct_text
+
+    with pytest.raises(ValueError):
+        typing_test_mock.retry(statistics)
+    assert typing_test_mock.correct_text == text
@@ -0,0 +1,95 @@
+import os
+import pytest
+import numpy as np
+from src.vocabulary import (
+    IndexedVocabulary,
+    Vocabulary,
+    get_vocabulary,
+    normalize_words,
+)
+from src import constants
+
+
+def test_normalize_words():
+    lines = ["Hello\n", "  World \n", "\n", "two words\n", "it's\n", "Привет\n"]
+    assert normalize_words(lines) == ["hello", "world", "привет"]
+
+
+def test_compile_and_load(tmp_path):
+    source_path = tmp_path / "words.txt"
+    source_path.write_text("One\ntwo\nтри\n", encoding="utf8")
+    cache_path = tmp_path / "cache" / "words.bin"
+
+    Vocabulary.compile(source_path, cache_path)
+    vocabulary = Vocabulary.load(cache_path, source_path=source_path)
+
+    assert len(vocabulary) == 3
+    assert [vocabulary[i] for i in range(3)] == ["one", "two", "три"]
+    assert vocabulary[-1] == "три"
+    assert list(vocabulary.take(np.array([[2, 0]]))[0]) == ["три", "one"]
+
+
+def test_outdated_cache_is_rejected(tmp_path):
+    source_path = tmp_path / "words.txt"
+    source_path.write_text("one\n", encoding="utf8")
+    cache_path = tmp_path / "words.bin"
+    Vocabulary.compile(source_path, cache_path)
+
+    source_path.write_text("one\ntwo\n", encoding="utf8")
+    with pytest.raises(ValueError):
+        Vocabulary.load(cache_path, source_path=source_path)
+
+
+def test_vocabulary_is_loaded_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(constants, "VOCABULARY_CACHE_DIR", tmp_path)
+    monkeypatch.setattr("src.vocabulary._vocabularies", {})
+    source_path = tmp_path / "words.txt"
+    source_path.write_text("one\ntwo\n", encoding="utf8")
+
+    vocabulary = get_vocabulary(source_path)
+    assert get_vocabulary(source_path) is vocabulary
+    assert os.path.exists(tmp_path / "words.txt.bin")
+
+
+def test_indexed_vocabulary(monkeypatch, tmp_path):
+    source_path = tmp_path / "words.txt"
+    source_path.write_bytes("One\r\n  two \n\nit's\nТри\n".encode("utf8"))
+    cache_path = tmp_path / "cache" / "words.idx"
+
+    IndexedVocabulary.compile(source_path, cache_path)
+    vocabulary = IndexedVocabulary.load(cache_path, source_path=source_path)
+
+    assert len(vocabulary) == 3
+    assert [vocabulary[i] for i in range(3)] == ["one", "two", "три"]
+
+    # words are decoded only when drawn
+    monkeypatch.setitem(constants.VOCABULARY, "max_materialized_words", 2)
+    assert vocabulary.take(np.array([[2, 0], [1, 1]])).tolist() == [
+        ["три", "one"],
+        ["two", "two"],
+    ]
+    assert vocabulary.words_array is None
+
+
+def test_big_vocabulary_is_indexed(monkeypatch, tmp_path):
+    monkeypatch.setattr(constants, "VOCABULARY_CACHE_DIR", tmp_path)
+    monkeypatch.setitem(constants.VOCABULARY, "indexed_min_bytes", 4)
+    monkeypatch.setattr("src.vocabulary._vocabularies", {})
+    source_path = tmp_path / "words.txt"
+    source_path.write_text("one\ntwo\n", encoding="utf8")
+
+    vocabulary = get_vocabulary(source_path)
+    assert isinstance(vocabulary, IndexedVocabulary)
+    assert vocabulary[1] == "two"
+    assert os.path.exists(tmp_path / "words.txt.idx")
+
+
+def test_ngram_index():
+    vocabulary = Vocabulary.from_words(["cat", "act", "dog", "tact"])
+    ngram_index = vocabulary.get_ngram_index()
+
+    assert list(ngram_index.get_words("a")) == [0, 1, 3]
+    assert list(ngram_index.get_words("ct")) == [1, 3]
+    assert list(ngram_index.get_words("og")) == [2]
+    assert len(ngram_index.get_words("zz")) == 0
+    assert vocabulary.get_ngram_index() is ngram_index